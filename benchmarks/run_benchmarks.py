@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""
+Headless benchmarks of canvector send path on python-can virtual bus. No Vector hardware or GUI is needed.
+
+Measured:
+    - scheduler period accuracy and jitter percentiles for 10 / 1k / 10k periodic messages
+    - maximal rate of triggered sends
+    - messages database mutation latency (csv and SQLite storage)
+    - GUI-free startup time
+
+Execution:
+    $ python benchmarks/run_benchmarks.py [--output results.json] [--sizes 10 1000 10000] [--duration 3]
+"""
+
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+import can  # noqa: E402
+
+from can_generator import Simulation  # noqa: E402
+from dbman import DataBaseMan  # noqa: E402
+from msgimport import read_csv_msgs  # noqa: E402
+from msgregistry import STD_ID_MAX  # noqa: E402
+from storage import atomic_write_csv  # noqa: E402
+
+
+VIRTUAL_CHANNEL = 'canvector_bench'
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """
+    Computes summary of values
+    Params:                                                                     type:
+    @param values: Measured values                                              List[float]
+    @return: Min, percentiles, max and mean                                     Dict[str, float]
+    """
+
+    if not values:
+        return {}
+    values = sorted(values)
+    p50, p90, p99 = (values[min(len(values) - 1, int(q * len(values)))] for q in (0.5, 0.9, 0.99))
+    return {'min': values[0], 'p50': p50, 'p90': p90, 'p99': p99, 'max': values[-1], 'mean': statistics.fmean(values)}
+
+
+def create_db(path: str, msgs_num: int, period_ms: int, period_en: bool) -> None:
+    """
+    Creates csv database with generated messages, every message has unique id, extended ids are used past 11 bits
+    Params:                                                                     type:
+    @param path: Path to csv file                                               str
+    @param msgs_num: Number of messages                                         int
+    @param period_ms: Period of messages                                        int
+    @param period_en: Periodic transmission enabled                             bool
+    @return: None
+    """
+
+    atomic_write_csv(path=path, records=[('msg{}'.format(i), '0x{:X}'.format(i),
+                                          '0x{:02X} 0x00 0x11 0x22 0x33 0x44 0x55 0x66'.format(i % 256),
+                                          period_en, period_ms, 0, i > STD_ID_MAX, False, False, '')
+                                         for i in range(msgs_num)])
+
+
+def create_sim(db_path: str) -> Simulation:
+    """
+    Creates headless simulation on virtual bus
+    Params:                                                                     type:
+    @param db_path: Path to messages database                                   str
+    @return: Simulation                                                         Simulation
+    """
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        return Simulation(db_path=db_path, bus_type='virtual', channel=VIRTUAL_CHANNEL, gui=False)
+
+
+def bench_scheduler(work_dir: str, msgs_num: int, period_ms: int, duration_s: float) -> Dict[str, Any]:
+    """
+    Measures period error of periodic messages observed on the bus
+    Params:                                                                     type:
+    @param work_dir: Directory for temporary files                              str
+    @param msgs_num: Number of periodic messages                                int
+    @param period_ms: Period of messages                                        int
+    @param duration_s: Measurement time                                         float
+    @return: Results                                                            Dict[str, Any]
+    """
+
+    db_path = os.path.join(work_dir, 'sched_{}.csv'.format(msgs_num))
+    create_db(path=db_path, msgs_num=msgs_num, period_ms=period_ms, period_en=True)
+    rx_bus = can.Bus(interface='virtual', channel=VIRTUAL_CHANNEL)
+    sim = create_sim(db_path=db_path)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        sim.run()
+        sim.set_sim_active(sim_en=True)
+        time.sleep(duration_s)
+        sim.set_sim_active(sim_en=False)
+        time.sleep(period_ms / 1000)
+        sim.shutdown()
+
+    timestamps_d = defaultdict(list)
+    msg = rx_bus.recv(timeout=0)
+    while msg is not None:
+        timestamps_d[msg.arbitration_id].append(msg.timestamp)
+        msg = rx_bus.recv(timeout=0)
+    rx_bus.shutdown()
+
+    errors_ms = [abs((t_next - t_prev) * 1000 - period_ms) for timestamps in timestamps_d.values()
+                 for t_prev, t_next in zip(timestamps, timestamps[1:])]
+    frames_num = sum(len(timestamps) for timestamps in timestamps_d.values())
+    expected_num = msgs_num * duration_s * 1000 / period_ms
+    return {'msgs_num': msgs_num, 'period_ms': period_ms, 'duration_s': duration_s, 'frames_sent': frames_num,
+            'frames_expected': expected_num, 'delivery_ratio': frames_num / expected_num if expected_num else 0,
+            'period_error_ms': percentiles(errors_ms)}
+
+
+def bench_triggered(work_dir: str, frames_num: int) -> Dict[str, Any]:
+    """
+    Measures rate of triggered sends
+    Params:                                                                     type:
+    @param work_dir: Directory for temporary files                              str
+    @param frames_num: Number of triggered sends                                int
+    @return: Results                                                            Dict[str, Any]
+    """
+
+    db_path = os.path.join(work_dir, 'trig.csv')
+    create_db(path=db_path, msgs_num=100, period_ms=100, period_en=False)
+    sim = create_sim(db_path=db_path)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        sim.run()
+        sim.set_sim_active(sim_en=True)
+        tx_pipeline = sim.get_tx_pipeline()
+        start = time.perf_counter()
+        for i in range(frames_num):
+            sim.send_msg(index=i % 100)
+        submit_s = time.perf_counter() - start
+        while tx_pipeline.get_sent_count() + sum(tx_pipeline.get_error_counters().values()) < frames_num:
+            time.sleep(0.001)
+        total_s = time.perf_counter() - start
+        sim.shutdown()
+
+    return {'frames_num': frames_num, 'submit_fps': frames_num / submit_s, 'sent_fps': frames_num / total_s,
+            'frames_sent': tx_pipeline.get_sent_count(), 'errors': tx_pipeline.get_error_counters()}
+
+
+def bench_db_mutations(work_dir: str, msgs_num: int, ops_num: int) -> Dict[str, Any]:
+    """
+    Measures latency of database add/modify/delete operations and of final flush
+    Params:                                                                     type:
+    @param work_dir: Directory for temporary files                              str
+    @param msgs_num: Number of messages in database                             int
+    @param ops_num: Number of operations of each kind                           int
+    @return: Results per storage backend                                        Dict[str, Any]
+    """
+
+    results_d = {}
+    for extension in ('csv', 'sqlite'):
+        csv_path = os.path.join(work_dir, 'mut_src.csv')
+        create_db(path=csv_path, msgs_num=msgs_num, period_ms=100, period_en=False)
+        db_path = os.path.join(work_dir, 'mut_{}.{}'.format(msgs_num, extension))
+        latencies_d = defaultdict(list)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            database_man = DataBaseMan(db_path=db_path)
+            database_man.import_msgs(msgs_df=read_csv_msgs(path=csv_path))
+
+            for i in range(ops_num):
+                start = time.perf_counter()
+                database_man.add_msg(name='new{}'.format(i), msg_id='0x7FF', payload='0x01 0x02')
+                latencies_d['add'].append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                database_man.modify_msg(index=i, name='mod{}'.format(i), msg_id='0x100', payload='0x03 0x04',
+                                        period_en=True)
+                latencies_d['modify'].append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                database_man.delete_msg(index=database_man.get_msgs_num() - 1)
+                latencies_d['delete'].append(time.perf_counter() - start)
+
+            """ csv storage collects changes - they are written by flush """
+            start = time.perf_counter()
+            database_man.flush()
+            latencies_d['flush'].append(time.perf_counter() - start)
+
+        results_d[extension] = {operation: percentiles([latency * 1000 for latency in latencies])
+                                for operation, latencies in latencies_d.items()}
+    return {'msgs_num': msgs_num, 'ops_num': ops_num, 'latency_ms': results_d}
+
+
+def bench_startup(work_dir: str, msgs_num: int) -> Dict[str, Any]:
+    """
+    Measures time of interpreter start, imports and creation of headless simulation in a fresh process
+    Params:                                                                     type:
+    @param work_dir: Directory for temporary files                              str
+    @param msgs_num: Number of messages in database                             int
+    @return: Results                                                            Dict[str, Any]
+    """
+
+    db_path = os.path.join(work_dir, 'startup.csv')
+    create_db(path=db_path, msgs_num=msgs_num, period_ms=100, period_en=True)
+    script = ('import contextlib, io, sys, time; sys.path.insert(0, {!r}); start = time.perf_counter()\n'
+              'with contextlib.redirect_stdout(io.StringIO()):\n'
+              '    from can_generator import Simulation\n'
+              '    import_s = time.perf_counter() - start\n'
+              '    Simulation(db_path={!r}, bus_type="virtual", channel="startup", gui=False)\n'
+              'print(import_s, time.perf_counter() - start)').format(REPO_DIR, db_path)
+
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+    process_s = time.perf_counter() - start
+    import_s, init_s = (float(value) for value in output.split())
+    return {'msgs_num': msgs_num, 'import_ms': import_s * 1000, 'import_and_init_ms': init_s * 1000,
+            'process_ms': process_s * 1000}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='canvector headless benchmarks')
+    parser.add_argument('--output', default='bench_results.json', help='JSON file with results')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000],
+                        help='numbers of periodic messages for scheduler benchmark')
+    parser.add_argument('--period', type=int, default=100, help='period of messages in ms')
+    parser.add_argument('--duration', type=float, default=3.0, help='scheduler measurement time in s')
+    parser.add_argument('--triggered', type=int, default=20000, help='number of triggered sends')
+    args = parser.parse_args()
+
+    results = {'meta': {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version(),
+                        'platform': platform.platform(), 'python_can': can.__version__},
+               'scheduler': [], 'triggered': None, 'db_mutations': [], 'startup': []}
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for size in args.sizes:
+            print('Scheduler: {} messages'.format(size))
+            results['scheduler'].append(bench_scheduler(work_dir=temp_dir, msgs_num=size, period_ms=args.period,
+                                                        duration_s=args.duration))
+        print('Triggered sends')
+        results['triggered'] = bench_triggered(work_dir=temp_dir, frames_num=args.triggered)
+        for size in (100, 5000):
+            print('Database mutations: {} messages'.format(size))
+            results['db_mutations'].append(bench_db_mutations(work_dir=temp_dir, msgs_num=size, ops_num=20))
+            print('Startup: {} messages'.format(size))
+            results['startup'].append(bench_startup(work_dir=temp_dir, msgs_num=size))
+
+    with open(args.output, 'w') as output_file:
+        json.dump(results, output_file, indent=2)
+    print('Results saved to', args.output)
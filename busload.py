@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+"""
+This module includes definition of class BusLoadStress responsible for sending frames at requested bus load. Time
+of every frame on the wire is computed bit-exactly from its id, DLC, payload and bitrates - including stuff bits
+(classic CAN frames are stuffed up to the end of CRC, so CRC15 is computed; CAN FD CRC field has fixed stuff bits)
+and bit rate switch. Frames are sent round-robin, each send consumes its bit time from the budget of bus time which
+grows with real time scaled by target load, so load does not depend on frame mix. Frames sent on the bus by other
+sources (scheduler, scenario, replay) consume the same budget, so requested load is the load of the whole bus.
+"""
+
+
+import copy
+import logging
+import os
+import time
+from collections import deque
+from threading import Event, Thread
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import can
+from can.util import len2dlc
+
+from frametable import FrameTable
+from msgregistry import STD_ID_MAX, is_payload_len_valid
+from txpipeline import TxPipeline
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BITRATE = 500000
+""" CRC delimiter, ACK slot, ACK delimiter, end of frame and interframe space are never stuffed """
+FRAME_TAIL_BITS = 1 + 1 + 1 + 7 + 3
+
+
+def _to_bits(value: int, length: int) -> List[int]:
+    """
+    Converts value to bits, most significant bit first
+    Params:                                                                     type:
+    @param value: Value of the field                                            int
+    @param length: Number of bits of the field                                  int
+    @return: Bits of the field                                                  List[int]
+    """
+
+    return [(value >> shift) & 1 for shift in range(length - 1, -1, -1)]
+
+
+def _crc15(bits: Iterable[int]) -> int:
+    """
+    Computes classic CAN CRC (polynomial 0x4599)
+    Params:                                                                     type:
+    @param bits: Bits from start of frame to the end of data field              Iterable[int]
+    @return: CRC                                                                int
+    """
+
+    crc = 0
+    for bit in bits:
+        crc_next = bit ^ (crc >> 14)
+        crc = (crc << 1) & 0x7FFF
+        if crc_next:
+            crc ^= 0x4599
+    return crc
+
+
+def _stuff_positions(bits: Sequence[int]) -> List[int]:
+    """
+    Finds positions of stuff bits, stuff bit of opposite value is inserted after five equal bits
+    Params:                                                                     type:
+    @param bits: Bits of stuffed part of the frame                              Sequence[int]
+    @return: Indexes of bits followed by stuff bit                              List[int]
+    """
+
+    positions = []
+    last_bit, run = None, 0
+    for index, bit in enumerate(bits):
+        if bit == last_bit:
+            run += 1
+        else:
+            last_bit, run = bit, 1
+        if run == 5:
+            positions.append(index)
+            last_bit, run = 1 - bit, 1
+    return positions
+
+
+def frame_bits(msg: can.Message) -> Tuple[int, int]:
+    """
+    Computes number of bits of frame on the wire including stuff bits and interframe space
+    Params:                                                                     type:
+    @param msg: CAN or CAN FD frame                                             can.Message
+    @return: Bits sent with nominal bitrate and bits sent with data bitrate     Tuple[int, int]
+    """
+
+    data = b'' if msg.is_remote_frame else bytes(msg.data)
+    dlc = len2dlc(msg.dlc if msg.is_remote_frame else len(data))
+    if msg.is_extended_id:
+        id_bits = (_to_bits(msg.arbitration_id >> 18, 11) + [1, 1] +
+                   _to_bits(msg.arbitration_id & 0x3FFFF, 18))
+    else:
+        id_bits = _to_bits(msg.arbitration_id, 11)
+
+    if not msg.is_fd:
+        """ SOF, id, RTR, IDE/r1, r0, DLC, data and CRC are stuffed """
+        bits = ([0] + id_bits + [int(msg.is_remote_frame)] + [0, 0] + _to_bits(dlc, 4) +
+                [bit for byte in data for bit in _to_bits(byte, 8)])
+        bits += _to_bits(_crc15(bits), 15)
+        return len(bits) + len(_stuff_positions(bits)) + FRAME_TAIL_BITS, 0
+
+    """ SOF, id, RRS, IDE, FDF, res, BRS, ESI, DLC and data are stuffed dynamically """
+    header_bits = [0] + id_bits + ([0] if msg.is_extended_id else [0, 0]) + [1, 0, int(msg.bitrate_switch)]
+    bits = header_bits + [0] + _to_bits(dlc, 4) + [bit for byte in data for bit in _to_bits(byte, 8)]
+    """ Stuff count with parity and CRC17/CRC21 with fixed stuff bit before every 4 bits """
+    crc_bits = 4 + (17 if len(data) <= 16 else 21)
+    crc_field_bits = crc_bits + (crc_bits + 3) // 4
+    stuff_positions = _stuff_positions(bits)
+    if not msg.bitrate_switch:
+        return len(bits) + len(stuff_positions) + crc_field_bits + FRAME_TAIL_BITS, 0
+
+    """ Bits after BRS till CRC delimiter are sent with data bitrate """
+    brs_index = len(header_bits) - 1
+    data_phase_stuff = sum(1 for position in stuff_positions if position >= brs_index)
+    arbitration_bits = brs_index + 1 + len(stuff_positions) - data_phase_stuff + FRAME_TAIL_BITS - 1
+    data_phase_bits = len(bits) - brs_index - 1 + data_phase_stuff + crc_field_bits + 1
+    return arbitration_bits, data_phase_bits
+
+
+def frame_time_s(msg: can.Message, bitrate: int, data_bitrate: Optional[int] = None) -> float:
+    """
+    Computes time of frame on the wire
+    Params:                                                                     type:
+    @param msg: CAN or CAN FD frame                                             can.Message
+    @param bitrate: Nominal (arbitration) bitrate                               int
+    @param data_bitrate: CAN FD data phase bitrate, nominal bitrate if None     Optional[int]
+    @return: Frame time including interframe space in seconds                   float
+    """
+
+    arbitration_bits, data_phase_bits = frame_bits(msg=msg)
+    return arbitration_bits / bitrate + data_phase_bits / (data_bitrate or bitrate)
+
+
+def generate_frames(id_first: int, id_last: int, length: int = 8, fd: bool = False,
+                    brs: bool = False) -> List[can.Message]:
+    """
+    Generates frames for range of ids with random payloads
+    Params:                                                                     type:
+    @param id_first: First CAN id                                               int
+    @param id_last: Last CAN id                                                 int
+    @param length: Number of payload bytes                                      int
+    @param fd: CAN FD frames                                                    bool
+    @param brs: CAN FD bit rate switch                                          bool
+    @return: Frames                                                             List[can.Message]
+    @raise ValueError: Payload length does not match any DLC of the frame type
+    """
+
+    if not is_payload_len_valid(length=length, fd=fd):
+        raise ValueError('payload length {} is not valid for {} frames'.format(length, 'CAN FD' if fd else 'CAN'))
+    return [can.Message(arbitration_id=can_id, is_extended_id=id_last > STD_ID_MAX, data=os.urandom(length),
+                        is_fd=fd, bitrate_switch=brs) for can_id in range(id_first, id_last + 1)]
+
+
+class BusLoadStress:
+    """ Class for sending frames at requested bus load """
+
+    SATURATE = 1.0
+    __INTERVAL_S = 0.001
+    __BURST_S = 0.01
+    __QUEUE_DEPTH_MAX = 256
+    __STATS_WINDOW_S = 1.0
+
+    def __init__(self, frames: Sequence[can.Message], tx_pipeline: TxPipeline, target_load: float, bitrate: int,
+                 data_bitrate: Optional[int] = None) -> None:
+        """
+        Setups frames and computes their bit times
+        Params:                                                                     type:
+        @param frames: Frames sent round-robin                                      Sequence[can.Message]
+        @param tx_pipeline: TX pipeline of the bus                                  TxPipeline
+        @param target_load: Requested bus load 0.0-1.0, SATURATE keeps queue full   float
+        @param bitrate: Nominal bitrate of the bus                                  int
+        @param data_bitrate: CAN FD data phase bitrate                              Optional[int]
+        @return: None
+        """
+
+        self.__tx_pipeline = tx_pipeline
+        self.__target_load = target_load
+        self.__bitrate = bitrate
+        self.__data_bitrate = data_bitrate
+        """ Frames are copied, so stress frames are not mistaken for the same messages sent by scheduler """
+        self.__frames = [(copy.copy(msg), frame_time_s(msg=msg, bitrate=bitrate, data_bitrate=data_bitrate))
+                         for msg in frames]
+        self.__frame_times_d: Dict[int, float] = {id(msg): frame_time for msg, frame_time in self.__frames}
+        self.__stop_event = Event()
+        self.__stress_thread = None
+        self.__bus_time_s = 0.0
+        self.__other_time_s = 0.0
+        self.__sent_cnt = 0
+        self.__samples = deque()
+
+    def __on_frame_sent(self, msg: can.Message) -> None:
+        """
+        Accounts bus time of sent frame, called by TX pipeline sender thread for all frames sent on the bus
+        Params:                                                                     type:
+        @param msg: Sent frame                                                      can.Message
+        @return: None
+        """
+
+        frame_time = self.__frame_times_d.get(id(msg))
+        if frame_time is None:
+            """ Frame sent by scheduler, scenario, replay or trigger - it also loads the bus """
+            frame_time = frame_time_s(msg=msg, bitrate=self.__bitrate, data_bitrate=self.__data_bitrate)
+            self.__other_time_s += frame_time
+        self.__bus_time_s += frame_time
+        self.__sent_cnt += 1
+
+    def __run(self) -> None:
+        """
+        Stress thread loop, frames are queued while there is bus time budget left, stress frames are charged when
+        queued and frames of other sources when sent
+        Params:                                                                     type:
+        @return: None
+        """
+
+        frames, frames_num = self.__frames, len(self.__frames)
+        saturate = self.__target_load >= self.SATURATE
+        index, budget_s = 0, 0.0
+        last, last_other_s = time.monotonic(), self.__other_time_s
+        while not self.__stop_event.wait(timeout=self.__INTERVAL_S):
+            now, other_s = time.monotonic(), self.__other_time_s
+            """ Debt of other traffic is limited, so stress resumes promptly once it stops """
+            budget_s = max(min(budget_s + (now - last) * self.__target_load, self.__BURST_S) - (other_s - last_other_s),
+                           -self.__BURST_S)
+            last, last_other_s = now, other_s
+            batch = []
+            free_slots = self.__QUEUE_DEPTH_MAX - self.__tx_pipeline.get_queue_depth()
+            while len(batch) < free_slots and (saturate or budget_s > 0):
+                msg, frame_time = frames[index]
+                index = (index + 1) % frames_num
+                batch.append(msg)
+                budget_s -= frame_time
+            if batch:
+                self.__tx_pipeline.submit(batch)
+            self.__samples.append((now, self.__bus_time_s, self.__sent_cnt))
+            while now - self.__samples[0][0] > self.__STATS_WINDOW_S:
+                self.__samples.popleft()
+
+    """ ============================================= Class interface ============================================= """
+
+    def start(self) -> bool:
+        """
+        Starts stress thread
+        Params:                                                                     type:
+        @return: Information if stress was started, there must be frames to send    bool
+        """
+
+        if not self.__frames:
+            print('Stress not started - no frames to send')
+            return False
+        self.__stop_event.clear()
+        self.__tx_pipeline.add_tx_listener(self.__on_frame_sent)
+        self.__stress_thread = Thread(target=self.__run, name='canvector-stress', daemon=True)
+        self.__stress_thread.start()
+        return True
+
+    def stop(self) -> None:
+        """
+        Stops stress thread
+        Params:                                                                     type:
+        @return: None
+        """
+
+        self.__stop_event.set()
+        if self.__stress_thread is not None:
+            self.__stress_thread.join()
+            self.__stress_thread = None
+        self.__tx_pipeline.remove_tx_listener(self.__on_frame_sent)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Provides requested and achieved bus load of frames sent during the last second
+        Params:                                                                     type:
+        @return: Loads in percent, frames per second and frames sent                Dict[str, Any]
+        """
+
+        samples = list(self.__samples)
+        if len(samples) < 2 or samples[-1][0] <= samples[0][0]:
+            achieved_load, frame_rate = 0.0, 0.0
+        else:
+            duration = samples[-1][0] - samples[0][0]
+            achieved_load = (samples[-1][1] - samples[0][1]) / duration
+            frame_rate = (samples[-1][2] - samples[0][2]) / duration
+        return {'target_load_pct': round(min(self.__target_load, self.SATURATE) * 100, 1),
+                'achieved_load_pct': round(achieved_load * 100, 1), 'frames_per_s': round(frame_rate, 1),
+                'frames_sent': self.__sent_cnt}
+
+    def format_stats(self) -> str:
+        """
+        Provides bus load as human readable text
+        Params:                                                                     type:
+        @return: Bus load summary                                                   str
+        """
+
+        stats = self.get_stats()
+        return 'bus load {:.1f}% (requested {}), {:.0f} frames/s'.format(
+            stats['achieved_load_pct'], 'saturation' if self.__target_load >= self.SATURATE
+            else '{:.1f}%'.format(stats['target_load_pct']), stats['frames_per_s'])
+
+
+def create_stress(frame_table: FrameTable, tx_pipeline: TxPipeline, bus_kwargs: Dict[str, Any], target_load: float,
+                  id_range: Optional[Tuple[int, int]] = None, length: int = 8, fd: bool = False,
+                  brs: bool = False) -> Optional[BusLoadStress]:
+    """
+    Creates stress of the bus with messages of database or with generated range of ids
+    Params:                                                                     type:
+    @param frame_table: Compiled frames of the bus                              FrameTable
+    @param tx_pipeline: TX pipeline of the bus                                  TxPipeline
+    @param bus_kwargs: Arguments of python-can bus, bitrates are taken from it  Dict[str, Any]
+    @param target_load: Requested bus load 0.0-1.0, SATURATE keeps queue full   float
+    @param id_range: First and last CAN id, None to send database messages      Optional[Tuple[int, int]]
+    @param length: Payload length of generated frames                           int
+    @param fd: Generated frames are CAN FD                                      bool
+    @param brs: Generated frames use CAN FD bit rate switch                     bool
+    @return: Bus load stress, None if payload length is not valid               Optional[BusLoadStress]
+    """
+
+    if id_range is None:
+        frames = [frame.msg for frame in frame_table.get_frames()]
+    else:
+        try:
+            frames = generate_frames(id_first=id_range[0], id_last=id_range[1], length=length, fd=fd, brs=brs)
+        except ValueError as e:
+            print('Stress not started - {}'.format(e))
+            return None
+    return BusLoadStress(frames=frames, tx_pipeline=tx_pipeline, target_load=target_load,
+                         bitrate=bus_kwargs.get('bitrate', DEFAULT_BITRATE),
+                         data_bitrate=bus_kwargs.get('data_bitrate'))
@@ -2,8 +2,8 @@
 """
 This application ia a CAN generator which can be used with Vector hardware.
 Messages can be added, removed and modified using GUI. Also, they can be
-sent on trigger or periodically every 100ms. All changes in messages
-database are immediately saved in candb\db.csv.
+sent on trigger or periodically with period configured in database. All changes in messages
+database are immediately saved in candb/db.csv.
 
 This application requires CANoe installed and properly configured - it uses
 CANoe configuration.
@@ -11,8 +11,56 @@ CANoe configuration.
 No Vector license is needed to run this application and send CAN frames
 by Vector hardware.
 
+Simulation can be also used without GUI (on test rigs, CI) - from command line with --headless option or from
+Python scripts:
+    sim = Simulation(db_path='candb/db.csv', gui=False)
+    sim.run()
+    sim.set_sim_active(sim_en=True)
+    sim.add_msg(name='msg', msg_id='0x100', payload='0x01 0x02')
+    sim.set_msg_periodic(index=0, period_en=True)
+    sim.shutdown()
+
+Recorded traces (ASC, BLF, CSV) are streamed to the bus with original timing:
+    sim.start_replay(path='trace.blf', speed=2.0, id_filter=[0x100, 0x200], id_map={0x100: 0x101})
+
+Sent and received frames can be recorded to BLF/ASC files:
+    sim.start_recording(path='rec.blf', rotate_bytes=100 * 2 ** 20)
+
+Bus can be stressed at requested load with database messages or generated range of ids:
+    sim.start_stress(target_load=0.8, id_range=(0x100, 0x1FF))
+
+Payloads of running messages can be changed remotely at high rate over local control server (newline delimited JSON):
+    sim.start_control_server(port=29536)
+
+Scripted test sequences (enable/disable, payload, period, burst, wait) are compiled ahead of time and run with
+millisecond precision:
+    sim.run_scenario(path='test.scn')
+
+Several databases (profiles, e.g. vehicle variants) can be preloaded and switched while simulation is running, messages
+present in both profiles are sent without gap:
+    sim = Simulation(db_path='candb/variant_a.csv', profiles={'variant_b': 'candb/variant_b.csv'})
+    sim.switch_profile(name='variant_b')
+
+Received frames are monitored (per-id count, rate, intervals, last payload) and requests can be answered by database
+messages straight from RX thread:
+    sim.start_rx_monitor(filters=[parse_rx_filter(rx_filter='0x700/0x700')])
+    sim.add_rx_rule(request_id='0x7DF', response='0x7E8', payload='0x02 0x01 xx')
+
+Signals of messages defined in DBC file are set by physical values:
+    sim.load_dbc(path='candb/vehicle.dbc')
+    sim.set_signals(msg='EngineData', values={'EngineSpeed': 1500, 'CoolantTemp': 90.5})
+
 Execution:
-    $ python can_generator.py
+    $ python can_generator.py [--cyclic | --tx-process] [--db DB_PATH] [--import PATH] [--log-level LEVEL]
+                              [--headless [--duration S]] [--bus-type TYPE] [--channel CHANNEL ...]
+                              [--bitrate BITRATE ...] [--fd [--data-bitrate DATA_BITRATE ...]]
+                              [--replay PATH [--speed S] [--replay-filter ID ...] [--replay-remap OLD=NEW ...]
+                              [--replay-loop]] [--record PATH [--record-rotate-mb MB] [--record-rotate-s S]]
+                              [--stress LOAD [--stress-ids FIRST-LAST] [--stress-len N]]
+                              [--control-port PORT | --control-socket PATH] [--scenario PATH [--scenario-loop]]
+                              [--profile NAME=PATH ...] [--active-profile NAME]
+                              [--rx-monitor [--rx-filter ID[/MASK] ...] [--rx-bus-filter ID[/MASK] ...]
+                              [--rx-rule ID[:PAYLOAD]=RESPONSE ...]] [--dbc PATH]
 """
 
 
@@ -23,13 +71,31 @@ __license__ = 'MIT'
 __version__ = '1.0.1'
 
 
-import can
-import schedule
+import argparse
+import json
+import logging
+import os
 import time
 from threading import Thread
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple, Union
 
-from dbman import DataBaseMan
-from simgui import SimGui
+from busload import BusLoadStress
+from ctrlserver import ControlServer
+from dbcsignals import load_dbc_encoders
+from dbman import DataBaseMan, DB_FILE_PATH
+from frametable import CompiledFrame
+from msgregistry import EXT_ID_MAX, MsgRecord, format_msg_id, format_payload, is_payload_len_valid, parse_msg_id
+from profiles import ProfileManager
+from rxmonitor import RxFilter, RxRule, parse_rx_filter, parse_rx_id, parse_rx_pattern
+from scenario import ScenarioEngine, load_scenario
+from telemetry import TxTelemetry
+from txchannel import TxChannel, TxMode
+from txpipeline import TxPipeline
+from txprocess import TxProcess
+
+if TYPE_CHECKING:
+    """ pandas is imported only when messages are imported """
+    from msgimport import ImportResult
 
 
 class Simulation:
@@ -39,48 +105,317 @@ class Simulation:
     __vect_app_name = 'CANoe'
     __vect_channel = 0
     __vect_bitrate = 500000
+    __vect_data_bitrate = 2000000
+
+    def __init__(self, tx_mode: TxMode = TxMode.SCHEDULER, db_path: str = DB_FILE_PATH,
+                 bus_type: str = __vect_bus_type, channel=__vect_channel,
+                 bitrate: Union[int, Sequence[int]] = __vect_bitrate, fd: bool = False,
+                 data_bitrate: Union[int, Sequence[int]] = __vect_data_bitrate, gui: bool = True,
+                 profiles: Optional[Dict[str, str]] = None) -> None:
+        """
+        Setups buses, database and periodic transmission, one bus is opened per channel
+        Params:                                                                     type:
+        @param tx_mode: Periodic transmission by scheduler, cyclic tasks or process TxMode
+        @param db_path: Path to messages database (csv or SQLite)                   str
+        @param bus_type: python-can interface, e.g. 'vector' or 'virtual'           str
+        @param channel: Bus channel or list of channels, messages with database
+                        channel N are sent on N-th of them                          Any
+        @param bitrate: Bus bitrate or list of bitrates per channel                 Union[int, Sequence[int]]
+        @param fd: Open buses in CAN FD mode                                        bool
+        @param data_bitrate: CAN FD data phase bitrate or list per channel          Union[int, Sequence[int]]
+        @param gui: Create user interface                                           bool
+        @param profiles: Additional databases preloaded for switching, paths by
+                         profile name, db_path is active profile named by file     Optional[Dict[str, str]]
+        @return: None
+        """
 
-    def __init__(self) -> None:
         self.__sim_active = False
-        self.__bus = self.__config_vector_interface()
-        self.__database_man = DataBaseMan()
-        self.__sim_gui = SimGui(switch_sim_en_h=self.__switch_sim_en,
-                                add_msg_h=self.__database_man.add_msg,
-                                delete_msg_h=self.__database_man.delete_msg,
-                                modify_msg_h=self.__database_man.modify_msg,
-                                get_msg_db_h=self.__database_man.get_msg_db,
-                                send_msg_trig_h=self.__send_msg_trigger,
-                                version=__version__)
+        self.__profile_man = ProfileManager(profiles_d={ProfileManager.get_profile_name(db_path=db_path): db_path,
+                                                        **(profiles or {})})
+        bus_channels = list(channel) if isinstance(channel, (list, tuple)) else [channel]
+        bitrates = list(bitrate) if isinstance(bitrate, (list, tuple)) else [bitrate] * len(bus_channels)
+        data_bitrates = (list(data_bitrate) if isinstance(data_bitrate, (list, tuple))
+                         else [data_bitrate] * len(bus_channels))
+        self.__tx_channels = [TxChannel(channel=index, tx_mode=tx_mode,
+                                        bus_kwargs=self.__get_bus_kwargs(bus_type=bus_type, channel=bus_channel,
+                                                                         bitrate=channel_bitrate, fd=fd,
+                                                                         data_bitrate=channel_data_bitrate),
+                                        get_frame_table_h=self.__profile_man.get_frame_table)
+                              for index, (bus_channel, channel_bitrate, channel_data_bitrate) in
+                              enumerate(zip(bus_channels, bitrates, data_bitrates))]
+        frame_tables = [self.__profile_man.get_profile(name=name).get_frame_table()
+                        for name in self.__profile_man.get_profile_names()]
+        unknown_channels = sorted({index for frame_table in frame_tables for index in frame_table.get_channels()
+                                   if index >= len(self.__tx_channels)})
+        if unknown_channels:
+            print('Messages of channels {} will not be sent, only {} bus(es) configured'.format(
+                unknown_channels, len(self.__tx_channels)))
+        if not fd and any(frame.msg.is_fd for frame_table in frame_tables for frame in frame_table.get_frames()):
+            print('Database contains CAN FD messages but buses are not opened in CAN FD mode')
+        self.__profile_man.add_update_listener(self.__on_db_update)
+        self.__profile_man.add_payload_listener(self.__on_payload_update)
+        self.__sim_gui = self.__create_gui() if gui else None
         self.__sim_enabled = False
+        self.__control_server = None
+        self.__scenario = None
+        self.__rx_rules: List[RxRule] = []
 
-    def __switch_sim_en(self, sim_en: bool) -> None:
+    def __create_gui(self):
         """
-        Enables or disables simulation
+        Creates user interface, GUI module is imported only when needed
+        Params:                                                                     type:
+        @return: User interface                                                     SimGui
+        """
+
+        from simgui import SimGui
+        return SimGui(switch_sim_en_h=self.set_sim_active,
+                      add_msg_h=self.add_msg,
+                      delete_msg_h=self.delete_msg,
+                      modify_msg_h=self.modify_msg,
+                      get_msg_h=self.get_msg,
+                      get_msgs_num_h=self.get_msgs_num,
+                      send_msg_trig_h=self.send_msg,
+                      import_msgs_h=self.import_msgs,
+                      get_stats_h=self.format_stats,
+                      export_stats_h=self.export_stats,
+                      get_rx_stats_h=self.format_rx_stats,
+                      get_profiles_h=self.get_profile_names,
+                      get_active_profile_h=self.get_active_profile,
+                      switch_profile_h=self.switch_profile,
+                      version=__version__)
+
+    def __on_db_update(self) -> None:
+        """
+        Propagates changes of active database and profile switch to periodic transmission of all buses
         Params:                                                                     type:
-        @param sim_en: Simulation enable                                            bool
         @return: None
         """
 
-        self.__sim_active = sim_en
+        for tx_channel in self.__tx_channels:
+            tx_channel.on_db_update()
 
-    def __send_msgs_periodic(self) -> None:
+    def __on_payload_update(self, frames: List[CompiledFrame]) -> None:
         """
-        Sends messages from database if periodic transmission is enabled
+        Propagates live payload updates of active database to periodic transmission of all buses
         Params:                                                                     type:
+        @param frames: Frames with replaced payloads                                List[CompiledFrame]
         @return: None
         """
 
-        msg_config_df = self.__database_man.get_msg_db()
-        for df_row_id, row in msg_config_df.iterrows():
-            """ Check if periodic transmission is enabled """
-            if row['period_en']:
-                """ Send message """
-                self.__send_msg(msg_id=row['id'], payload=row['payload'])
-            else:
-                """ Periodic transmission not enabled - do nothing """
-                pass
+        for tx_channel in self.__tx_channels:
+            tx_channel.on_payload_update(frames=frames)
+
+    @staticmethod
+    def __get_bus_kwargs(bus_type: str, channel, bitrate: int, fd: bool, data_bitrate: int) -> dict:
+        """
+        Provides bus configuration, Vector hardware uses CANoe configuration
+        Params:                                                                     type:
+        @param bus_type: python-can interface                                       str
+        @param channel: Bus channel                                                 Any
+        @param bitrate: Bus bitrate                                                 int
+        @param fd: CAN FD mode                                                      bool
+        @param data_bitrate: CAN FD data phase bitrate                              int
+        @return: Arguments of python-can bus                                        dict
+        """
+
+        bus_kwargs = dict(bustype=bus_type, channel=channel, bitrate=bitrate)
+        if bus_type == Simulation.__vect_bus_type:
+            bus_kwargs['app_name'] = Simulation.__vect_app_name
+        if fd:
+            bus_kwargs.update(fd=True, data_bitrate=data_bitrate)
+        return bus_kwargs
+
+    """ ============================================= Class interface ============================================= """
+
+    def import_msgs(self, path: str) -> 'ImportResult':
+        """
+        Imports messages from csv or DBC file to database
+        Params:                                                                     type:
+        @param path: Path to csv or DBC file                                        str
+        @return: Number of imported messages and invalid rows                       ImportResult
+        """
+
+        from msgimport import ImportResult, read_msgs
+        try:
+            msgs_df = read_msgs(path=path)
+        except (OSError, ValueError) as e:
+            print('Could not read messages file:', e)
+            return ImportResult(imported_num=0, invalid_rows=[])
+        result = self.__profile_man.get_active().import_msgs(msgs_df=msgs_df)
+        if result.imported_num and os.path.splitext(path)[1].lower() == '.dbc':
+            """ Signals of imported messages can be set by physical values """
+            self.load_dbc(path=path)
+        return result
+
+    def load_dbc(self, path: str) -> bool:
+        """
+        Compiles signal encoders of DBC messages for active profile, database messages are matched by CAN id
+        Params:                                                                     type:
+        @param path: Path to DBC file                                               str
+        @return: Information if DBC was loaded                                      bool
+        """
+
+        try:
+            encoders_d = load_dbc_encoders(path=path)
+        except ImportError:
+            print('Could not import cantools, DBC files are not supported! Install it by: pip install cantools')
+            return False
+        except (OSError, ValueError) as e:
+            print('Could not read DBC file:', e)
+            return False
+        print('Signals loaded for {} messages'.format(self.__profile_man.get_active().set_encoders(
+            encoders_d=encoders_d)))
+        return True
+
+    def __find_msg(self, msg: str) -> Optional[MsgRecord]:
+        """
+        Finds message of active profile addressed by CAN id or name
+        Params:                                                                     type:
+        @param msg: CAN id, e.g. '0x100', or message name                           str
+        @return: Message record or None if not found                                Optional[MsgRecord]
+        @raise ValueError: CAN id is not a number
+        """
+
+        database_man = self.__profile_man.get_active()
+        if msg.lower().startswith('0x'):
+            return database_man.get_msg_by_id(can_id=parse_msg_id(msg_id=msg))
+        return database_man.get_msg_by_name(name=msg)
+
+    def set_signals(self, msg: str, values: Dict[str, float]) -> bool:
+        """
+        Sets signals of message by physical values, only bytes of changed signals are encoded and payload of
+        the compiled frame is replaced in place, frames table is not published again. Change is sent in the next
+        cycle and written to database file by control server flush or save
+        Params:                                                                     type:
+        @param msg: CAN id, e.g. '0x100', or message name                           str
+        @param values: Physical values by signal name                               Dict[str, float]
+        @return: Information if signals were set                                    bool
+        """
+
+        record = self.__find_msg(msg=msg)
+        if record is None:
+            print('Message {} not found'.format(msg))
+            return False
+        return self.__profile_man.get_active().update_signals_live(updates=[(record.handle, values)])[0]
+
+    def get_signals(self, msg: str) -> Dict[str, float]:
+        """
+        Provides physical values of message signals
+        Params:                                                                     type:
+        @param msg: CAN id, e.g. '0x100', or message name                           str
+        @return: Physical values by signal name, empty if message has no signals    Dict[str, float]
+        """
+
+        record = self.__find_msg(msg=msg)
+        return self.__profile_man.get_active().get_signals(handle=record.handle) if record is not None else {}
+
+    def add_msg(self, name: str, msg_id: str, payload: str, channel: int = 0, extended_id: Optional[bool] = None,
+                fd: bool = False, brs: bool = False, generators: str = '') -> bool:
+        """
+        Adds message to database
+        Params:                                                                     type:
+        @param name: Message name                                                   str
+        @param msg_id: CAN id, e.g. '0x100'                                         str
+        @param payload: Payload bytes, e.g. '0x01 0x02'                             str
+        @param channel: Index of the bus the message is sent on                     int
+        @param extended_id: 29-bit CAN id, None to use it only for ids over 11 bits Optional[bool]
+        @param fd: CAN FD frame, payload up to 64 bytes                             bool
+        @param brs: CAN FD bit rate switch                                          bool
+        @param generators: Payload generators, e.g. 'counter(bit=0,len=4)'          str
+        @return: Information if message was added                                   bool
+        """
 
-    def __send_msg_trigger(self, index: int) -> None:
+        return self.__profile_man.get_active().add_msg(name=name, msg_id=msg_id, payload=payload, channel=channel,
+                                                       extended_id=extended_id, fd=fd, brs=brs, generators=generators)
+
+    def modify_msg(self, index: int, name: str, msg_id: str, payload: str, period_en: bool,
+                   channel: Optional[int] = None, extended_id: Optional[bool] = None, fd: Optional[bool] = None,
+                   brs: Optional[bool] = None, generators: Optional[str] = None) -> bool:
+        """
+        Modifies message in database
+        Params:                                                                     type:
+        @param index: Index of the message in database                              int
+        @param name: Message name                                                   str
+        @param msg_id: CAN id, e.g. '0x100'                                         str
+        @param payload: Payload bytes, e.g. '0x01 0x02'                             str
+        @param period_en: Period transmission enabled                               bool
+        @param channel: Index of the bus, None to keep current one                  Optional[int]
+        @param extended_id: 29-bit CAN id, None to keep current one                 Optional[bool]
+        @param fd: CAN FD frame, None to keep current one                           Optional[bool]
+        @param brs: CAN FD bit rate switch, None to keep current one                Optional[bool]
+        @param generators: Payload generators, None to keep current ones            Optional[str]
+        @return: Information if message was modified                                bool
+        """
+
+        return self.__profile_man.get_active().modify_msg(index=index, name=name, msg_id=msg_id, payload=payload,
+                                                          period_en=period_en, channel=channel,
+                                                          extended_id=extended_id, fd=fd, brs=brs,
+                                                          generators=generators)
+
+    def set_msg_periodic(self, index: int, period_en: bool) -> bool:
+        """
+        Enables or disables periodic transmission of message
+        Params:                                                                     type:
+        @param index: Index of the message in database                              int
+        @param period_en: Period transmission enabled                               bool
+        @return: Information if message was modified                                bool
+        """
+
+        database_man = self.__profile_man.get_active()
+        record = database_man.get_msg_at(index=index)
+        if record is not None:
+            return database_man.modify_msg_by_handle(handle=record.handle, name=record.name,
+                                                     msg_id=format_msg_id(can_id=record.can_id),
+                                                     payload=format_payload(payload=record.payload),
+                                                     period_en=period_en)
+        else:
+            """ Message not found in database """
+            return False
+
+    def delete_msg(self, index: int) -> None:
+        """
+        Deletes message from database
+        Params:                                                                     type:
+        @param index: Index of the message in database                              int
+        @return: None
+        """
+
+        self.__profile_man.get_active().delete_msg(index=index)
+
+    def get_msg(self, index: int) -> Optional[MsgRecord]:
+        """
+        Provides message from database
+        Params:                                                                     type:
+        @param index: Index of the message in database                              int
+        @return: Message record or None if index is out of range                    Optional[MsgRecord]
+        """
+
+        return self.__profile_man.get_active().get_msg_at(index=index)
+
+    def get_msgs_num(self) -> int:
+        """
+        Provides number of messages in database
+        Params:                                                                     type:
+        @return: Number of messages                                                 int
+        """
+
+        return self.__profile_man.get_active().get_msgs_num()
+
+    def set_sim_active(self, sim_en: bool) -> None:
+        """
+        Enables or disables simulation
+        Params:                                                                     type:
+        @param sim_en: Simulation enable                                            bool
+        @return: None
+        """
+
+        if not sim_en:
+            self.stop_scenario()
+        self.__sim_active = sim_en
+        for tx_channel in self.__tx_channels:
+            tx_channel.set_active(active=sim_en)
+
+    def send_msg(self, index: int) -> None:
         """
         Sends specified message once
         Params:                                                                     type:
@@ -88,59 +423,490 @@ class Simulation:
         @return: None
         """
 
-        msg_db_df = self.__database_man.get_msg_db()
-        self.__send_msg(msg_id=msg_db_df.at[index, 'id'], payload=msg_db_df.at[index, 'payload'])
+        handle = self.__profile_man.get_active().get_handle(index=index)
+        if handle is not None:
+            self.__send_msg_by_handle(handle=handle)
 
-    def __send_msg(self, msg_id: str, payload: str) -> None:
+    def __send_msg_by_handle(self, handle: int, count: int = 1) -> None:
         """
-        Performs sending message
+        Sends specified message once or as a burst of frames
         Params:                                                                     type:
-        @param msg_id: Id of CAN message                                            int
-        @param payload: Payload of CAN message                                      str
+        @param handle: Handle of the message                                        int
+        @param count: Number of frames                                              int
         @return: None
         """
 
-        if self.__sim_active:
-            msg = can.Message(arbitration_id=int(msg_id, 16), data=[int(B, 16) for B in payload.split(' ')],
-                              extended_id=False)
-            try:
-                self.__bus.flush_tx_buffer()
-                self.__bus.send(msg)
-                print('Message sent: [{}] {}'.format(msg_id, payload))
-            except (can.CanError, AttributeError):
-                print('Error! Message not sent:', msg_id)
-                pass
+        frame = self.__profile_man.get_active().get_frame_table().get_frame_by_handle(handle=handle)
+        if self.__sim_active and frame is not None and frame.channel < len(self.__tx_channels):
+            self.__tx_channels[frame.channel].send(frame=frame, count=count)
         else:
-            """ Simulation is not active, do nothing """
+            """ Simulation is not active, message not found in database or its bus not configured, do nothing """
             pass
 
-    def __scheduler(self) -> None:
+    def start_replay(self, path: str, speed: float = 1.0, id_filter: Optional[Sequence[int]] = None,
+                     id_map: Optional[Dict[int, int]] = None, channel_map: Optional[Dict[Any, int]] = None,
+                     loop: bool = False) -> bool:
         """
-        Triggers sending messages every 100ms if configured
+        Starts replay of log file, frames are sent by TX pipelines of buses alongside periodic messages
+        Params:                                                                     type:
+        @param path: Path to log file (ASC, BLF, CSV, ...)                          str
+        @param speed: Timing scale, 2.0 is twice as fast, 0 sends at maximal speed  float
+        @param id_filter: CAN ids to be sent, None to send all                      Optional[Sequence[int]]
+        @param id_map: CAN ids to be replaced, original id: sent id                 Optional[Dict[int, int]]
+        @param channel_map: Bus of every log channel, log channel: database
+                            channel, None to send whole log on channel 0            Optional[Dict[Any, int]]
+        @param loop: Start again from beginning when end of log is reached          bool
+        @return: Information if replay was started                                  bool
+        """
+
+        if channel_map is None:
+            log_channels_d = {0: None}
+        else:
+            log_channels_d = {}
+            for log_channel, channel in channel_map.items():
+                log_channels_d.setdefault(channel, []).append(log_channel)
+        unknown_channels = [channel for channel in log_channels_d if not 0 <= channel < len(self.__tx_channels)]
+        if unknown_channels:
+            print('Replay not started - channels {} not configured'.format(unknown_channels))
+            return False
+
+        return all([self.__tx_channels[channel].start_replay(path=path, speed=speed, id_filter=id_filter,
+                                                              id_map=id_map, log_channels=log_channels, loop=loop)
+                    for channel, log_channels in log_channels_d.items()])
+
+    def stop_replay(self) -> None:
+        """
+        Stops replay of log file on all buses
         Params:                                                                     type:
         @return: None
         """
 
-        schedule.every(0.1).seconds.do(self.__send_msgs_periodic)
-        while True:
-            schedule.run_pending()
-            time.sleep(0.01)
+        for tx_channel in self.__tx_channels:
+            tx_channel.stop_replay()
 
-    @staticmethod
-    def __config_vector_interface() -> can.interface.Bus:
+    def is_replay_running(self) -> bool:
+        """
+        Provides replay state
+        Params:                                                                     type:
+        @return: Information if log is being replayed on any bus                    bool
+        """
+
+        return any(tx_channel.is_replay_running() for tx_channel in self.__tx_channels)
+
+    def start_recording(self, path: str, rx: bool = True, rotate_bytes: Optional[int] = None,
+                        rotate_s: Optional[float] = None) -> None:
+        """
+        Starts recording of sent and received frames, every bus is recorded to its own file if more buses are used
+        Params:                                                                     type:
+        @param path: Path to log file (.blf, .asc), e.g. 'rec.blf' is recorded
+                     to 'rec_ch0.blf', 'rec_ch1.blf' for more buses                str
+        @param rx: Record also received frames                                      bool
+        @param rotate_bytes: Start new file when log reaches size, None to disable  Optional[int]
+        @param rotate_s: Start new file after time in seconds, None to disable      Optional[float]
+        @return: None
+        """
+
+        base, ext = os.path.splitext(path)
+        for tx_channel in self.__tx_channels:
+            tx_channel.start_recording(path=(path if len(self.__tx_channels) == 1
+                                             else '{}_ch{}{}'.format(base, tx_channel.get_channel(), ext)),
+                                       rx=rx, rotate_bytes=rotate_bytes, rotate_s=rotate_s)
+
+    def stop_recording(self) -> None:
+        """
+        Stops recording on all buses, buffered frames are written to log files
+        Params:                                                                     type:
+        @return: None
+        """
+
+        for tx_channel in self.__tx_channels:
+            tx_channel.stop_recording()
+
+    def get_recording_stats(self) -> Dict[str, Any]:
+        """
+        Provides recording statistics of all buses
+        Params:                                                                     type:
+        @return: Statistics by channel                                              Dict[str, Any]
+        """
+
+        return {'channel {}'.format(tx_channel.get_channel()): tx_channel.get_recording_stats()
+                for tx_channel in self.__tx_channels}
+
+    def start_stress(self, target_load: float, id_range: Optional[Tuple[int, int]] = None, length: int = 8,
+                     fd: bool = False, brs: bool = False, channels: Optional[Sequence[int]] = None) -> bool:
+        """
+        Starts sending frames at requested bus load, every bus sends its own database messages or generated frames
+        Params:                                                                     type:
+        @param target_load: Requested bus load 0.0-1.0, BusLoadStress.SATURATE
+                            keeps TX queues full                                    float
+        @param id_range: First and last CAN id, None to send database messages      Optional[Tuple[int, int]]
+        @param length: Payload length of generated frames                           int
+        @param fd: Generated frames are CAN FD                                      bool
+        @param brs: Generated frames use CAN FD bit rate switch                     bool
+        @param channels: Buses to be stressed, None for all                         Optional[Sequence[int]]
+        @return: Information if stress was started on all buses                     bool
+        """
+
+        if target_load <= 0:
+            print('Stress not started - bus load must be positive')
+            return False
+        if id_range is not None and not is_payload_len_valid(length=length, fd=fd):
+            print('Stress not started - payload length {} is not valid for {} frames'.format(
+                length, 'CAN FD' if fd else 'CAN'))
+            return False
+        return all([tx_channel.start_stress(target_load=target_load, id_range=id_range, length=length, fd=fd, brs=brs)
+                    for tx_channel in self.__tx_channels if channels is None or tx_channel.get_channel() in channels])
+
+    def stop_stress(self) -> None:
+        """
+        Stops bus load stress on all buses
+        Params:                                                                     type:
+        @return: None
+        """
+
+        for tx_channel in self.__tx_channels:
+            tx_channel.stop_stress()
+
+    def get_stress_stats(self) -> Dict[str, Any]:
+        """
+        Provides requested and achieved load of all buses
+        Params:                                                                     type:
+        @return: Loads in percent and frames per second by channel                  Dict[str, Any]
+        """
+
+        return {'channel {}'.format(tx_channel.get_channel()): tx_channel.get_stress_stats()
+                for tx_channel in self.__tx_channels}
+
+    def format_stress_stats(self) -> str:
+        """
+        Provides requested and achieved load of all stressed buses as human readable text
+        Params:                                                                     type:
+        @return: Bus load summary                                                   str
+        """
+
+        return ', '.join('{}: {:.1f}% of {:.1f}%, {:.0f} frames/s'.format(
+            channel, stats['achieved_load_pct'], stats['target_load_pct'], stats['frames_per_s'])
+            for channel, stats in self.get_stress_stats().items() if stats)
+
+    def start_control_server(self, port: Optional[int] = None, unix_path: Optional[str] = None,
+                             host: str = '127.0.0.1', flush_delay_s: Optional[float] = 1.0) -> bool:
         """
-        Performs Vector hardware configuration
+        Starts server accepting batched payload and period enable updates of running messages
         Params:                                                                     type:
-        @return: Configured bus object                                              can.interface.Bus
+        @param port: TCP port, not used if unix_path is given                       Optional[int]
+        @param unix_path: Path to Unix socket                                       Optional[str]
+        @param host: TCP address to listen on                                       str
+        @param flush_delay_s: Write changes to database file when no update came
+                              for given time, None to write only on save request   Optional[float]
+        @return: Information if server is listening                                 bool
         """
+
+        self.stop_control_server()
+        self.__control_server = ControlServer(get_database_man_h=self.__profile_man.get_active,
+                                              flush_h=self.__profile_man.flush, host=host, port=port,
+                                              unix_path=unix_path, flush_delay_s=flush_delay_s)
+        if not self.__control_server.start():
+            self.__control_server = None
+            return False
+        print('Control server listening on {}'.format(self.__control_server.get_address()))
+        return True
+
+    def stop_control_server(self) -> None:
+        """
+        Stops control server, pending changes are written to database file
+        Params:                                                                     type:
+        @return: None
+        """
+
+        if self.__control_server is not None:
+            self.__control_server.stop()
+            self.__control_server = None
+
+    def run_scenario(self, path: str, loop: bool = False) -> bool:
+        """
+        Compiles scenario file and starts it, scenario in progress is stopped
+        Params:                                                                     type:
+        @param path: Path to scenario file                                          str
+        @param loop: Run scenario repeatedly until stopped                          bool
+        @return: Information if scenario was started                                bool
+        """
+
+        if not self.__sim_active:
+            print('Scenario not started - simulation is not active')
+            return False
+
+        self.stop_scenario()
         try:
-            return can.interface.Bus(bustype=Simulation.__vect_bus_type, app_name=Simulation.__vect_app_name,
-                                     channel=Simulation.__vect_channel, bitrate=Simulation.__vect_bitrate)
+            steps = load_scenario(path=path, database_man=self.__profile_man.get_active())
+        except (OSError, ValueError) as e:
+            print('Scenario INVALID! {}'.format(e))
+            return False
+        self.__scenario = ScenarioEngine(steps=steps, update_msgs_h=self.__profile_man.get_active().update_msgs_live,
+                                         send_msg_h=self.__send_msg_by_handle, loop=loop)
+        self.__scenario.start()
+        return True
 
-        except ImportError:
-            print('Could not import Vector hardware configuration!')
+    def stop_scenario(self) -> None:
+        """
+        Stops scenario, messages keep state set by executed steps
+        Params:                                                                     type:
+        @return: None
+        """
 
-    """ ============================================= Class interface ============================================= """
+        if self.__scenario is not None:
+            self.__scenario.stop()
+            self.__scenario = None
+
+    def is_scenario_running(self) -> bool:
+        """
+        Provides scenario state
+        Params:                                                                     type:
+        @return: Information if scenario is running                                 bool
+        """
+
+        return self.__scenario is not None and self.__scenario.is_running()
+
+    def get_scenario_stats(self) -> Dict[str, Any]:
+        """
+        Provides scenario progress
+        Params:                                                                     type:
+        @return: Executed steps and maximal step latency, empty if not started      Dict[str, Any]
+        """
+
+        return self.__scenario.get_stats() if self.__scenario is not None else {}
+
+    def start_rx_monitor(self, filters: Optional[Sequence[RxFilter]] = None,
+                         bus_filters: Optional[Sequence[RxFilter]] = None,
+                         channels: Optional[Sequence[int]] = None) -> bool:
+        """
+        Starts statistics of received frames and request/response rules, monitor in progress is restarted
+        Params:                                                                     type:
+        @param filters: Monitor acceptance filters, None to monitor all frames      Optional[Sequence[RxFilter]]
+        @param bus_filters: Driver/hardware acceptance filters, they apply also to
+                            recording, None to receive all frames                   Optional[Sequence[RxFilter]]
+        @param channels: Buses to be monitored, None for all                        Optional[Sequence[int]]
+        @return: Information if monitor was started on all buses                    bool
+        """
+
+        started = all([tx_channel.start_rx_monitor(send_msg_h=self.__send_msg_by_handle, filters=filters,
+                                                   bus_filters=bus_filters)
+                       for tx_channel in self.__tx_channels
+                       if channels is None or tx_channel.get_channel() in channels])
+        self.__apply_rx_rules()
+        return started
+
+    def stop_rx_monitor(self) -> None:
+        """
+        Stops statistics of received frames and request/response rules on all buses
+        Params:                                                                     type:
+        @return: None
+        """
+
+        for tx_channel in self.__tx_channels:
+            tx_channel.stop_rx_monitor()
+
+    def __apply_rx_rules(self) -> None:
+        """
+        Provides request/response rules to monitors of all buses
+        Params:                                                                     type:
+        @return: None
+        """
+
+        for tx_channel in self.__tx_channels:
+            rx_monitor = tx_channel.get_rx_monitor()
+            if rx_monitor is not None:
+                rx_monitor.set_rules(rules=self.__rx_rules)
+
+    def add_rx_rule(self, request_id: str, response: str, payload: str = '') -> bool:
+        """
+        Adds rule sending database message when request is received on any monitored bus
+        Params:                                                                     type:
+        @param request_id: CAN id of request, e.g. '0x7DF', extended id with 'x'
+                           suffix, e.g. '0x100x'                                    str
+        @param response: CAN id or name of response message in database            str
+        @param payload: Leading bytes of request payload, xx matches any byte,
+                        e.g. '0x02 0x01 xx', empty to answer any payload           str
+        @return: Information if rule was added                                      bool
+        """
+
+        try:
+            can_id, extended_id = parse_rx_id(rx_id=request_id)
+            data, mask = parse_rx_pattern(pattern=payload)
+            record = self.__find_msg(msg=response)
+        except ValueError as e:
+            print('RX rule INVALID! {}'.format(e))
+            return False
+        if record is None:
+            print('RX rule INVALID! Response {} not found in database'.format(response))
+            return False
+        self.__rx_rules.append(RxRule(can_id=can_id, response_handle=record.handle, data=data, mask=mask,
+                                      extended_id=extended_id))
+        self.__apply_rx_rules()
+        return True
+
+    def clear_rx_rules(self) -> None:
+        """
+        Removes all request/response rules
+        Params:                                                                     type:
+        @return: None
+        """
+
+        self.__rx_rules = []
+        self.__apply_rx_rules()
+
+    def get_rx_stats(self) -> Dict[str, Any]:
+        """
+        Provides statistics of received frames of all monitored buses
+        Params:                                                                     type:
+        @return: Statistics by channel                                              Dict[str, Any]
+        """
+
+        return {'channel {}'.format(tx_channel.get_channel()): tx_channel.get_rx_monitor().get_stats()
+                for tx_channel in self.__tx_channels if tx_channel.get_rx_monitor() is not None}
+
+    def format_rx_stats(self) -> str:
+        """
+        Provides statistics of received frames of all monitored buses as human readable text
+        Params:                                                                     type:
+        @return: Statistics summary                                                 str
+        """
+
+        rx_monitors = [(tx_channel.get_channel(), tx_channel.get_rx_monitor()) for tx_channel in self.__tx_channels]
+        return '\n\n'.join('channel {}\n{}'.format(channel, rx_monitor.format_stats())
+                           for channel, rx_monitor in rx_monitors
+                           if rx_monitor is not None) or 'RX monitor not started'
+
+    def switch_profile(self, name: str) -> bool:
+        """
+        Makes preloaded profile active, buses send its messages from the next cycle without restart, messages with
+        the same CAN id and period in both profiles keep their timing. Scenario in progress is stopped and RX rules
+        are cleared as they refer to messages of previous profile
+        Params:                                                                     type:
+        @param name: Profile name                                                   str
+        @return: Information if profile was switched                                bool
+        """
+
+        if name == self.__profile_man.get_active_name():
+            return True
+        if name not in self.__profile_man.get_profile_names():
+            print('Profile {} not found'.format(name))
+            return False
+        self.stop_scenario()
+        if self.__rx_rules:
+            print('RX rules cleared - responses were messages of previous profile')
+            self.clear_rx_rules()
+        return self.__profile_man.switch(name=name)
+
+    def add_profile(self, name: str, db_path: str) -> bool:
+        """
+        Loads database as additional profile, it can be switched to without disk access
+        Params:                                                                     type:
+        @param name: Profile name                                                   str
+        @param db_path: Path to messages database (csv or SQLite)                   str
+        @return: Information if profile was added                                   bool
+        """
+
+        return self.__profile_man.add_profile(name=name, db_path=db_path)
+
+    def get_profile_names(self) -> List[str]:
+        """
+        Provides names of all preloaded profiles
+        Params:                                                                     type:
+        @return: Profile names                                                      List[str]
+        """
+
+        return self.__profile_man.get_profile_names()
+
+    def get_active_profile(self) -> str:
+        """
+        Provides name of active profile
+        Params:                                                                     type:
+        @return: Profile name                                                       str
+        """
+
+        return self.__profile_man.get_active_name()
+
+    def get_database_man(self) -> DataBaseMan:
+        """
+        Provides messages database manager of active profile
+        Params:                                                                     type:
+        @return: Messages database manager                                          DataBaseMan
+        """
+
+        return self.__profile_man.get_active()
+
+    def get_tx_channels(self) -> List[TxChannel]:
+        """
+        Provides transmission of all buses
+        Params:                                                                     type:
+        @return: TX channels in database channel order                              List[TxChannel]
+        """
+
+        return self.__tx_channels
+
+    def get_telemetry(self, channel: int = 0) -> TxTelemetry:
+        """
+        Provides statistics of frames sent on specified bus
+        Params:                                                                     type:
+        @param channel: Index of the bus                                            int
+        @return: TX telemetry                                                       TxTelemetry
+        """
+
+        return self.__tx_channels[channel].get_telemetry()
+
+    def get_tx_process(self, channel: int = 0) -> Optional[TxProcess]:
+        """
+        Provides TX process controller of specified bus
+        Params:                                                                     type:
+        @param channel: Index of the bus                                            int
+        @return: TX process, None if transmission runs in this process              Optional[TxProcess]
+        """
+
+        return self.__tx_channels[channel].get_tx_process()
+
+    def get_tx_pipeline(self, channel: int = 0) -> TxPipeline:
+        """
+        Provides TX pipeline of specified bus
+        Params:                                                                     type:
+        @param channel: Index of the bus                                            int
+        @return: TX pipeline                                                        TxPipeline
+        """
+
+        return self.__tx_channels[channel].get_tx_pipeline()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Provides TX statistics of all buses
+        Params:                                                                     type:
+        @return: Statistics by channel                                              Dict[str, Any]
+        """
+
+        return {'channel {}'.format(tx_channel.get_channel()): tx_channel.get_stats()
+                for tx_channel in self.__tx_channels}
+
+    def format_stats(self) -> str:
+        """
+        Provides TX statistics of all buses as human readable text
+        Params:                                                                     type:
+        @return: Statistics summary                                                 str
+        """
+
+        return '\n\n'.join('channel {}\n{}'.format(tx_channel.get_channel(), tx_channel.format_stats())
+                           for tx_channel in self.__tx_channels)
+
+    def export_stats(self, path: str) -> None:
+        """
+        Saves TX statistics of all buses to file, JSON if path ends with .json, text otherwise
+        Params:                                                                     type:
+        @param path: Path to output file                                            str
+        @return: None
+        """
+
+        with open(path, 'w') as stats_file:
+            if path.lower().endswith('.json'):
+                json.dump(self.get_stats(), stats_file, indent=2)
+            else:
+                stats_file.write(self.format_stats())
 
     def run(self) -> None:
         """
@@ -149,10 +915,193 @@ class Simulation:
         @return: None
         """
 
-        Thread(target=self.__sim_gui.run_gui).start()
-        Thread(target=self.__scheduler).start()
+        for tx_channel in self.__tx_channels:
+            tx_channel.start(daemon=self.__sim_gui is None)
+        if self.__sim_gui is not None:
+            Thread(target=self.__sim_gui.run_gui).start()
+        else:
+            """ Running without user interface """
+            pass
+
+    def shutdown(self) -> None:
+        """
+        Stops periodic transmission, TX pipelines and releases buses, pending changes are written to database files
+        Params:                                                                     type:
+        @return: None
+        """
+
+        self.stop_scenario()
+        self.__sim_active = False
+        self.stop_control_server()
+        for tx_channel in self.__tx_channels:
+            tx_channel.stop()
+        self.__profile_man.flush()
 
 
 if __name__ == '__main__':
-    sim = Simulation()
+    parser = argparse.ArgumentParser(description='CAN generator for Vector hardware')
+    tx_group = parser.add_mutually_exclusive_group()
+    tx_group.add_argument('--cyclic', action='store_true',
+                          help='send periodic messages by bus cyclic tasks (driver/hardware where supported)')
+    tx_group.add_argument('--tx-process', action='store_true',
+                          help='run TX scheduler and bus in a separate process, isolated from the GUI')
+    parser.add_argument('--db', default=DB_FILE_PATH,
+                        help='messages database, *.csv or SQLite (*.sqlite, *.sqlite3, *.db)')
+    parser.add_argument('--import', dest='import_path', metavar='PATH',
+                        help='import messages from csv or DBC file to database before start')
+    parser.add_argument('--headless', action='store_true',
+                        help='run without GUI, simulation is started immediately, stop with Ctrl+C')
+    parser.add_argument('--duration', type=float, metavar='S',
+                        help='headless run time in seconds, runs until interrupted if not given')
+    parser.add_argument('--bus-type', default='vector', help='python-can interface, e.g. vector, virtual, socketcan')
+    parser.add_argument('--channel', nargs='+', default=['0'],
+                        help='bus channels, messages with database channel N are sent on N-th of them')
+    parser.add_argument('--bitrate', type=int, nargs='+', default=[500000], help='bitrate of every bus')
+    parser.add_argument('--fd', action='store_true', help='open buses in CAN FD mode')
+    parser.add_argument('--data-bitrate', type=int, nargs='+', default=[2000000],
+                        help='CAN FD data phase bitrate of every bus')
+    parser.add_argument('--replay', metavar='PATH', help='replay log file (ASC, BLF, CSV) in headless mode')
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help='replay timing scale, 2.0 is twice as fast, 0 sends at maximal speed')
+    parser.add_argument('--replay-filter', nargs='+', metavar='ID', help='replay only specified CAN ids, e.g. 0x100')
+    parser.add_argument('--replay-remap', nargs='+', metavar='OLD=NEW', help='replace CAN ids, e.g. 0x100=0x101')
+    parser.add_argument('--replay-loop', action='store_true', help='replay log file in a loop')
+    parser.add_argument('--record', metavar='PATH', help='record sent and received frames to BLF/ASC file')
+    parser.add_argument('--record-rotate-mb', type=float, metavar='MB', help='start new record file at size in MB')
+    parser.add_argument('--record-rotate-s', type=float, metavar='S', help='start new record file after S seconds')
+    parser.add_argument('--stress', metavar='LOAD',
+                        help='headless bus load stress in percent, e.g. 30, or max to saturate the bus')
+    parser.add_argument('--stress-ids', metavar='FIRST-LAST',
+                        help='stress with generated range of ids, e.g. 0x100-0x1FF, database messages if not given')
+    parser.add_argument('--stress-len', type=int, default=8, metavar='N', help='payload length of generated frames')
+    control_group = parser.add_mutually_exclusive_group()
+    control_group.add_argument('--control-port', type=int, metavar='PORT',
+                               help='start control server for remote payload updates on local TCP port')
+    control_group.add_argument('--control-socket', metavar='PATH',
+                               help='start control server for remote payload updates on Unix socket')
+    parser.add_argument('--scenario', metavar='PATH', help='run scenario file in headless mode')
+    parser.add_argument('--scenario-loop', action='store_true', help='run scenario repeatedly')
+    parser.add_argument('--profile', nargs='+', metavar='NAME=PATH',
+                        help='preload additional databases as named profiles, e.g. variant_b=candb/variant_b.csv')
+    parser.add_argument('--active-profile', metavar='NAME', help='profile active at start, --db profile if not given')
+    parser.add_argument('--rx-monitor', action='store_true',
+                        help='monitor received frames (per-id count, rate, intervals, last payload)')
+    parser.add_argument('--rx-filter', nargs='+', metavar='ID[/MASK]',
+                        help='monitor only matching ids, e.g. 0x100 or 0x700/0x700, x suffix marks extended id, '
+                             'e.g. 0x100x')
+    parser.add_argument('--rx-bus-filter', nargs='+', metavar='ID[/MASK]',
+                        help='driver/hardware acceptance filters of buses, they apply also to recording')
+    parser.add_argument('--rx-rule', nargs='+', metavar='ID[:PAYLOAD]=RESPONSE',
+                        help='send database message (id or name) when request is received, e.g. 0x7DF=0x7E8 or '
+                             '"0x7DF:0x02 0x01 xx=EngineResp", x suffix marks extended request id, e.g. 0x100x')
+    parser.add_argument('--dbc', metavar='PATH', help='DBC file with signals of database messages')
+    parser.add_argument('--log-level', default='WARNING', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help='logging level, DEBUG logs every sent frame')
+    args = parser.parse_args()
+    if args.replay and not args.headless:
+        parser.error('--replay requires --headless')
+    if args.stress and not args.headless:
+        parser.error('--stress requires --headless')
+    if args.scenario and not args.headless:
+        parser.error('--scenario requires --headless')
+    if (args.rx_filter or args.rx_bus_filter or args.rx_rule) and not args.rx_monitor:
+        parser.error('--rx-filter, --rx-bus-filter and --rx-rule require --rx-monitor')
+    try:
+        rx_filters = [parse_rx_filter(rx_filter=rx_filter) for rx_filter in args.rx_filter or []]
+        rx_bus_filters = [parse_rx_filter(rx_filter=rx_filter) for rx_filter in args.rx_bus_filter or []]
+    except ValueError:
+        parser.error('--rx-filter and --rx-bus-filter must be CAN ids with optional mask, e.g. 0x700/0x700')
+    if args.stress is None:
+        stress_load = None
+    elif args.stress.lower() in ('max', 'saturate'):
+        stress_load = BusLoadStress.SATURATE
+    else:
+        try:
+            stress_load = float(args.stress.rstrip('%')) / 100
+        except ValueError:
+            parser.error('--stress must be percent of bus load or max')
+    try:
+        stress_ids = (None if args.stress_ids is None
+                      else tuple(parse_msg_id(msg_id=msg_id) for msg_id in args.stress_ids.split('-', 1)))
+    except ValueError:
+        parser.error('--stress-ids must be range of CAN ids, e.g. 0x100-0x1FF')
+    if stress_ids is not None and not is_payload_len_valid(length=args.stress_len, fd=args.fd):
+        parser.error('--stress-len must be 0-8, or with --fd one of 0-8, 12, 16, 20, 24, 32, 48, 64')
+    try:
+        replay_filter = (None if args.replay_filter is None
+                         else [parse_msg_id(msg_id=msg_id) for msg_id in args.replay_filter])
+    except ValueError:
+        parser.error('--replay-filter must be CAN ids, e.g. 0x100')
+    replay_map = {}
+    for remap in args.replay_remap or []:
+        old_id, sep, new_id = remap.partition('=')
+        try:
+            old_id, new_id = parse_msg_id(msg_id=old_id), parse_msg_id(msg_id=new_id)
+        except ValueError:
+            old_id = new_id = None
+        if not sep or old_id is None or not 0 <= old_id <= EXT_ID_MAX or not 0 <= new_id <= EXT_ID_MAX:
+            parser.error('--replay-remap must be pairs of CAN ids OLD=NEW, e.g. 0x100=0x101, got {}'.format(remap))
+        replay_map[old_id] = new_id
+    profiles = {}
+    for profile in args.profile or []:
+        name, sep, path = profile.partition('=')
+        if not sep or not name or not path:
+            parser.error('--profile must be NAME=PATH, e.g. variant_b=candb/variant_b.csv')
+        profiles[name] = path
+    logging.basicConfig(level=args.log_level, format='%(asctime)s %(name)s %(levelname)s: %(message)s')
+
+    tx_mode = TxMode.CYCLIC_TASKS if args.cyclic else TxMode.TX_PROCESS if args.tx_process else TxMode.SCHEDULER
+    channels = [int(channel) if channel.isdigit() else channel for channel in args.channel]
+    sim = Simulation(tx_mode=tx_mode, db_path=args.db, bus_type=args.bus_type, channel=channels,
+                     bitrate=args.bitrate if len(args.bitrate) > 1 else args.bitrate * len(channels), fd=args.fd,
+                     data_bitrate=(args.data_bitrate if len(args.data_bitrate) > 1
+                                   else args.data_bitrate * len(channels)),
+                     gui=not args.headless, profiles=profiles)
+    if args.active_profile:
+        sim.switch_profile(name=args.active_profile)
+    if args.import_path:
+        sim.import_msgs(path=args.import_path)
+    if args.dbc:
+        sim.load_dbc(path=args.dbc)
     sim.run()
+    if args.control_port is not None or args.control_socket:
+        sim.start_control_server(port=args.control_port, unix_path=args.control_socket)
+    if args.rx_monitor:
+        sim.start_rx_monitor(filters=rx_filters, bus_filters=rx_bus_filters)
+        for rx_rule in args.rx_rule or []:
+            request, _, response = rx_rule.rpartition('=')
+            request_id, _, payload = request.partition(':')
+            sim.add_rx_rule(request_id=request_id, response=response, payload=payload)
+    if args.record:
+        sim.start_recording(path=args.record,
+                            rotate_bytes=int(args.record_rotate_mb * 2 ** 20) if args.record_rotate_mb else None,
+                            rotate_s=args.record_rotate_s)
+
+    if args.headless:
+        sim.set_sim_active(sim_en=True)
+        if args.replay:
+            sim.start_replay(path=args.replay, speed=args.speed, id_filter=replay_filter, id_map=replay_map,
+                             loop=args.replay_loop)
+        if args.scenario:
+            sim.run_scenario(path=args.scenario, loop=args.scenario_loop)
+        if stress_load is not None:
+            sim.start_stress(target_load=stress_load, id_range=stress_ids, length=args.stress_len, fd=args.fd,
+                             brs=args.fd)
+        try:
+            end = None if args.duration is None else time.monotonic() + args.duration
+            last_report = time.monotonic()
+            while end is None or time.monotonic() < end:
+                if (end is None and (args.replay or args.scenario) and not sim.is_replay_running() and
+                        not sim.is_scenario_running()):
+                    """ Run until whole log is sent and scenario finished """
+                    break
+                time.sleep(0.1 if end is None else max(min(0.1, end - time.monotonic()), 0))
+                if stress_load is not None and time.monotonic() - last_report >= 1:
+                    """ Live report of achieved bus load """
+                    last_report = time.monotonic()
+                    print(sim.format_stress_stats())
+        except KeyboardInterrupt:
+            pass
+        if args.rx_monitor:
+            print(sim.format_rx_stats())
+        sim.shutdown()
@@ -0,0 +1,315 @@
+# -*- coding: utf-8 -*-
+"""
+This module includes definition of class ControlServer - local asyncio server for remote control of running
+simulation (e.g. by HIL plant model). Clients connect over TCP or Unix socket and send newline delimited JSON requests,
+every request gets one JSON response line:
+    {"cmd": "update", "msgs": [{"id": "0x100", "payload": "0x01 0x02"}, {"name": "msg", "period_en": true}]}
+    {"ok": true, "applied": 2, "failed": []}
+Messages with DBC signals can be updated by physical values: {"id": "0x100", "signals": {"EngineSpeed": 1500}}
+Batch of updates is applied to the live frames table at once and sent in the next cycle, database file is not touched.
+Payloads of the same length are replaced in place, period and payload length changes publish new frames table.
+Changes are written to storage by "save" request or by debounced background flush after updates stop, all profiles are
+flushed, so updates made before profile switch are not lost.
+"""
+
+
+import asyncio
+import json
+import logging
+import os
+from threading import Event, Thread
+from typing import Any, Callable, Dict, Optional
+
+from dbman import DataBaseMan
+from msgregistry import MsgRecord, format_msg_id, format_payload, parse_msg_id, parse_payload
+
+
+logger = logging.getLogger(__name__)
+
+
+class ControlServer:
+    """ Class for serving remote control requests """
+
+    __FLUSH_DELAY_S = 1.0
+    __LINE_LIMIT = 2 ** 20
+
+    def __init__(self, get_database_man_h: Callable[[], DataBaseMan], flush_h: Callable[[], int],
+                 host: str = '127.0.0.1',
+                 port: Optional[int] = None, unix_path: Optional[str] = None,
+                 flush_delay_s: Optional[float] = __FLUSH_DELAY_S) -> None:
+        """
+        Setups server, socket is opened when server is started
+        Params:                                                                     type:
+        @param get_database_man_h: Function returning active messages database      Callable
+        @param flush_h: Function writing live updates of all databases to storage,
+                        returns number of written messages                          Callable
+        @param host: TCP address to listen on                                       str
+        @param port: TCP port, not used if unix_path is given                       Optional[int]
+        @param unix_path: Path to Unix socket                                       Optional[str]
+        @param flush_delay_s: Write changes to storage when no update came for
+                              given time, None to write only on save request       Optional[float]
+        @return: None
+        """
+
+        self.__get_database_man_h = get_database_man_h
+        self.__flush_h = flush_h
+        self.__host = host
+        self.__port = port
+        self.__unix_path = unix_path
+        self.__flush_delay_s = flush_delay_s
+        self.__loop: Optional[asyncio.AbstractEventLoop] = None
+        self.__stop_future: Optional[asyncio.Future] = None
+        self.__flush_handle: Optional[asyncio.TimerHandle] = None
+        self.__clients: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+        self.__started_event = Event()
+        self.__server_thread = None
+        self.__listening = False
+
+    def __find_msg(self, msg_d: Dict[str, Any]) -> Optional[MsgRecord]:
+        """
+        Finds message addressed by handle, CAN id or name
+        Params:                                                                     type:
+        @param msg_d: Update request of single message                              Dict[str, Any]
+        @return: Message record or None if not found                                Optional[MsgRecord]
+        """
+
+        database_man = self.__get_database_man_h()
+        if 'handle' in msg_d:
+            return database_man.get_msg(handle=int(msg_d['handle']))
+        elif 'id' in msg_d:
+            can_id = msg_d['id']
+            return database_man.get_msg_by_id(can_id=can_id if isinstance(can_id, int) else parse_msg_id(msg_id=can_id))
+        elif 'name' in msg_d:
+            return database_man.get_msg_by_name(name=msg_d['name'])
+        else:
+            return None
+
+    def __update(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Applies batch of payload, signals, period enable and period updates to live frames table
+        Params:                                                                     type:
+        @param request: Request with list of message updates                        Dict[str, Any]
+        @return: Response with number of applied updates and failed positions       Dict[str, Any]
+        """
+
+        msgs = request.get('msgs')
+        if not isinstance(msgs, list):
+            return {'ok': False, 'error': 'msgs must be list of message updates'}
+
+        updates, positions, signal_updates, signal_positions, failed = [], [], [], [], set()
+        for position, msg_d in enumerate(msgs):
+            try:
+                record = self.__find_msg(msg_d=msg_d)
+                payload = msg_d.get('payload')
+                if payload is not None:
+                    payload = parse_payload(payload=payload) if isinstance(payload, str) else bytes(payload)
+                period_en = msg_d.get('period_en')
+                if period_en is not None:
+                    """ Only JSON boolean or 0/1 - strings such as "false" must not enable the message """
+                    if not isinstance(period_en, bool) and (type(period_en) is not int or period_en not in (0, 1)):
+                        raise ValueError('period_en must be boolean')
+                    period_en = bool(period_en)
+                period = msg_d.get('period')
+                if period is not None:
+                    period = int(period)
+                signals = msg_d.get('signals')
+                if signals is not None:
+                    signals = {str(name): float(value) for name, value in signals.items()}
+            except (AttributeError, TypeError, ValueError):
+                """ Update is not JSON object or contains invalid values """
+                record = None
+            if record is None:
+                failed.add(position)
+                continue
+            if signals is None or payload is not None or period_en is not None or period is not None:
+                updates.append((record.handle, payload, period_en, period))
+                positions.append(position)
+            if signals is not None:
+                signal_updates.append((record.handle, signals))
+                signal_positions.append(position)
+
+        database_man = self.__get_database_man_h()
+        results = database_man.update_msgs_live(updates=updates) if updates else []
+        signal_results = database_man.update_signals_live(updates=signal_updates) if signal_updates else []
+        failed.update(position for position, applied in zip(positions + signal_positions, results + signal_results)
+                      if not applied)
+        if any(results) or any(signal_results):
+            self.__schedule_flush()
+        return {'ok': True, 'applied': len(msgs) - len(failed), 'failed': sorted(failed)}
+
+    def __list(self) -> Dict[str, Any]:
+        """
+        Provides all messages of active database
+        Params:                                                                     type:
+        @return: Response with messages                                             Dict[str, Any]
+        """
+
+        msgs = []
+        database_man = self.__get_database_man_h()
+        for index in range(database_man.get_msgs_num()):
+            record = database_man.get_msg_at(index=index)
+            if record is not None:
+                msgs.append({'handle': record.handle, 'name': record.name, 'id': format_msg_id(can_id=record.can_id),
+                             'payload': format_payload(payload=record.payload), 'period_en': record.period_en,
+                             'period': record.period, 'channel': record.channel})
+        return {'ok': True, 'msgs': msgs}
+
+    def __dispatch(self, line: bytes) -> Dict[str, Any]:
+        """
+        Serves single request
+        Params:                                                                     type:
+        @param line: JSON request                                                   bytes
+        @return: Response                                                           Dict[str, Any]
+        """
+
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            return {'ok': False, 'error': 'invalid JSON: {}'.format(e)}
+        if not isinstance(request, dict):
+            return {'ok': False, 'error': 'request must be JSON object'}
+
+        command = request.get('cmd')
+        if command == 'update':
+            response = self.__update(request=request)
+        elif command == 'save':
+            self.__cancel_flush()
+            response = {'ok': True, 'saved': self.__flush_h()}
+        elif command == 'list':
+            response = self.__list()
+        else:
+            response = {'ok': False, 'error': 'unknown command: {}'.format(command)}
+        if 'seq' in request:
+            """ Client can match pipelined responses """
+            response['seq'] = request['seq']
+        return response
+
+    def __cancel_flush(self) -> None:
+        """
+        Cancels pending background flush
+        Params:                                                                     type:
+        @return: None
+        """
+
+        if self.__flush_handle is not None:
+            self.__flush_handle.cancel()
+            self.__flush_handle = None
+
+    def __schedule_flush(self) -> None:
+        """
+        Schedules writing of changes to storage, every update postpones it
+        Params:                                                                     type:
+        @return: None
+        """
+
+        if self.__flush_delay_s is not None:
+            self.__cancel_flush()
+            self.__flush_handle = self.__loop.call_later(self.__flush_delay_s, self.__flush)
+
+    def __flush(self) -> None:
+        """
+        Writes changes to storage in executor thread, so requests are served while file is written
+        Params:                                                                     type:
+        @return: None
+        """
+
+        self.__flush_handle = None
+        self.__loop.run_in_executor(None, self.__flush_h)
+
+    async def __handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Serves requests of single client until it disconnects
+        Params:                                                                     type:
+        @param reader: Stream of requests                                           asyncio.StreamReader
+        @param writer: Stream of responses                                          asyncio.StreamWriter
+        @return: None
+        """
+
+        self.__clients[asyncio.current_task()] = writer
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    writer.write(json.dumps(self.__dispatch(line=line)).encode() + b'\n')
+                    await writer.drain()
+        except (ConnectionError, ValueError) as e:
+            """ Client disconnected or sent too long line """
+            logger.debug('Control client dropped: %s', e)
+        finally:
+            del self.__clients[asyncio.current_task()]
+            writer.close()
+
+    async def __serve(self) -> None:
+        """
+        Opens socket and serves clients until server is stopped
+        Params:                                                                     type:
+        @return: None
+        """
+
+        self.__loop = asyncio.get_running_loop()
+        self.__stop_future = self.__loop.create_future()
+        try:
+            if self.__unix_path is not None:
+                server = await asyncio.start_unix_server(self.__handle_client, path=self.__unix_path,
+                                                         limit=self.__LINE_LIMIT)
+            else:
+                server = await asyncio.start_server(self.__handle_client, host=self.__host, port=self.__port,
+                                                    limit=self.__LINE_LIMIT)
+        except OSError as e:
+            print('Control server not started: {}'.format(e))
+            self.__started_event.set()
+            return
+
+        self.__listening = True
+        self.__started_event.set()
+        async with server:
+            await self.__stop_future
+            for writer in self.__clients.values():
+                """ Connected clients get end of stream, so their requests are finished before loop is closed """
+                writer.close()
+            await asyncio.gather(*self.__clients, return_exceptions=True)
+        self.__cancel_flush()
+        self.__listening = False
+        if self.__unix_path is not None and os.path.exists(self.__unix_path):
+            os.remove(self.__unix_path)
+
+    """ ============================================= Class interface ============================================= """
+
+    def start(self) -> bool:
+        """
+        Starts server thread with its own event loop
+        Params:                                                                     type:
+        @return: Information if server is listening                                 bool
+        """
+
+        self.__started_event.clear()
+        self.__server_thread = Thread(target=asyncio.run, args=(self.__serve(), ), name='canvector-ctrl',
+                                      daemon=True)
+        self.__server_thread.start()
+        self.__started_event.wait()
+        return self.__listening
+
+    def stop(self) -> None:
+        """
+        Stops server, pending changes are written to storage
+        Params:                                                                     type:
+        @return: None
+        """
+
+        if self.__server_thread is not None:
+            if self.__listening:
+                self.__loop.call_soon_threadsafe(self.__stop_future.set_result, None)
+            self.__server_thread.join()
+            self.__server_thread = None
+        self.__flush_h()
+
+    def get_address(self) -> str:
+        """
+        Provides address clients connect to
+        Params:                                                                     type:
+        @return: Unix socket path or host:port                                      str
+        """
+
+        return self.__unix_path if self.__unix_path is not None else '{}:{}'.format(self.__host, self.__port)
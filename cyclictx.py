@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+This module includes definition of class CyclicTxManager responsible for periodic transmission using python-can
+cyclic tasks. Where backend supports it, frames are repeated by the driver/hardware, otherwise python-can falls back
+to its own software thread. Payload generators cannot be applied to frames repeated by the driver - such messages
+are sent with static payload and a warning is logged.
+"""
+
+
+import logging
+from typing import Dict, List, NamedTuple, Set
+import can
+
+from frametable import CompiledFrame, FrameTable
+
+
+logger = logging.getLogger(__name__)
+
+
+class CyclicTask(NamedTuple):
+    task: can.broadcastmanager.CyclicSendTaskABC
+    arbitration_id: int
+    is_extended_id: bool
+    is_fd: bool
+    bitrate_switch: bool
+    period_s: float
+    data: bytes
+
+
+class CyclicTxManager:
+    """ Class for keeping cyclic tasks in line with messages database """
+
+    def __init__(self, bus: can.BusABC) -> None:
+        """
+        Setups bus used for cyclic transmission
+        Params:                                                                     type:
+        @param bus: Configured bus object                                           can.BusABC
+        @return: None
+        """
+
+        self.__bus = bus
+        self.__tasks_d: Dict[int, CyclicTask] = {}
+        self.__static_handles: Set[int] = set()
+
+    def __stop_task(self, key: int) -> None:
+        """
+        Stops cyclic task and forgets its handle
+        Params:                                                                     type:
+        @param key: Key of the task                                                 int
+        @return: None
+        """
+
+        try:
+            self.__tasks_d.pop(key).task.stop()
+        except can.CanError:
+            logger.error('Cyclic task not stopped: %s', key)
+
+    """ ============================================= Class interface ============================================= """
+
+    def sync(self, frame_table: FrameTable, period_min_ms: int, period_max_ms: int) -> None:
+        """
+        Updates cyclic tasks to match periodic frames, only changed tasks are modified, started or stopped
+        Params:                                                                     type:
+        @param frame_table: Compiled frames table                                   FrameTable
+        @param period_min_ms: Minimal supported period                              int
+        @param period_max_ms: Maximal supported period                              int
+        @return: None
+        """
+
+        periodic_frames_d = {frame.handle: frame for frame in frame_table.get_periodic_frames()}
+        static_handles = {handle for handle, frame in periodic_frames_d.items() if frame.generators}
+        for handle in static_handles - self.__static_handles:
+            """ Warned once while message keeps its generators """
+            logger.warning('Generators of message %s are not applied by cyclic tasks, static payload is sent',
+                           hex(periodic_frames_d[handle].msg.arbitration_id))
+        self.__static_handles = static_handles
+        id_keys_d = {cyclic_task.arbitration_id: key for key, cyclic_task in self.__tasks_d.items()}
+        task_keys_d: Dict[int, int] = {}
+        matched_keys = set()
+        for handle, frame in periodic_frames_d.items():
+            cyclic_task = self.__tasks_d.get(handle)
+            key = handle
+            if cyclic_task is None or cyclic_task.arbitration_id != frame.msg.arbitration_id:
+                """ Handles differ between databases (profile switch) - task is matched by CAN id """
+                key = id_keys_d.get(frame.msg.arbitration_id)
+            if key is not None and key not in matched_keys:
+                task_keys_d[handle] = key
+                matched_keys.add(key)
+
+        for key in [key for key in self.__tasks_d if key not in matched_keys]:
+            """ Periodic transmission disabled or message deleted """
+            self.__stop_task(key=key)
+        self.__tasks_d = {handle: self.__tasks_d[key] for handle, key in task_keys_d.items()}
+
+        for key, frame in periodic_frames_d.items():
+            period_s = min(max(frame.period, period_min_ms), period_max_ms) / 1000
+            data = bytes(frame.msg.data)
+            cyclic_task = self.__tasks_d.get(key)
+            if cyclic_task is not None:
+                header = (frame.msg.arbitration_id, frame.msg.is_extended_id, frame.msg.is_fd, frame.msg.bitrate_switch)
+                if (header != (cyclic_task.arbitration_id, cyclic_task.is_extended_id, cyclic_task.is_fd,
+                               cyclic_task.bitrate_switch) or cyclic_task.period_s != period_s):
+                    """ Header or period changed, task cannot be modified in place - it will be started again """
+                    self.__stop_task(key=key)
+                elif cyclic_task.data != data:
+                    if isinstance(cyclic_task.task, can.broadcastmanager.ModifiableCyclicTaskABC):
+                        cyclic_task.task.modify_data(frame.msg)
+                        self.__tasks_d[key] = cyclic_task._replace(data=data)
+                        continue
+                    else:
+                        """ Backend does not allow payload modification - task will be started again """
+                        self.__stop_task(key=key)
+                else:
+                    """ Task up to date, do nothing """
+                    continue
+
+            try:
+                task = self.__bus.send_periodic(frame.msg, period_s)
+                self.__tasks_d[key] = CyclicTask(task=task, arbitration_id=frame.msg.arbitration_id,
+                                                 is_extended_id=frame.msg.is_extended_id, is_fd=frame.msg.is_fd,
+                                                 bitrate_switch=frame.msg.bitrate_switch, period_s=period_s,
+                                                 data=data)
+            except (can.CanError, AttributeError):
+                logger.error('Cyclic task not started: %s', hex(frame.msg.arbitration_id))
+
+    def update_payloads(self, frames: List[CompiledFrame]) -> None:
+        """
+        Updates payloads of running cyclic tasks, frames table of the tasks is not changed
+        Params:                                                                     type:
+        @param frames: Frames with replaced payloads                                List[CompiledFrame]
+        @return: None
+        """
+
+        for frame in frames:
+            cyclic_task = self.__tasks_d.get(frame.handle)
+            data = bytes(frame.msg.data)
+            if cyclic_task is None or cyclic_task.data == data:
+                continue
+            if isinstance(cyclic_task.task, can.broadcastmanager.ModifiableCyclicTaskABC):
+                cyclic_task.task.modify_data(frame.msg)
+                self.__tasks_d[frame.handle] = cyclic_task._replace(data=data)
+            else:
+                """ Backend does not allow payload modification - task is started again """
+                self.__stop_task(key=frame.handle)
+                try:
+                    task = self.__bus.send_periodic(frame.msg, cyclic_task.period_s)
+                    self.__tasks_d[frame.handle] = cyclic_task._replace(task=task, data=data)
+                except (can.CanError, AttributeError):
+                    logger.error('Cyclic task not started: %s', hex(frame.msg.arbitration_id))
+
+    def stop_all(self) -> None:
+        """
+        Stops all cyclic tasks
+        Params:                                                                     type:
+        @return: None
+        """
+
+        for key in list(self.__tasks_d):
+            self.__stop_task(key=key)
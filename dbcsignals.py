@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+This module includes definition of signal encoders compiled from DBC files. Every signal is compiled once at load
+time into per-byte segments (byte index, kept bits, shifts), so setting a physical value converts it to raw value
+and writes only bytes the signal occupies into preassembled payload buffer - whole message is never encoded again
+and no string payloads are involved. Both Intel (little endian) and Motorola (big endian) signals are supported,
+Motorola start bit uses DBC numbering (MSB of the signal).
+"""
+
+
+import struct
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+""" Byte index, mask of bits kept in byte, shift of raw value, mask of written bits and their shift in byte """
+Segment = Tuple[int, int, int, int, int]
+
+
+def _get_bit_positions(start_bit: int, length: int, little_endian: bool) -> List[int]:
+    """
+    Provides payload bit positions of signal bits
+    Params:                                                                     type:
+    @param start_bit: DBC start bit                                             int
+    @param length: Number of signal bits                                        int
+    @param little_endian: Intel byte order                                      bool
+    @return: Position of every raw bit from LSB, N is bit N % 8 of byte N // 8  List[int]
+    """
+
+    if little_endian:
+        return list(range(start_bit, start_bit + length))
+    positions, position = [], start_bit
+    for _ in range(length):
+        """ Motorola - from MSB, next bit is one lower in the same byte or the highest bit of the next byte """
+        positions.append(position)
+        position = position - 1 if position % 8 else position + 15
+    return positions[::-1]
+
+
+def _compile_segments(positions: List[int]) -> Tuple[Segment, ...]:
+    """
+    Groups signal bits by payload bytes, bits of a signal are contiguous within every byte
+    Params:                                                                     type:
+    @param positions: Payload bit position of every raw bit from LSB            List[int]
+    @return: Segments                                                           Tuple[Segment, ...]
+    """
+
+    bytes_d: Dict[int, List[Tuple[int, int]]] = {}
+    for raw_bit, position in enumerate(positions):
+        bytes_d.setdefault(position // 8, []).append((raw_bit, position % 8))
+    segments = []
+    for byte_index, bits in sorted(bytes_d.items()):
+        raw_shift, byte_shift = min(bits)[0], min(bit for _, bit in bits)
+        value_mask = (1 << len(bits)) - 1
+        segments.append((byte_index, ~(value_mask << byte_shift) & 0xFF, raw_shift, value_mask, byte_shift))
+    return tuple(segments)
+
+
+class SignalEncoder:
+    """ Class for writing single signal into payload """
+
+    __slots__ = ('name', 'length', 'scale', 'offset', 'minimum', 'maximum', 'is_signed', 'is_float', 'segments',
+                 '__raw_min', '__raw_max', '__float_format')
+
+    def __init__(self, name: str, start_bit: int, length: int, little_endian: bool = True, is_signed: bool = False,
+                 scale: float = 1, offset: float = 0, minimum: Optional[float] = None,
+                 maximum: Optional[float] = None, is_float: bool = False) -> None:
+        """
+        Compiles signal layout
+        Params:                                                                     type:
+        @param name: Signal name                                                    str
+        @param start_bit: DBC start bit                                             int
+        @param length: Number of signal bits                                        int
+        @param little_endian: Intel byte order, Motorola otherwise                  bool
+        @param is_signed: Raw value is two's complement                             bool
+        @param scale: Physical value = raw value * scale + offset                   float
+        @param offset: Physical value offset                                        float
+        @param minimum: Minimal physical value, None if not limited                 Optional[float]
+        @param maximum: Maximal physical value, None if not limited                 Optional[float]
+        @param is_float: Raw value is IEEE 754 float (32 or 64 bits)                bool
+        @return: None
+        @raise ValueError: Signal has invalid layout
+        """
+
+        if length < 1 or start_bit < 0 or (is_float and length not in (32, 64)) or scale == 0:
+            raise ValueError('signal {} has invalid layout'.format(name))
+        self.name = name
+        self.length = length
+        self.scale = scale
+        self.offset = offset
+        self.minimum = minimum
+        self.maximum = maximum
+        self.is_signed = is_signed
+        self.is_float = is_float
+        self.segments = _compile_segments(positions=_get_bit_positions(start_bit=start_bit, length=length,
+                                                                        little_endian=little_endian))
+        self.__raw_min, self.__raw_max = ((-(1 << (length - 1)), (1 << (length - 1)) - 1) if is_signed
+                                          else (0, (1 << length) - 1))
+        self.__float_format = '<f' if length == 32 else '<d'
+
+    """ ============================================= Class interface ============================================= """
+
+    def get_payload_len(self) -> int:
+        """
+        Provides minimal length of payload containing signal
+        Params:                                                                     type:
+        @return: Number of bytes                                                    int
+        """
+
+        return self.segments[-1][0] + 1
+
+    def to_raw(self, value: float) -> int:
+        """
+        Converts physical value to raw bits
+        Params:                                                                     type:
+        @param value: Physical value                                                float
+        @return: Raw value as unsigned integer of signal length                     int
+        @raise ValueError: Value out of signal range
+        """
+
+        if (self.minimum is not None and value < self.minimum) or (self.maximum is not None and value > self.maximum):
+            raise ValueError('{} out of range {}..{} of signal {}'.format(value, self.minimum, self.maximum,
+                                                                          self.name))
+        if self.is_float:
+            return int.from_bytes(struct.pack(self.__float_format, (value - self.offset) / self.scale), 'little')
+        raw = round((value - self.offset) / self.scale)
+        if not self.__raw_min <= raw <= self.__raw_max:
+            raise ValueError('{} does not fit in {} bits of signal {}'.format(value, self.length, self.name))
+        return raw & ((1 << self.length) - 1)
+
+    def write_raw(self, payload: bytearray, raw: int) -> None:
+        """
+        Writes raw value into payload in place, other signals are kept
+        Params:                                                                     type:
+        @param payload: Payload buffer                                              bytearray
+        @param raw: Raw value as unsigned integer of signal length                  int
+        @return: None
+        """
+
+        for byte_index, keep_mask, raw_shift, value_mask, byte_shift in self.segments:
+            payload[byte_index] = (payload[byte_index] & keep_mask) | (((raw >> raw_shift) & value_mask) << byte_shift)
+
+    def encode_into(self, payload: bytearray, value: float) -> None:
+        """
+        Writes physical value into payload in place
+        Params:                                                                     type:
+        @param payload: Payload buffer                                              bytearray
+        @param value: Physical value                                                float
+        @return: None
+        @raise ValueError: Value out of signal range
+        """
+
+        self.write_raw(payload=payload, raw=self.to_raw(value=value))
+
+    def decode(self, payload: bytes) -> float:
+        """
+        Reads physical value from payload
+        Params:                                                                     type:
+        @param payload: Payload bytes                                               bytes
+        @return: Physical value                                                     float
+        """
+
+        raw = 0
+        for byte_index, _, raw_shift, value_mask, byte_shift in self.segments:
+            raw |= ((payload[byte_index] >> byte_shift) & value_mask) << raw_shift
+        if self.is_float:
+            return struct.unpack(self.__float_format, raw.to_bytes(self.length // 8, 'little'))[0] * self.scale + \
+                self.offset
+        if self.is_signed and raw > self.__raw_max:
+            raw -= 1 << self.length
+        return raw * self.scale + self.offset
+
+
+class MessageEncoder:
+    """ Class holding compiled signals of single DBC message """
+
+    __slots__ = ('name', 'can_id', 'length', 'signals_d')
+
+    def __init__(self, name: str, can_id: int, length: int, signals: Iterable[SignalEncoder]) -> None:
+        """
+        Setups message signals
+        Params:                                                                     type:
+        @param name: Message name                                                   str
+        @param can_id: CAN id                                                       int
+        @param length: Payload length                                               int
+        @param signals: Compiled signals                                            Iterable[SignalEncoder]
+        @return: None
+        @raise ValueError: Signal does not fit in payload
+        """
+
+        self.name = name
+        self.can_id = can_id
+        self.length = length
+        self.signals_d: Dict[str, SignalEncoder] = {signal.name: signal for signal in signals}
+        for signal in self.signals_d.values():
+            if signal.get_payload_len() > length:
+                raise ValueError('signal {} does not fit in {} bytes of message {}'.format(signal.name, length, name))
+
+    """ ============================================= Class interface ============================================= """
+
+    def encode_into(self, payload: bytearray, values: Mapping[str, float]) -> None:
+        """
+        Writes physical values of signals into payload in place, payload is not changed if any value is invalid
+        Params:                                                                     type:
+        @param payload: Payload buffer of message length                            bytearray
+        @param values: Physical values by signal name                               Mapping[str, float]
+        @return: None
+        @raise ValueError: Signal unknown or value out of its range
+        """
+
+        raws = []
+        for name, value in values.items():
+            signal = self.signals_d.get(name)
+            if signal is None:
+                raise ValueError('signal {} not found in message {}'.format(name, self.name))
+            if signal.get_payload_len() > len(payload):
+                raise ValueError('signal {} does not fit in {} bytes of payload'.format(name, len(payload)))
+            raws.append((signal, signal.to_raw(value=value)))
+        for signal, raw in raws:
+            signal.write_raw(payload=payload, raw=raw)
+
+    def decode(self, payload: bytes) -> Dict[str, float]:
+        """
+        Reads physical values of all signals
+        Params:                                                                     type:
+        @param payload: Payload bytes                                               bytes
+        @return: Physical values by signal name                                     Dict[str, float]
+        """
+
+        return {name: signal.decode(payload=payload) for name, signal in self.signals_d.items()
+                if signal.get_payload_len() <= len(payload)}
+
+
+def load_dbc_encoders(path: str) -> Dict[int, MessageEncoder]:
+    """
+    Compiles signal encoders of all messages of DBC file
+    Params:                                                                     type:
+    @param path: Path to DBC file                                               str
+    @return: Message encoders by CAN id                                         Dict[int, MessageEncoder]
+    @raise ImportError: cantools is not installed
+    @raise ValueError: Signal of DBC has invalid layout
+    """
+
+    import cantools
+    encoders_d = {}
+    for dbc_msg in cantools.database.load_file(path).messages:
+        signals = []
+        for signal in dbc_msg.signals:
+            """ DBC range [0|0] means signal is not limited """
+            limited = signal.minimum is not None and signal.minimum != signal.maximum
+            signals.append(SignalEncoder(name=signal.name, start_bit=signal.start, length=signal.length,
+                                         little_endian=signal.byte_order == 'little_endian',
+                                         is_signed=signal.is_signed, scale=signal.scale, offset=signal.offset,
+                                         minimum=signal.minimum if limited else None,
+                                         maximum=signal.maximum if limited else None, is_float=signal.is_float))
+        encoders_d[dbc_msg.frame_id] = MessageEncoder(name=dbc_msg.name, can_id=dbc_msg.frame_id,
+                                                      length=dbc_msg.length, signals=signals)
+    return encoders_d
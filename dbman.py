@@ -6,10 +6,23 @@ This module includes definition of class DataBaseMan responsible for can message
 
 import os
 from enum import Enum
-import pandas as pd
+from threading import RLock
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple
 
+from dbcsignals import MessageEncoder
+from frametable import CompiledFrame, FrameTable
+from payloadgen import parse_generators
+from msgregistry import (CHANNEL_MAX, CHANNEL_MIN, EXT_ID_MAX, FD_PAYLOAD_LENGTHS, STD_ID_MAX, MsgRecord, MsgRegistry,
+                         format_msg_id, format_payload, is_payload_len_valid, parse_msg_id, parse_payload)
+from storage import StorageRecord, open_storage
 
-DB_FILE_PATH = r'candb\db.csv'
+if TYPE_CHECKING:
+    """ pandas is imported only when messages are imported or database view is requested """
+    import pandas as pd
+    from msgimport import ImportResult
+
+
+DB_FILE_PATH = os.path.join('candb', 'db.csv')
 
 
 class MsgValid(Enum):
@@ -21,31 +34,30 @@ class DataBaseMan:
     """ Class for messages database management """
 
     """ Definition of messages database headers """
-    __DB_H_NAME, __DB_H_ID, __DB_H_PAYLOAD, __DB_H_PERIOD_EN, __DB_H_PERIOD = \
-        'name', 'id', 'payload', 'period_en', 'period'
-    __DB_DF_HEADERS = [__DB_H_NAME, __DB_H_ID, __DB_H_PAYLOAD, __DB_H_PERIOD_EN, __DB_H_PERIOD]
+    __DB_H_NAME, __DB_H_ID, __DB_H_PAYLOAD, __DB_H_PERIOD_EN, __DB_H_PERIOD, __DB_H_CHANNEL = \
+        'name', 'id', 'payload', 'period_en', 'period', 'channel'
+    __DB_H_EXTENDED_ID, __DB_H_FD, __DB_H_BRS, __DB_H_GENERATORS = 'extended_id', 'fd', 'brs', 'generators'
+    __DB_DF_HEADERS = [__DB_H_NAME, __DB_H_ID, __DB_H_PAYLOAD, __DB_H_PERIOD_EN, __DB_H_PERIOD, __DB_H_CHANNEL,
+                       __DB_H_EXTENDED_ID, __DB_H_FD, __DB_H_BRS, __DB_H_GENERATORS]
 
-    def __init__(self) -> None:
-        self.__msg_db_df = None
-        self.__create_msg_db_file()
-        self.__load_msg_db_from_file()
-
-    def __create_msg_db_file(self) -> None:
+    def __init__(self, db_path: str = DB_FILE_PATH) -> None:
         """
-        Creates db file if it does not exist
+        Opens messages database, storage backend is selected by file extension (csv or SQLite)
         Params:                                                                     type:
+        @param db_path: Path to database file                                       str
         @return: None
         """
 
-        if not os.path.exists(DB_FILE_PATH):
-            self.__msg_db_df = pd.DataFrame(columns=self.__DB_DF_HEADERS)
-            if not os.path.exists(os.path.dirname(DB_FILE_PATH)):
-                os.mkdir(os.path.dirname(DB_FILE_PATH))
-            self.__msg_db_df.to_csv(DB_FILE_PATH, index=False)
-            print('Created db file: {}'.format(DB_FILE_PATH))
-        else:
-            """ Db file already exists """
-            pass
+        self.__registry = MsgRegistry()
+        self.__compiled_frames_d: Dict[int, CompiledFrame] = {}
+        self.__frame_table = None
+        self.__write_lock = RLock()
+        self.__update_listeners = []
+        self.__payload_listeners = []
+        self.__dirty_handles: Set[int] = set()
+        self.__encoders_d: Dict[int, MessageEncoder] = {}
+        self.__storage = open_storage(path=db_path)
+        self.__load_msg_db_from_file()
 
     def __load_msg_db_from_file(self) -> None:
         """
@@ -54,30 +66,81 @@ class DataBaseMan:
         @return: None
         """
 
-        self.__msg_db_df = pd.read_csv(DB_FILE_PATH)
-        print('Loaded db file:\n{}'.format(self.__msg_db_df))
+        for key, (name, msg_id, payload, period_en, period, channel, extended_id, fd, brs, generators) in \
+                self.__storage.load():
+            record = MsgRecord(handle=key, name=name, can_id=parse_msg_id(msg_id=msg_id),
+                               payload=parse_payload(payload=payload), period_en=period_en, period=period,
+                               channel=channel, extended_id=extended_id, fd=fd, brs=brs, generators=generators)
+            if MsgValid.VALID != self.__is_generators_valid(record=record):
+                """ Db file edited by hand - message is sent with static payload """
+                print('Generators of message {} ignored'.format(name))
+                record.generators = ''
+            self.__registry.put(record=record)
+            self.__compiled_frames_d[key] = CompiledFrame(record=record)
+        self.__frame_table = FrameTable(frames=self.__compiled_frames_d.values(), version=0)
+        print('Loaded db file: {} messages'.format(len(self.__registry)))
+
+    @staticmethod
+    def __to_storage_record(record: MsgRecord) -> StorageRecord:
+        """
+        Converts message to storage format
+        Params:                                                                     type:
+        @param record: Message record                                               MsgRecord
+        @return: Storage record                                                     StorageRecord
+        """
+
+        return (record.name, format_msg_id(can_id=record.can_id), format_payload(payload=record.payload),
+                record.period_en, record.period, record.channel, record.extended_id, record.fd, record.brs,
+                record.generators)
+
+    def __update_msg_db(self, handle: int) -> None:
+        """
+        Recompiles changed message and publishes new frames table snapshot with a single reference swap, readers
+        never see partially updated table. Must be called with write lock acquired after changes are written to storage
+        Params:                                                                     type:
+        @param handle: Handle of added, modified or deleted message                 int
+        @return: None
+        """
+
+        record = self.__registry.get(handle=handle)
+        if record is not None:
+            self.__compiled_frames_d[handle] = CompiledFrame(record=record)
+        else:
+            self.__compiled_frames_d.pop(handle, None)
+        self.__publish_frame_table()
 
-    def __save_msg_db_to_file(self) -> None:
+    def __publish_frame_table(self) -> None:
         """
-        Saves configuration to file
+        Publishes new frames table snapshot built from compiled frames and notifies listeners, must be called with
+        write lock acquired
         Params:                                                                     type:
         @return: None
         """
 
-        self.__msg_db_df.to_csv(DB_FILE_PATH + '.temp', index=False)
-        os.remove(DB_FILE_PATH)
-        os.rename(DB_FILE_PATH + '.temp', DB_FILE_PATH)
+        self.__frame_table = FrameTable(frames=self.__compiled_frames_d.values(),
+                                        version=self.__frame_table.get_version() + 1)
+        for listener in self.__update_listeners:
+            listener()
 
-    def __update_msg_db(self, new_msg_db: pd.DataFrame) -> None:
+    def __patch_payloads(self, records: List[MsgRecord]) -> None:
         """
-        Updates msg configuration
+        Replaces payloads of compiled frames in place without publishing new frames table snapshot, payload lengths
+        must not change. Must be called with write lock acquired after records are put to registry
         Params:                                                                     type:
-        @param new_msg_db: New database                                             pd.DataFrame
+        @param records: Records with new payloads                                   List[MsgRecord]
         @return: None
         """
 
-        self.__msg_db_df = new_msg_db
-        self.__save_msg_db_to_file()
+        frames = []
+        for record in records:
+            frame = self.__compiled_frames_d[record.handle]
+            """ Buffer is swapped by a single reference assignment - frame being sent has old or new payload whole """
+            frame.msg.data = bytearray(record.payload)
+            frames.append(frame)
+        if not frames:
+            return
+        for listener in self.__payload_listeners:
+            listener(frames)
 
     @staticmethod
     def __is_msg_valid(msg_id: str, payload: str) -> MsgValid:
@@ -104,7 +167,7 @@ class DataBaseMan:
                 spaces_num, hex_num = payload.count(' '), payload.count('0x')
 
                 if ((pld_char_len + 1) % 5 == 0 and spaces_num == expected_values_num - 1 and
-                        hex_num == expected_values_num and expected_values_num <= 8):
+                        hex_num == expected_values_num and expected_values_num <= max(FD_PAYLOAD_LENGTHS)):
                     """ Payload is in correct format, check if it contains only allowed characters """
                     try:
                         hex_values = [int(val, 16) for val in payload.split(sep=' ')]
@@ -123,29 +186,144 @@ class DataBaseMan:
 
         return MsgValid.INVALID
 
+    @staticmethod
+    def __is_generators_valid(record: MsgRecord) -> MsgValid:
+        """
+        Checks if payload generators of message are valid
+        Params:                                                                     type:
+        @param record: Message record                                               MsgRecord
+        @return: Verdict if generators are valid                                    MsgValid
+        """
+
+        try:
+            parse_generators(spec=record.generators, payload_len=len(record.payload))
+            return MsgValid.VALID
+        except ValueError as e:
+            print('Message INVALID! Provided {}'.format(e))
+            return MsgValid.INVALID
+
+    @staticmethod
+    def __is_frame_valid(record: MsgRecord) -> MsgValid:
+        """
+        Checks if message fits in a single CAN or CAN FD frame
+        Params:                                                                     type:
+        @param record: Message record                                               MsgRecord
+        @return: Verdict if message is valid                                        MsgValid
+        """
+
+        if record.can_id > (EXT_ID_MAX if record.extended_id else STD_ID_MAX):
+            print('Message INVALID! Provided msg id exceeds {}-bit range'.format(29 if record.extended_id else 11))
+        elif not is_payload_len_valid(length=len(record.payload), fd=record.fd):
+            print('Message INVALID! Provided msg payload length is not valid {} frame length'.format(
+                'CAN FD' if record.fd else 'CAN'))
+        elif record.brs and not record.fd:
+            print('Message INVALID! Bit rate switch is allowed only in CAN FD frame')
+        elif not CHANNEL_MIN <= record.channel <= CHANNEL_MAX:
+            print('Message INVALID! Channel is not in range {}-{}'.format(CHANNEL_MIN, CHANNEL_MAX))
+        else:
+            return DataBaseMan.__is_generators_valid(record=record)
+        return MsgValid.INVALID
+
+    def __build_record(self, handle: int, name: str, msg_id: str, payload: str, period_en: bool, period: int,
+                       channel: int, extended_id: Optional[bool], fd: bool, brs: bool,
+                       generators: str) -> Optional[MsgRecord]:
+        """
+        Validates message provided by user and converts it to record
+        Params:                                                                     type:
+        @param handle: Handle of the message                                        int
+        @param name: Message name                                                   str
+        @param msg_id: Message id                                                   str
+        @param payload: Message payload                                             str
+        @param period_en: Period transmission enabled                               bool
+        @param period: Transmission period in ms                                    int
+        @param channel: Index of the bus the message is sent on                     int
+        @param extended_id: 29-bit CAN id, None to use it only for ids over 11 bits Optional[bool]
+        @param fd: CAN FD frame                                                     bool
+        @param brs: CAN FD bit rate switch                                          bool
+        @param generators: Payload generators, e.g. 'counter(bit=0,len=4)'          str
+        @return: Message record or None if message is invalid                       Optional[MsgRecord]
+        """
+
+        if MsgValid.VALID == self.__is_msg_valid(msg_id=msg_id, payload=payload):
+            can_id = parse_msg_id(msg_id=msg_id)
+            record = MsgRecord(handle=handle, name=name, can_id=can_id, payload=parse_payload(payload=payload),
+                               period_en=bool(period_en), period=period, channel=channel,
+                               extended_id=can_id > STD_ID_MAX if extended_id is None else bool(extended_id),
+                               fd=bool(fd), brs=bool(brs), generators=generators.strip())
+            return record if MsgValid.VALID == self.__is_frame_valid(record=record) else None
+        else:
+            return None
+
     """ ============================================= Class interface ============================================= """
 
-    def add_msg(self, name: str, msg_id: str, payload: str) -> bool:
+    def add_msg(self, name: str, msg_id: str, payload: str, channel: int = 0, extended_id: Optional[bool] = None,
+                fd: bool = False, brs: bool = False, generators: str = '') -> bool:
         """
         Adds new message to database
         Params:                                                                     type:
         @param name: Message name                                                   str
         @param msg_id: Message id                                                   str
         @param payload: Message payload                                             str
+        @param channel: Index of the bus the message is sent on                     int
+        @param extended_id: 29-bit CAN id, None to use it only for ids over 11 bits Optional[bool]
+        @param fd: CAN FD frame, payload up to 64 bytes                             bool
+        @param brs: CAN FD bit rate switch                                          bool
+        @param generators: Payload generators, empty for static payload             str
         @return: Information if operation was successful                            bool
         """
 
-        if MsgValid.VALID == self.__is_msg_valid(msg_id=msg_id, payload=payload):
-            """ Provided message is valid """
-            new_msg_db_df = self.__msg_db_df.append(pd.DataFrame(([[name, msg_id, payload, False, str(100)]]),
-                                                                 columns=self.__DB_DF_HEADERS), ignore_index=True)
-            self.__update_msg_db(new_msg_db=new_msg_db_df)
-            print('Added new message to db file:\n{}'.format(new_msg_db_df.iloc[[-1]]))
-            return True
+        with self.__write_lock:
+            record = self.__build_record(handle=-1, name=name, msg_id=msg_id, payload=payload, period_en=False,
+                                         period=100, channel=channel, extended_id=extended_id, fd=fd, brs=brs,
+                                         generators=generators)
+            if record is not None:
+                """ Provided message is valid """
+                record.handle = self.__storage.insert(record=self.__to_storage_record(record=record))
+                self.__registry.put(record=record)
+                self.__update_msg_db(handle=record.handle)
+                print('Added new message to db file: {} [{}] {}'.format(name, msg_id, payload))
+                return True
+            else:
+                """ Provided message is invalid """
+                print('Message not added to db file')
+                return False
+
+    def import_msgs(self, msgs_df: 'pd.DataFrame') -> 'ImportResult':
+        """
+        Adds list of messages to database, messages are validated at once and saved with a single write
+        Params:                                                                     type:
+        @param msgs_df: Messages with columns name, id, payload [, period_en, period, channel, extended_id, fd,
+                        brs, generators]                                            pd.DataFrame
+        @return: Number of imported messages and invalid rows                       ImportResult
+        """
+
+        from msgimport import ImportResult, validate_msgs
+        valid_df, invalid_rows = validate_msgs(msgs_df=msgs_df)
+        records = [MsgRecord(handle=-1, name=name, can_id=parse_msg_id(msg_id=msg_id),
+                             payload=parse_payload(payload=payload), period_en=bool(period_en), period=int(period),
+                             channel=int(channel), extended_id=bool(extended_id), fd=bool(fd), brs=bool(brs),
+                             generators=generators)
+                   for name, msg_id, payload, period_en, period, channel, extended_id, fd, brs, generators in
+                   zip(valid_df['name'], valid_df['id'], valid_df['payload'], valid_df['period_en'],
+                       valid_df['period'], valid_df['channel'], valid_df['extended_id'], valid_df['fd'],
+                       valid_df['brs'], valid_df['generators'])]
+        if records:
+            with self.__write_lock:
+                keys = self.__storage.insert_many(records=[self.__to_storage_record(record=record)
+                                                           for record in records])
+                for key, record in zip(keys, records):
+                    record.handle = key
+                    self.__registry.put(record=record)
+                    self.__compiled_frames_d[key] = CompiledFrame(record=record)
+                self.__update_msg_db(handle=records[-1].handle)
         else:
-            """ Provided message is invalid """
-            print('Message not added to db file')
-            return False
+            """ Nothing to import """
+            pass
+
+        print('Imported {} messages to db file, {} invalid rows'.format(len(records), len(invalid_rows)))
+        for row, reason in invalid_rows:
+            print('Row {} INVALID! Provided {}'.format(row, reason))
+        return ImportResult(imported_num=len(records), invalid_rows=invalid_rows)
 
     def delete_msg(self, index: int) -> None:
         """
@@ -155,12 +333,30 @@ class DataBaseMan:
         @return: None
         """
 
-        new_msg_config_df = self.__msg_db_df.drop(index=index)
-        new_msg_config_df.reset_index(drop=True, inplace=True)
-        self.__update_msg_db(new_msg_db=new_msg_config_df)
-        print('Deleted message from db file')
+        with self.__write_lock:
+            self.delete_msg_by_handle(handle=self.__registry.get_handle(index=index))
 
-    def modify_msg(self, index: int, name: str, msg_id: str, payload: str, period_en: bool) -> bool:
+    def delete_msg_by_handle(self, handle: int) -> bool:
+        """
+        Removes message from database
+        Params:                                                                     type:
+        @param handle: Handle of the message                                        int
+        @return: Information if operation was successful                            bool
+        """
+
+        with self.__write_lock:
+            if self.__registry.delete(handle=handle) is not None:
+                self.__storage.delete(key=handle)
+                self.__update_msg_db(handle=handle)
+                print('Deleted message from db file')
+                return True
+            else:
+                """ Message not found in database """
+                return False
+
+    def modify_msg(self, index: int, name: str, msg_id: str, payload: str, period_en: bool,
+                   channel: Optional[int] = None, extended_id: Optional[bool] = None, fd: Optional[bool] = None,
+                   brs: Optional[bool] = None, generators: Optional[str] = None) -> bool:
         """
         Modifies message in database
         Params:                                                                     type:
@@ -169,28 +365,296 @@ class DataBaseMan:
         @param msg_id: Message id                                                   str
         @param payload: Message payload                                             str
         @param period_en: Period transmission enabled                               bool
+        @param channel: Index of the bus, None to keep current one                  Optional[int]
+        @param extended_id: 29-bit CAN id, None to keep current one                 Optional[bool]
+        @param fd: CAN FD frame, None to keep current one                           Optional[bool]
+        @param brs: CAN FD bit rate switch, None to keep current one                Optional[bool]
+        @param generators: Payload generators, None to keep current ones            Optional[str]
         @return: Information if operation was successful                            bool
         """
 
-        if MsgValid.VALID == self.__is_msg_valid(msg_id=msg_id, payload=payload):
-            upd_msg_config_df = self.__msg_db_df
-            upd_msg_config_df.at[index, self.__DB_H_NAME] = name
-            upd_msg_config_df.at[index, self.__DB_H_ID] = msg_id
-            upd_msg_config_df.at[index, self.__DB_H_PAYLOAD] = payload
-            upd_msg_config_df.at[index, self.__DB_H_PERIOD_EN] = period_en
-            self.__update_msg_db(new_msg_db=upd_msg_config_df)
-            print('Modified message in db file:\n{}'.format(upd_msg_config_df.iloc[[index]]))
-            return True
-        else:
-            """ Provided message is invalid """
-            print('Message not updated in db file')
-            return False
+        with self.__write_lock:
+            return self.modify_msg_by_handle(handle=self.__registry.get_handle(index=index), name=name, msg_id=msg_id,
+                                             payload=payload, period_en=period_en, channel=channel,
+                                             extended_id=extended_id, fd=fd, brs=brs, generators=generators)
+
+    def modify_msg_by_handle(self, handle: int, name: str, msg_id: str, payload: str, period_en: bool,
+                             channel: Optional[int] = None, extended_id: Optional[bool] = None,
+                             fd: Optional[bool] = None, brs: Optional[bool] = None,
+                             generators: Optional[str] = None) -> bool:
+        """
+        Modifies message in database
+        Params:                                                                     type:
+        @param handle: Handle of the message                                        int
+        @param name: Message name                                                   str
+        @param msg_id: Message id                                                   str
+        @param payload: Message payload                                             str
+        @param period_en: Period transmission enabled                               bool
+        @param channel: Index of the bus, None to keep current one                  Optional[int]
+        @param extended_id: 29-bit CAN id, None to keep current one                 Optional[bool]
+        @param fd: CAN FD frame, None to keep current one                           Optional[bool]
+        @param brs: CAN FD bit rate switch, None to keep current one                Optional[bool]
+        @param generators: Payload generators, None to keep current ones            Optional[str]
+        @return: Information if operation was successful                            bool
+        """
+
+        with self.__write_lock:
+            old_record = self.__registry.get(handle=handle)
+            record = None if old_record is None else self.__build_record(
+                handle=handle, name=name, msg_id=msg_id, payload=payload, period_en=period_en,
+                period=old_record.period, channel=old_record.channel if channel is None else channel,
+                extended_id=old_record.extended_id or None if extended_id is None else extended_id,
+                fd=old_record.fd if fd is None else fd, brs=old_record.brs if brs is None else brs,
+                generators=old_record.generators if generators is None else generators)
+            if record is not None:
+                self.__storage.update(key=handle, record=self.__to_storage_record(record=record))
+                self.__registry.put(record=record)
+                self.__update_msg_db(handle=handle)
+                print('Modified message in db file: {} [{}] {}'.format(name, msg_id, payload))
+                return True
+            else:
+                """ Provided message is invalid """
+                print('Message not updated in db file')
+                return False
+
+    def update_msgs_live(self, updates: Iterable[Tuple[int, Optional[bytes], Optional[bool], Optional[int]]]
+                         ) -> List[bool]:
+        """
+        Changes payloads, period enables and periods of messages in memory only, so they are sent in the next cycle.
+        Payload changes of the same length replace payload of the compiled frame in place, only changes of period,
+        period enable or payload length recompile the message and publish a single frames table snapshot for the
+        whole batch. Changes are written to storage by flush
+        Params:                                                                     type:
+        @param updates: Handle, new payload, period enable and period in ms, None
+                        keeps current value                                         Iterable[Tuple]
+        @return: Information if update was applied, for every update                List[bool]
+        """
+
+        results = []
+        with self.__write_lock:
+            records_d, recompiled_handles = {}, set()
+            for handle, payload, period_en, period in updates:
+                old_record = self.__registry.get(handle=handle)
+                if (old_record is None or (period is not None and period < 1) or
+                        (payload is not None and not is_payload_len_valid(length=len(payload), fd=old_record.fd))):
+                    results.append(False)
+                    continue
+                record = MsgRecord(handle=handle, name=old_record.name, can_id=old_record.can_id,
+                                   payload=old_record.payload if payload is None else bytes(payload),
+                                   period_en=old_record.period_en if period_en is None else bool(period_en),
+                                   period=old_record.period if period is None else int(period),
+                                   channel=old_record.channel,
+                                   extended_id=old_record.extended_id, fd=old_record.fd, brs=old_record.brs,
+                                   generators=old_record.generators)
+                if len(record.payload) != len(old_record.payload):
+                    try:
+                        parse_generators(spec=record.generators, payload_len=len(record.payload))
+                    except ValueError:
+                        """ Generators do not fit in new payload """
+                        results.append(False)
+                        continue
+                self.__registry.put(record=record)
+                self.__dirty_handles.add(handle)
+                if (len(record.payload) != len(old_record.payload) or record.period_en != old_record.period_en or
+                        record.period != old_record.period):
+                    recompiled_handles.add(handle)
+                records_d[handle] = record
+                results.append(True)
+            self.__patch_payloads(records=[record for handle, record in records_d.items()
+                                           if handle not in recompiled_handles])
+            if recompiled_handles:
+                for handle in recompiled_handles:
+                    self.__compiled_frames_d[handle] = CompiledFrame(record=records_d[handle])
+                self.__publish_frame_table()
+        return results
+
+    def set_encoders(self, encoders_d: Dict[int, MessageEncoder]) -> int:
+        """
+        Setups signal encoders of messages, messages are matched by CAN id
+        Params:                                                                     type:
+        @param encoders_d: Message encoders by CAN id                               Dict[int, MessageEncoder]
+        @return: Number of database messages with signals                           int
+        """
+
+        with self.__write_lock:
+            self.__encoders_d = dict(encoders_d)
+            return sum(self.__registry.get_by_id(can_id=can_id) is not None for can_id in self.__encoders_d)
+
+    def get_encoder(self, handle: int) -> Optional[MessageEncoder]:
+        """
+        Provides signal encoder of message
+        Params:                                                                     type:
+        @param handle: Handle of the message                                        int
+        @return: Message encoder or None if message has no signals                  Optional[MessageEncoder]
+        """
+
+        record = self.__registry.get(handle=handle)
+        return self.__encoders_d.get(record.can_id) if record is not None else None
+
+    def update_signals_live(self, updates: Iterable[Tuple[int, Mapping[str, float]]]) -> List[bool]:
+        """
+        Changes signals of messages by physical values in memory only. Signals are encoded into copy of payload
+        buffer of compiled frame, only bytes of changed signals are touched, and the buffer is swapped in - no frames
+        table snapshot is published, so the cost does not depend on size of database
+        Params:                                                                     type:
+        @param updates: Handle and physical values by signal name                   Iterable[Tuple]
+        @return: Information if update was applied, for every update                List[bool]
+        """
+
+        results = []
+        with self.__write_lock:
+            records_d = {}
+            for handle, values in updates:
+                old_record = self.__registry.get(handle=handle)
+                encoder = self.__encoders_d.get(old_record.can_id) if old_record is not None else None
+                if encoder is None:
+                    results.append(False)
+                    continue
+                buffer = bytearray(old_record.payload)
+                try:
+                    encoder.encode_into(payload=buffer, values=values)
+                except ValueError:
+                    """ Unknown signal or value out of range - message not changed """
+                    results.append(False)
+                    continue
+                record = MsgRecord(handle=handle, name=old_record.name, can_id=old_record.can_id, payload=bytes(buffer),
+                                   period_en=old_record.period_en, period=old_record.period,
+                                   channel=old_record.channel, extended_id=old_record.extended_id, fd=old_record.fd,
+                                   brs=old_record.brs, generators=old_record.generators)
+                self.__registry.put(record=record)
+                self.__dirty_handles.add(handle)
+                records_d[handle] = record
+                results.append(True)
+            self.__patch_payloads(records=list(records_d.values()))
+        return results
+
+    def get_signals(self, handle: int) -> Dict[str, float]:
+        """
+        Provides physical values of message signals
+        Params:                                                                     type:
+        @param handle: Handle of the message                                        int
+        @return: Physical values by signal name, empty if message has no signals    Dict[str, float]
+        """
+
+        record = self.__registry.get(handle=handle)
+        encoder = self.__encoders_d.get(record.can_id) if record is not None else None
+        return encoder.decode(payload=record.payload) if encoder is not None else {}
+
+    def flush(self) -> int:
+        """
+        Writes messages changed by live updates to storage with a single write, pending changes of storage (e.g.
+        collected csv file writes) are written too
+        Params:                                                                     type:
+        @return: Number of written messages changed by live updates                 int
+        """
+
+        with self.__write_lock:
+            records_d = {handle: self.__to_storage_record(record=self.__registry.get(handle=handle))
+                         for handle in self.__dirty_handles if self.__registry.get(handle=handle) is not None}
+            if records_d:
+                self.__storage.update_many(records_d=records_d)
+            self.__dirty_handles.clear()
+            self.__storage.flush()
+        return len(records_d)
+
+    def get_msg(self, handle: int) -> Optional[MsgRecord]:
+        """
+        Provides message by handle
+        Params:                                                                     type:
+        @param handle: Handle of the message                                        int
+        @return: Message record or None if handle is unknown                        Optional[MsgRecord]
+        """
+
+        return self.__registry.get(handle=handle)
+
+    def get_msg_by_id(self, can_id: int) -> Optional[MsgRecord]:
+        """
+        Provides message by CAN id
+        Params:                                                                     type:
+        @param can_id: CAN id                                                       int
+        @return: Message record or None if not found                                Optional[MsgRecord]
+        """
+
+        return self.__registry.get_by_id(can_id=can_id)
+
+    def get_msg_by_name(self, name: str) -> Optional[MsgRecord]:
+        """
+        Provides message by name
+        Params:                                                                     type:
+        @param name: Message name                                                   str
+        @return: Message record or None if not found                                Optional[MsgRecord]
+        """
+
+        return self.__registry.get_by_name(name=name)
+
+    def get_msg_at(self, index: int) -> Optional[MsgRecord]:
+        """
+        Provides message at specified position
+        Params:                                                                     type:
+        @param index: Index of the message in database                              int
+        @return: Message record or None if index is out of range                    Optional[MsgRecord]
+        """
+
+        handle = self.__registry.get_handle(index=index)
+        return self.__registry.get(handle=handle) if handle is not None else None
+
+    def get_handle(self, index: int) -> Optional[int]:
+        """
+        Provides handle of message at specified position
+        Params:                                                                     type:
+        @param index: Index of the message in database                              int
+        @return: Handle or None if index is out of range                            Optional[int]
+        """
+
+        return self.__registry.get_handle(index=index)
+
+    def get_msgs_num(self) -> int:
+        """
+        Provides number of messages in database
+        Params:                                                                     type:
+        @return: Number of messages                                                 int
+        """
+
+        return len(self.__registry)
+
+    def get_msg_db(self) -> 'pd.DataFrame':
+        """
+        Provides messages database, compatibility view built on demand
+        Params:                                                                     type:
+        @return: Messages database                                                  pd.DataFrame
+        """
+
+        import pandas as pd
+        return pd.DataFrame([self.__to_storage_record(record=record) for record in self.__registry],
+                            columns=self.__DB_DF_HEADERS)
+
+    def get_frame_table(self) -> FrameTable:
+        """
+        Provides current snapshot of messages database compiled into CAN frames, no lock is taken - snapshot is
+        replaced as a whole on every change, only live payload updates swap payload buffers of its frames
+        Params:                                                                     type:
+        @return: Compiled frames, rebuilt only when database changes                FrameTable
+        """
+
+        return self.__frame_table
+
+    def add_update_listener(self, listener: Callable[[], None]) -> None:
+        """
+        Registers function called after every database change
+        Params:                                                                     type:
+        @param listener: Function called with no arguments                          Callable
+        @return: None
+        """
+
+        self.__update_listeners.append(listener)
 
-    def get_msg_db(self) -> pd.DataFrame:
+    def add_payload_listener(self, listener: Callable[[List[CompiledFrame]], None]) -> None:
         """
-        Provides messages database
+        Registers function called after payloads of compiled frames were replaced in place, frames table snapshot is
+        not changed
         Params:                                                                     type:
+        @param listener: Function called with frames of changed payloads            Callable
         @return: None
         """
 
-        return self.__msg_db_df
+        self.__payload_listeners.append(listener)
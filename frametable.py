@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+This module includes definition of class FrameTable holding ready-to-send CAN frames compiled from messages database.
+Frame tables are immutable snapshots - a change in database builds a new table which is published by a single
+reference swap, so the TX scheduler can read current snapshot without taking any lock. Compiled frames are shared
+between snapshots and must never be modified after compilation, except live payload updates of the same length which
+replace payload buffer of the message by a single reference swap. Frames with generators are sent as copies of their
+message carrying generated values.
+"""
+
+
+from typing import Dict, Iterable, Optional, Tuple
+import can
+
+from msgregistry import MsgRecord
+from payloadgen import GeneratorRule, parse_generators
+
+
+class CompiledFrame:
+    """ Class holding single message compiled into ready-to-send CAN frame """
+
+    __slots__ = ('handle', 'name', 'period_en', 'period', 'channel', 'generators', 'msg')
+
+    def __init__(self, record: MsgRecord) -> None:
+        """
+        Compiles message into CAN frame
+        Params:                                                                     type:
+        @param record: Message record                                               MsgRecord
+        @return: None
+        """
+
+        self.handle = record.handle
+        self.name = record.name
+        self.period_en = record.period_en
+        self.period = record.period
+        self.channel = record.channel
+        self.generators: Tuple[GeneratorRule, ...] = parse_generators(spec=record.generators,
+                                                                      payload_len=len(record.payload))
+        self.msg = can.Message(arbitration_id=record.can_id, data=record.payload, is_extended_id=record.extended_id,
+                               is_fd=record.fd, bitrate_switch=record.brs)
+
+
+class FrameTable:
+    """ Class holding immutable snapshot of messages database compiled into CAN frames """
+
+    __slots__ = ('__version', '__frames', '__frames_d', '__periodic_frames', '__channel_tables_d')
+
+    def __init__(self, frames: Iterable[CompiledFrame], version: int) -> None:
+        """
+        Setups table from compiled frames
+        Params:                                                                     type:
+        @param frames: Compiled frames in database order                            Iterable[CompiledFrame]
+        @param version: Number of the snapshot, incremented on every change         int
+        @return: None
+        """
+
+        self.__version = version
+        self.__frames = tuple(frames)
+        self.__frames_d: Dict[int, CompiledFrame] = {frame.handle: frame for frame in self.__frames}
+        self.__periodic_frames = tuple(frame for frame in self.__frames if frame.period_en)
+        self.__channel_tables_d: Dict[int, FrameTable] = {}
+
+    """ ============================================= Class interface ============================================= """
+
+    def get_version(self) -> int:
+        """
+        Provides number of the snapshot
+        Params:                                                                     type:
+        @return: Snapshot version                                                   int
+        """
+
+        return self.__version
+
+    def get_frame(self, index: int) -> Optional[CompiledFrame]:
+        """
+        Provides compiled frame of specified message
+        Params:                                                                     type:
+        @param index: Index of the message in database                              int
+        @return: Compiled frame or None if index is out of range                    Optional[CompiledFrame]
+        """
+
+        return self.__frames[index] if 0 <= index < len(self.__frames) else None
+
+    def get_frame_by_handle(self, handle: int) -> Optional[CompiledFrame]:
+        """
+        Provides compiled frame of specified message
+        Params:                                                                     type:
+        @param handle: Handle of the message                                        int
+        @return: Compiled frame or None if handle is unknown                        Optional[CompiledFrame]
+        """
+
+        return self.__frames_d.get(handle)
+
+    def get_frames(self) -> Tuple[CompiledFrame, ...]:
+        """
+        Provides all compiled frames
+        Params:                                                                     type:
+        @return: Compiled frames in database order                                  Tuple[CompiledFrame, ...]
+        """
+
+        return self.__frames
+
+    def get_channels(self) -> Tuple[int, ...]:
+        """
+        Provides channels used by messages
+        Params:                                                                     type:
+        @return: Sorted indexes of buses                                            Tuple[int, ...]
+        """
+
+        return tuple(sorted({frame.channel for frame in self.__frames}))
+
+    def get_channel_table(self, channel: int) -> 'FrameTable':
+        """
+        Provides snapshot of messages sent on specified bus, built once per snapshot and channel
+        Params:                                                                     type:
+        @param channel: Index of the bus                                            int
+        @return: Compiled frames table with the same version                        FrameTable
+        """
+
+        channel_table = self.__channel_tables_d.get(channel)
+        if channel_table is None:
+            channel_table = FrameTable(frames=(frame for frame in self.__frames if frame.channel == channel),
+                                       version=self.__version)
+            self.__channel_tables_d[channel] = channel_table
+        return channel_table
+
+    def get_periodic_frames(self) -> Tuple[CompiledFrame, ...]:
+        """
+        Provides compiled frames with periodic transmission enabled
+        Params:                                                                     type:
+        @return: Compiled periodic frames in database order                         Tuple[CompiledFrame, ...]
+        """
+
+        return self.__periodic_frames
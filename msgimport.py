@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+This module includes functions for bulk import of messages. Whole message lists (csv files in database format or
+messages derived from DBC files) are validated column-wise at once, every invalid row is reported.
+"""
+
+
+import os
+from typing import List, NamedTuple, Tuple
+import numpy as np
+import pandas as pd
+
+from msgregistry import CAN_PAYLOAD_MAX, CHANNEL_MAX, CHANNEL_MIN, EXT_ID_MAX, FD_PAYLOAD_LENGTHS, STD_ID_MAX
+from payloadgen import parse_generators
+
+
+MSG_ID_PATTERN = r'0x[0-9A-Fa-f]+'
+PAYLOAD_PATTERN = r'0x[0-9A-Fa-f]{2}( 0x[0-9A-Fa-f]{2}){0,63}'
+PERIOD_DEFAULT, PERIOD_MIN, PERIOD_MAX = 100, 1, 10000
+
+
+class ImportResult(NamedTuple):
+    imported_num: int
+    invalid_rows: List[Tuple[int, str]]
+
+
+def read_flags(msgs_df: pd.DataFrame, column: str) -> pd.Series:
+    """
+    Reads boolean column, missing column is read as all False
+    Params:                                                                     type:
+    @param msgs_df: Messages list                                               pd.DataFrame
+    @param column: Column name                                                  str
+    @return: Column values                                                      pd.Series
+    """
+
+    if column in msgs_df:
+        return msgs_df[column].astype(str).str.lower().isin(['true', '1'])
+    else:
+        return pd.Series(np.zeros(len(msgs_df), dtype=bool))
+
+
+def check_generators(generators: pd.Series, payload_lens: pd.Series) -> np.ndarray:
+    """
+    Checks payload generators, only rows with generators are parsed
+    Params:                                                                     type:
+    @param generators: Generators of messages                                   pd.Series
+    @param payload_lens: Number of payload bytes of messages                    pd.Series
+    @return: Reason of invalidity per row, empty if generators are valid        np.ndarray
+    """
+
+    errors = np.full(len(generators), '', dtype=object)
+    for row in np.flatnonzero(generators.str.len().to_numpy() > 0):
+        try:
+            parse_generators(spec=generators.iat[row], payload_len=int(payload_lens.iat[row]))
+        except ValueError as e:
+            errors[row] = str(e)
+    return errors
+
+
+def validate_msgs(msgs_df: pd.DataFrame) -> Tuple[pd.DataFrame, List[Tuple[int, str]]]:
+    """
+    Validates and normalizes messages list, all rows are checked at once
+    Params:                                                                     type:
+    @param msgs_df: Messages with columns name, id, payload [, period_en, period, channel, extended_id, fd, brs,
+                    generators], missing extended_id is set for ids over 11 bits, missing fd for payloads over
+                    8 bytes                                                     pd.DataFrame
+    @return: Valid messages with all database columns and invalid rows
+             as (row number, reason)                                            Tuple[pd.DataFrame, List]
+    """
+
+    msgs_df = msgs_df.reset_index(drop=True)
+    names = msgs_df['name'].fillna('').astype(str) if 'name' in msgs_df else pd.Series([''] * len(msgs_df))
+    ids = msgs_df['id'].fillna('').astype(str).str.strip()
+    payloads = msgs_df['payload'].fillna('').astype(str).str.strip()
+    period_en = read_flags(msgs_df=msgs_df, column='period_en')
+    periods = (pd.to_numeric(msgs_df['period'], errors='coerce') if 'period' in msgs_df
+               else pd.Series(np.full(len(msgs_df), PERIOD_DEFAULT)))
+    channels = (pd.to_numeric(msgs_df['channel'].replace('', 0), errors='coerce') if 'channel' in msgs_df
+                else pd.Series(np.zeros(len(msgs_df), dtype=int)))
+    generators = (msgs_df['generators'].fillna('').astype(str).str.strip() if 'generators' in msgs_df
+                  else pd.Series([''] * len(msgs_df)))
+
+    id_valid = ids.str.fullmatch(MSG_ID_PATTERN)
+    payload_valid = payloads.str.fullmatch(PAYLOAD_PATTERN)
+    id_values = [int(msg_id, 16) if valid else 0 for msg_id, valid in zip(ids, id_valid)]
+    """ Ids over 29 bits may not fit in int64 - they are replaced with 0 and reported as out of range """
+    id_overflow = pd.Series([id_value > EXT_ID_MAX for id_value in id_values], dtype=bool)
+    can_ids = pd.Series([0 if id_value > EXT_ID_MAX else id_value for id_value in id_values], dtype='int64')
+    payload_lens = (payloads.str.len() + 1) // 5
+    extended_id = (read_flags(msgs_df=msgs_df, column='extended_id') if 'extended_id' in msgs_df
+                   else can_ids > STD_ID_MAX)
+    fd = read_flags(msgs_df=msgs_df, column='fd') if 'fd' in msgs_df else payload_lens > CAN_PAYLOAD_MAX
+    brs = read_flags(msgs_df=msgs_df, column='brs')
+    id_range_valid = ~id_overflow & (can_ids <= np.where(extended_id, EXT_ID_MAX, STD_ID_MAX))
+    payload_len_valid = np.where(fd, payload_lens.isin(FD_PAYLOAD_LENGTHS), payload_lens <= CAN_PAYLOAD_MAX)
+    brs_valid = fd | ~brs
+    period_valid = periods.between(PERIOD_MIN, PERIOD_MAX) & (periods % 1 == 0)
+    channel_valid = channels.between(CHANNEL_MIN, CHANNEL_MAX) & (channels % 1 == 0)
+    generators_errors = check_generators(generators=generators, payload_lens=payload_lens)
+
+    reasons = np.select([~id_valid, ~payload_valid, ~id_range_valid, ~payload_len_valid, ~brs_valid, ~period_valid,
+                         ~channel_valid, generators_errors != ''],
+                        ['msg id is not valid hex value', 'msg payload is in incorrect format',
+                         'msg id exceeds 11-bit (29-bit if extended) range',
+                         'msg payload length is not valid CAN (CAN FD) frame length',
+                         'bit rate switch is allowed only in CAN FD frame',
+                         'period is not integer in range {}-{} ms'.format(PERIOD_MIN, PERIOD_MAX),
+                         'channel is not integer in range {}-{}'.format(CHANNEL_MIN, CHANNEL_MAX), generators_errors],
+                        default='')
+    valid_mask = reasons == ''
+    invalid_rows = [(int(row), str(reason)) for row, reason in zip(np.flatnonzero(~valid_mask),
+                                                                    reasons[~valid_mask])]
+
+    valid_df = pd.DataFrame({'name': names[valid_mask], 'id': ids[valid_mask], 'payload': payloads[valid_mask],
+                             'period_en': period_en[valid_mask],
+                             'period': periods[valid_mask].astype(int),
+                             'channel': channels[valid_mask].astype(int),
+                             'extended_id': extended_id[valid_mask], 'fd': fd[valid_mask], 'brs': brs[valid_mask],
+                             'generators': generators[valid_mask]})
+    return valid_df, invalid_rows
+
+
+def read_csv_msgs(path: str) -> pd.DataFrame:
+    """
+    Reads messages list from csv file in database format
+    Params:                                                                     type:
+    @param path: Path to csv file                                               str
+    @return: Messages list, all values as read from file                        pd.DataFrame
+    """
+
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def read_dbc_msgs(path: str) -> pd.DataFrame:
+    """
+    Reads messages list from DBC file, payloads are initialized with zeros and periods with DBC cycle times
+    Params:                                                                     type:
+    @param path: Path to DBC file                                               str
+    @return: Messages list                                                      pd.DataFrame
+    """
+
+    try:
+        import cantools
+    except ImportError:
+        print('Could not import cantools, DBC files are not supported! Install it by: pip install cantools')
+        return pd.DataFrame(columns=['name', 'id', 'payload', 'period_en', 'period', 'channel', 'extended_id', 'fd',
+                                     'brs', 'generators'])
+
+    dbc_msgs = cantools.database.load_file(path).messages
+    return pd.DataFrame({'name': [dbc_msg.name for dbc_msg in dbc_msgs],
+                         'id': ['0x{:X}'.format(dbc_msg.frame_id) for dbc_msg in dbc_msgs],
+                         'payload': [' '.join(['0x00'] * dbc_msg.length) for dbc_msg in dbc_msgs],
+                         'period_en': [False] * len(dbc_msgs),
+                         'period': [dbc_msg.cycle_time or PERIOD_DEFAULT for dbc_msg in dbc_msgs],
+                         'extended_id': [dbc_msg.is_extended_frame for dbc_msg in dbc_msgs],
+                         'fd': [dbc_msg.is_fd for dbc_msg in dbc_msgs]})
+
+
+def read_msgs(path: str) -> pd.DataFrame:
+    """
+    Reads messages list from file, format is selected by file extension
+    Params:                                                                     type:
+    @param path: Path to csv or DBC file                                        str
+    @return: Messages list                                                      pd.DataFrame
+    """
+
+    if os.path.splitext(path)[1].lower() == '.dbc':
+        return read_dbc_msgs(path=path)
+    else:
+        return read_csv_msgs(path=path)
@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+"""
+This module includes definition of class MsgRegistry holding messages database in memory. Messages are identified
+by stable handles which survive deletion of other messages and can be looked up by CAN id or name in O(1).
+"""
+
+
+from typing import Dict, Iterator, List, Optional
+
+
+CHANNEL_MIN, CHANNEL_MAX = 0, 15
+STD_ID_MAX, EXT_ID_MAX = 0x7FF, 0x1FFFFFFF
+CAN_PAYLOAD_MAX = 8
+FD_PAYLOAD_LENGTHS = (0, 1, 2, 3, 4, 5, 6, 7, 8, 12, 16, 20, 24, 32, 48, 64)
+
+
+def parse_msg_id(msg_id: str) -> int:
+    """
+    Converts message id from database format
+    Params:                                                                     type:
+    @param msg_id: Message id, e.g. '0x567'                                     str
+    @return: CAN id                                                             int
+    """
+
+    return int(msg_id, 16)
+
+
+def parse_payload(payload: str) -> bytes:
+    """
+    Converts message payload from database format
+    Params:                                                                     type:
+    @param payload: Message payload, e.g. '0x50 0x40 0x30'                      str
+    @return: Payload bytes                                                      bytes
+    """
+
+    return bytes(int(B, 16) for B in payload.split(' '))
+
+
+def format_msg_id(can_id: int) -> str:
+    """
+    Converts CAN id to database format
+    Params:                                                                     type:
+    @param can_id: CAN id                                                       int
+    @return: Message id, e.g. '0x567'                                           str
+    """
+
+    return '0x{:X}'.format(can_id)
+
+
+def format_payload(payload: bytes) -> str:
+    """
+    Converts payload bytes to database format
+    Params:                                                                     type:
+    @param payload: Payload bytes                                               bytes
+    @return: Message payload, e.g. '0x50 0x40 0x30'                             str
+    """
+
+    return ' '.join('0x{:02X}'.format(B) for B in payload)
+
+
+def is_payload_len_valid(length: int, fd: bool) -> bool:
+    """
+    Checks if payload length can be sent in a single frame
+    Params:                                                                     type:
+    @param length: Number of payload bytes                                      int
+    @param fd: CAN FD frame                                                     bool
+    @return: Verdict if length matches one of DLC values                        bool
+    """
+
+    return length in FD_PAYLOAD_LENGTHS if fd else 0 <= length <= CAN_PAYLOAD_MAX
+
+
+class MsgRecord:
+    """ Class holding single message, records are never modified - changed message gets a new record """
+
+    __slots__ = ('handle', 'name', 'can_id', 'payload', 'period_en', 'period', 'channel', 'extended_id', 'fd', 'brs',
+                 'generators')
+
+    def __init__(self, handle: int, name: str, can_id: int, payload: bytes, period_en: bool, period: int,
+                 channel: int = 0, extended_id: bool = False, fd: bool = False, brs: bool = False,
+                 generators: str = '') -> None:
+        """
+        Setups message fields
+        Params:                                                                     type:
+        @param handle: Stable handle of the message                                 int
+        @param name: Message name                                                   str
+        @param can_id: CAN id                                                       int
+        @param payload: Payload bytes                                               bytes
+        @param period_en: Period transmission enabled                               bool
+        @param period: Transmission period in ms                                    int
+        @param channel: Index of the bus the message is sent on                     int
+        @param extended_id: 29-bit CAN id                                           bool
+        @param fd: CAN FD frame, payload up to 64 bytes                             bool
+        @param brs: CAN FD bit rate switch, data phase sent with data bitrate       bool
+        @param generators: Payload generators, empty for static payload             str
+        @return: None
+        """
+
+        self.handle = handle
+        self.name = name
+        self.can_id = can_id
+        self.payload = payload
+        self.period_en = period_en
+        self.period = period
+        self.channel = channel
+        self.extended_id = extended_id
+        self.fd = fd
+        self.brs = brs
+        self.generators = generators
+
+
+class MsgRegistry:
+    """ Class for indexed in-memory messages database """
+
+    def __init__(self) -> None:
+        self.__records_d: Dict[int, MsgRecord] = {}
+        self.__id_index_d: Dict[int, List[int]] = {}
+        self.__name_index_d: Dict[str, List[int]] = {}
+        self.__handles: List[int] = []
+        """ Positions of handles, positions from __positions_valid_len on are stale after delete """
+        self.__positions_d: Dict[int, int] = {}
+        self.__positions_valid_len = 0
+
+    @staticmethod
+    def __index_add(index_d: Dict, key, handle: int) -> None:
+        """
+        Adds handle to secondary index
+        Params:                                                                     type:
+        @param index_d: Secondary index                                             Dict
+        @param key: Indexed value                                                   Any
+        @param handle: Handle of the message                                        int
+        @return: None
+        """
+
+        index_d.setdefault(key, []).append(handle)
+
+    @staticmethod
+    def __index_remove(index_d: Dict, key, handle: int) -> None:
+        """
+        Removes handle from secondary index
+        Params:                                                                     type:
+        @param index_d: Secondary index                                             Dict
+        @param key: Indexed value                                                   Any
+        @param handle: Handle of the message                                        int
+        @return: None
+        """
+
+        handles = index_d[key]
+        handles.remove(handle)
+        if not handles:
+            del index_d[key]
+
+    def __get_position(self, handle: int) -> int:
+        """
+        Provides position of known handle, stale positions are recomputed at once
+        Params:                                                                     type:
+        @param handle: Handle of the message                                        int
+        @return: Index of the message                                               int
+        """
+
+        position = self.__positions_d[handle]
+        if position >= self.__positions_valid_len:
+            for position in range(self.__positions_valid_len, len(self.__handles)):
+                self.__positions_d[self.__handles[position]] = position
+            self.__positions_valid_len = len(self.__handles)
+            position = self.__positions_d[handle]
+        return position
+
+    """ ============================================= Class interface ============================================= """
+
+    def put(self, record: MsgRecord) -> None:
+        """
+        Adds message or replaces message with the same handle, new messages are placed at the end
+        Params:                                                                     type:
+        @param record: Message record                                               MsgRecord
+        @return: None
+        """
+
+        old_record = self.__records_d.get(record.handle)
+        if old_record is not None:
+            self.__index_remove(index_d=self.__id_index_d, key=old_record.can_id, handle=record.handle)
+            self.__index_remove(index_d=self.__name_index_d, key=old_record.name, handle=record.handle)
+        else:
+            """ New message - placed at the end """
+            if self.__positions_valid_len == len(self.__handles):
+                self.__positions_valid_len += 1
+            self.__positions_d[record.handle] = len(self.__handles)
+            self.__handles.append(record.handle)
+        self.__records_d[record.handle] = record
+        self.__index_add(index_d=self.__id_index_d, key=record.can_id, handle=record.handle)
+        self.__index_add(index_d=self.__name_index_d, key=record.name, handle=record.handle)
+
+    def delete(self, handle: int) -> Optional[MsgRecord]:
+        """
+        Removes message
+        Params:                                                                     type:
+        @param handle: Handle of the message                                        int
+        @return: Removed record or None if handle is unknown                        Optional[MsgRecord]
+        """
+
+        record = self.__records_d.pop(handle, None)
+        if record is not None:
+            self.__index_remove(index_d=self.__id_index_d, key=record.can_id, handle=handle)
+            self.__index_remove(index_d=self.__name_index_d, key=record.name, handle=handle)
+            position = self.__get_position(handle=handle)
+            del self.__handles[position]
+            del self.__positions_d[handle]
+            """ Following messages moved by one - their positions are recomputed on next lookup """
+            self.__positions_valid_len = min(self.__positions_valid_len, position)
+        return record
+
+    def get(self, handle: int) -> Optional[MsgRecord]:
+        """
+        Provides message by handle
+        Params:                                                                     type:
+        @param handle: Handle of the message                                        int
+        @return: Message record or None if handle is unknown                        Optional[MsgRecord]
+        """
+
+        return self.__records_d.get(handle)
+
+    def get_by_id(self, can_id: int) -> Optional[MsgRecord]:
+        """
+        Provides first message with specified CAN id
+        Params:                                                                     type:
+        @param can_id: CAN id                                                       int
+        @return: Message record or None if not found                                Optional[MsgRecord]
+        """
+
+        handles = self.__id_index_d.get(can_id)
+        return self.__records_d[handles[0]] if handles else None
+
+    def get_by_name(self, name: str) -> Optional[MsgRecord]:
+        """
+        Provides first message with specified name
+        Params:                                                                     type:
+        @param name: Message name                                                   str
+        @return: Message record or None if not found                                Optional[MsgRecord]
+        """
+
+        handles = self.__name_index_d.get(name)
+        return self.__records_d[handles[0]] if handles else None
+
+    def get_handle(self, index: int) -> Optional[int]:
+        """
+        Provides handle of message at specified position
+        Params:                                                                     type:
+        @param index: Index of the message in database                              int
+        @return: Handle or None if index is out of range                            Optional[int]
+        """
+
+        return self.__handles[index] if 0 <= index < len(self.__handles) else None
+
+    def get_index(self, handle: int) -> Optional[int]:
+        """
+        Provides position of message in database by dictionary lookup, positions of messages following deleted one
+        are recomputed once on the first lookup after delete
+        Params:                                                                     type:
+        @param handle: Handle of the message                                        int
+        @return: Index or None if handle is unknown                                 Optional[int]
+        """
+
+        return self.__get_position(handle=handle) if handle in self.__records_d else None
+
+    def __len__(self) -> int:
+        return len(self.__records_d)
+
+    def __iter__(self) -> Iterator[MsgRecord]:
+        return iter(self.__records_d.values())
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+This module includes definition of payload generators - rules changing part of message payload on every send:
+    - counter(bit=0, len=4, min=0, max=15, step=1)      - rolling counter, wraps from max to min
+    - ramp(bit=8, len=8, min=0, max=100, step=5)        - triangle ramp, goes up to max and back down to min
+    - random(bit=16, len=8, min=0, max=255)             - random value
+    - seq(bit=24, len=8, values=1|2|4|8)                - values taken from lookup sequence in turn
+    - crc8(byte=7, first=0, last=6, poly=0x1D, init=0xFF, xor=0xFF) - CRC8 of payload bytes first..last
+
+Rules of a message are separated with ';'. Fields use Intel (little endian) bit numbering: bit N is bit N % 8 of
+byte N // 8. CRC rules are evaluated after all field rules. Values of fields are updated in numpy arrays for all
+due messages at once, CRCs use precomputed 256-entry tables. Message of compiled frame is never modified - every send
+of a frame with generators gets its own copy of the message, so frames waiting in TX queue keep their values and
+every frame of a burst carries its own counter and CRC.
+"""
+
+
+import copy
+import re
+from functools import lru_cache
+from threading import Lock
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Sequence, Tuple, Union
+
+if TYPE_CHECKING:
+    """ Used only in annotations, frametable compiles generators with this module """
+    import can
+    from frametable import CompiledFrame, FrameTable
+
+
+FIELD_KINDS = ('counter', 'ramp', 'random', 'seq')
+__RULE_PATTERN = re.compile(r'\s*(\w+)\s*\(([^)]*)\)\s*')
+
+
+class FieldRule(NamedTuple):
+    kind: str
+    start_bit: int
+    length: int
+    minimum: int
+    maximum: int
+    step: int
+    values: Tuple[int, ...]
+
+
+class Crc8Rule(NamedTuple):
+    byte: int
+    first: int
+    last: int
+    poly: int
+    init: int
+    xor_out: int
+
+
+GeneratorRule = Union[FieldRule, Crc8Rule]
+
+
+@lru_cache(maxsize=None)
+def crc8_table(poly: int) -> bytes:
+    """
+    Computes lookup table of MSB-first CRC8
+    Params:                                                                     type:
+    @param poly: CRC polynomial, e.g. 0x1D (SAE J1850)                          int
+    @return: CRC of every byte value                                            bytes
+    """
+
+    table = bytearray(256)
+    for value in range(256):
+        crc = value
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table[value] = crc
+    return bytes(table)
+
+
+def parse_generators(spec: str, payload_len: int) -> Tuple[GeneratorRule, ...]:
+    """
+    Converts generators from database format, field rules first and CRC rules last
+    Params:                                                                     type:
+    @param spec: Rules, e.g. 'counter(bit=0,len=4);crc8(byte=7,first=0,last=6)' str
+    @param payload_len: Number of payload bytes                                 int
+    @return: Rules                                                              Tuple[GeneratorRule, ...]
+    @raise ValueError: Rule is unknown, has invalid parameters or does not fit in payload
+    """
+
+    field_rules, crc_rules = [], []
+    for rule_spec in filter(str.strip, spec.split(';')):
+        match = __RULE_PATTERN.fullmatch(rule_spec)
+        if match is None:
+            raise ValueError('generator "{}" is not in format kind(param=value, ...)'.format(rule_spec.strip()))
+        kind = match.group(1).lower()
+        try:
+            params = {name.strip().lower(): value.strip() for name, value in
+                      (param.split('=', 1) for param in match.group(2).split(',') if param.strip())}
+        except ValueError:
+            raise ValueError('generator "{}" parameters are not in format param=value'.format(kind))
+
+        try:
+            if kind in FIELD_KINDS:
+                start_bit, length = int(params.pop('bit', '0'), 0), int(params.pop('len', '8'), 0)
+                values = tuple(int(value, 0) for value in params.pop('values', '').split('|') if value.strip())
+                minimum = int(params.pop('min', '0'), 0)
+                maximum = int(params.pop('max', str((1 << length) - 1)), 0)
+                step = int(params.pop('step', '1'), 0)
+                rule = FieldRule(kind=kind, start_bit=start_bit, length=length, minimum=minimum, maximum=maximum,
+                                 step=step, values=values)
+            elif kind == 'crc8':
+                rule = Crc8Rule(byte=int(params.pop('byte'), 0), first=int(params.pop('first', '0'), 0),
+                                last=int(params.pop('last', str(payload_len - 2)), 0),
+                                poly=int(params.pop('poly', '0x1D'), 0), init=int(params.pop('init', '0xFF'), 0),
+                                xor_out=int(params.pop('xor', '0xFF'), 0))
+            else:
+                rule = None
+        except KeyError as e:
+            raise ValueError('generator "{}" requires parameter {}'.format(kind, e))
+        except ValueError as e:
+            raise ValueError('generator "{}" parameter is not a number: {}'.format(kind, e))
+        if rule is None:
+            raise ValueError('generator "{}" is unknown'.format(kind))
+        if params:
+            raise ValueError('generator "{}" has unknown parameters {}'.format(kind, ', '.join(params)))
+
+        if isinstance(rule, FieldRule):
+            if not (0 < rule.length <= 64 and 0 <= rule.start_bit and rule.start_bit + rule.length <= payload_len * 8):
+                raise ValueError('generator "{}" field does not fit in payload'.format(kind))
+            if not 0 <= rule.minimum <= rule.maximum < 1 << rule.length:
+                raise ValueError('generator "{}" range does not fit in {} bits'.format(kind, rule.length))
+            if kind == 'seq' and not (rule.values and all(0 <= value < 1 << rule.length for value in rule.values)):
+                raise ValueError('generator "seq" requires values fitting in {} bits'.format(rule.length))
+            field_rules.append(rule)
+        else:
+            if not (0 <= rule.byte < payload_len and 0 <= rule.first <= rule.last < payload_len and
+                    max(rule.poly, rule.init, rule.xor_out) <= 0xFF):
+                raise ValueError('generator "crc8" bytes do not fit in payload')
+            crc_rules.append(rule)
+    return tuple(field_rules + crc_rules)
+
+
+class PayloadEngine:
+    """ Class for generating payloads of due frames according to their generators """
+
+    def __init__(self) -> None:
+        """
+        Setups empty engine, generators are compiled on first use of frames table
+        Params:                                                                     type:
+        @return: None
+        """
+
+        self.__lock = Lock()
+        self.__frame_table = None
+        self.__frames_d: Dict[int, 'CompiledFrame'] = {}
+        self.__rules_pos_d: Dict[int, List[int]] = {}
+        self.__crc_rules_d: Dict[int, List[Tuple[int, int, int, bytes, int, int]]] = {}
+        self.__np = None
+        self.__rng = None
+        self.__state = None
+
+    def __compile(self, frame_table: 'FrameTable') -> None:
+        """
+        Compiles field rules of all frames into arrays, state of frames which did not change is kept
+        Params:                                                                     type:
+        @param frame_table: Compiled frames table snapshot                          FrameTable
+        @return: None
+        """
+
+        old_frames_d, old_rules_pos_d, old_state = self.__frames_d, self.__rules_pos_d, self.__state
+        self.__frame_table = frame_table
+        self.__frames_d, self.__rules_pos_d, self.__crc_rules_d = {}, {}, {}
+        field_rules: List[FieldRule] = []
+        current_values: List[int] = []
+        directions: List[int] = []
+        for frame in frame_table.get_frames():
+            if not frame.generators:
+                continue
+            self.__frames_d[frame.handle] = frame
+            positions = []
+            old_positions = old_rules_pos_d.get(frame.handle) if old_frames_d.get(frame.handle) is frame else None
+            for rule in frame.generators:
+                if isinstance(rule, FieldRule):
+                    if old_positions:
+                        """ Frame not changed - continue from its current values """
+                        old_pos = old_positions[len(positions)]
+                        current_values.append(int(old_state['current'][old_pos]))
+                        directions.append(int(old_state['direction'][old_pos]))
+                    else:
+                        current_values.append(0 if rule.kind == 'seq' else rule.minimum)
+                        directions.append(1)
+                    positions.append(len(field_rules))
+                    field_rules.append(rule)
+                else:
+                    self.__crc_rules_d.setdefault(frame.handle, []).append(
+                        (rule.byte, rule.first, rule.last + 1, crc8_table(poly=rule.poly), rule.init, rule.xor_out))
+            self.__rules_pos_d[frame.handle] = positions
+
+        if not field_rules:
+            self.__state = None
+            return
+        if self.__np is None:
+            """ numpy is imported only if generators are used """
+            import numpy
+            self.__np = numpy
+            self.__rng = numpy.random.default_rng()
+        np = self.__np
+        seq_len = max([len(rule.values) for rule in field_rules] + [1])
+        self.__state = {
+            'kind': np.array([FIELD_KINDS.index(rule.kind) for rule in field_rules], dtype=np.int8),
+            'minimum': np.array([rule.minimum for rule in field_rules], dtype=np.int64),
+            'maximum': np.array([rule.maximum for rule in field_rules], dtype=np.int64),
+            'step': np.array([rule.step for rule in field_rules], dtype=np.int64),
+            'seq': np.array([rule.values + (0, ) * (seq_len - len(rule.values)) for rule in field_rules],
+                            dtype=np.int64),
+            'seq_len': np.array([max(len(rule.values), 1) for rule in field_rules], dtype=np.int64),
+            'current': np.array(current_values, dtype=np.int64),
+            'direction': np.array(directions, dtype=np.int64),
+            'first_byte': [rule.start_bit // 8 for rule in field_rules],
+            'end_byte': [(rule.start_bit + rule.length - 1) // 8 + 1 for rule in field_rules],
+            'shift': [rule.start_bit % 8 for rule in field_rules],
+            'mask': [((1 << rule.length) - 1) << (rule.start_bit % 8) for rule in field_rules],
+        }
+
+    def __next_values(self, positions: Sequence[int]) -> List[int]:
+        """
+        Provides values of field rules for this cycle and advances their state, all rules are updated at once
+        Params:                                                                     type:
+        @param positions: Positions of rules in state arrays                        Sequence[int]
+        @return: Values to be written                                               List[int]
+        """
+
+        np, state = self.__np, self.__state
+        idx = np.asarray(positions, dtype=np.intp)
+        kind, current = state['kind'][idx], state['current'][idx]
+        minimum, maximum, step = state['minimum'][idx], state['maximum'][idx], state['step'][idx]
+        span = maximum - minimum + 1
+        values = current.copy()
+
+        is_random = kind == FIELD_KINDS.index('random')
+        if is_random.any():
+            values[is_random] = self.__rng.integers(minimum[is_random], maximum[is_random] + 1)
+        is_seq = kind == FIELD_KINDS.index('seq')
+        if is_seq.any():
+            values[is_seq] = state['seq'][idx[is_seq], current[is_seq]]
+
+        """ Advance state - counter wraps, ramp bounces, sequence goes to next element """
+        next_current = np.where(kind == FIELD_KINDS.index('counter'), minimum + (current - minimum + step) % span,
+                                current)
+        is_ramp = kind == FIELD_KINDS.index('ramp')
+        if is_ramp.any():
+            direction = state['direction'][idx]
+            turn = ((direction > 0) & (current >= maximum)) | ((direction < 0) & (current <= minimum))
+            direction = np.where(turn, -direction, direction)
+            ramp_next = np.clip(current + direction * step, minimum, maximum)
+            next_current = np.where(is_ramp, ramp_next, next_current)
+            state['direction'][idx[is_ramp]] = direction[is_ramp]
+        next_current = np.where(is_seq, (current + 1) % state['seq_len'][idx], next_current)
+        state['current'][idx] = next_current
+        return values.tolist()
+
+    """ ============================================= Class interface ============================================= """
+
+    def generate(self, frame_table: 'FrameTable', frames: Sequence['CompiledFrame']) -> List['can.Message']:
+        """
+        Provides messages to be sent for frames, frames with generators get a copy of their message with generated
+        values, messages of static frames are shared. Frame listed several times (burst, caught up cycles) gets a copy
+        with its own values for every occurrence
+        Params:                                                                     type:
+        @param frame_table: Current compiled frames table snapshot                  FrameTable
+        @param frames: Frames about to be sent                                      Sequence[CompiledFrame]
+        @return: Messages in order of frames                                        List[can.Message]
+        """
+
+        msgs = [frame.msg for frame in frames]
+        if not any(frame.generators for frame in frames):
+            return msgs
+
+        with self.__lock:
+            if frame_table is not self.__frame_table:
+                self.__compile(frame_table=frame_table)
+            """ Every round holds single occurrence of a frame, so state of its rules advances once per message """
+            rounds: List[List[int]] = []
+            occurrences_d: Dict[int, int] = {}
+            for index, frame in enumerate(frames):
+                if frame.generators and self.__frames_d.get(frame.handle) is frame:
+                    occurrence = occurrences_d.get(frame.handle, 0)
+                    occurrences_d[frame.handle] = occurrence + 1
+                    if occurrence == len(rounds):
+                        rounds.append([])
+                    rounds[occurrence].append(index)
+                    msg = msgs[index] = copy.copy(frame.msg)
+                    msg.data = bytearray(msg.data)
+
+            for indexes in rounds:
+                if self.__state is None:
+                    break
+                frame_positions = [self.__rules_pos_d[frames[index].handle] for index in indexes]
+                positions = [pos for frame_pos in frame_positions for pos in frame_pos]
+                if not positions:
+                    continue
+                values = iter(self.__next_values(positions=positions))
+                first_bytes, end_bytes = self.__state['first_byte'], self.__state['end_byte']
+                shifts, masks = self.__state['shift'], self.__state['mask']
+                for index, frame_pos in zip(indexes, frame_positions):
+                    data = msgs[index].data
+                    for pos in frame_pos:
+                        first, end = first_bytes[pos], end_bytes[pos]
+                        chunk = int.from_bytes(data[first:end], 'little')
+                        chunk = (chunk & ~masks[pos]) | ((next(values) << shifts[pos]) & masks[pos])
+                        data[first:end] = chunk.to_bytes(end - first, 'little')
+
+            for indexes in rounds:
+                for index in indexes:
+                    data = msgs[index].data
+                    for byte, first, end, table, crc, xor_out in self.__crc_rules_d.get(frames[index].handle, ()):
+                        for value in data[first:end]:
+                            crc = table[crc ^ value]
+                        data[byte] = crc ^ xor_out
+        return msgs
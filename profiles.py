@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+"""
+This module includes definition of class ProfileManager holding several messages databases (profiles, e.g. vehicle
+variants or test configurations). All profiles are loaded and compiled into frames tables when added, switching the
+active profile is a single reference swap - no disk access, TX schedulers keep running and messages present in both
+profiles keep their phase.
+"""
+
+
+import os
+from threading import Lock
+from typing import Callable, Dict, List, Optional
+
+from dbman import DataBaseMan
+from frametable import CompiledFrame, FrameTable
+
+
+class ProfileManager:
+    """ Class for preloaded messages databases with a single active one """
+
+    def __init__(self, profiles_d: Dict[str, str]) -> None:
+        """
+        Loads all profiles, the first one is active
+        Params:                                                                     type:
+        @param profiles_d: Paths to databases (csv or SQLite) by profile name       Dict[str, str]
+        @return: None
+        """
+
+        self.__profiles_d: Dict[str, DataBaseMan] = {}
+        self.__update_listeners: List[Callable[[], None]] = []
+        self.__payload_listeners: List[Callable[[List[CompiledFrame]], None]] = []
+        self.__switch_lock = Lock()
+        for name, db_path in profiles_d.items():
+            self.add_profile(name=name, db_path=db_path)
+        self.__active_name = next(iter(self.__profiles_d))
+        self.__active = self.__profiles_d[self.__active_name]
+
+    @staticmethod
+    def get_profile_name(db_path: str) -> str:
+        """
+        Provides default profile name of database
+        Params:                                                                     type:
+        @param db_path: Path to database file                                       str
+        @return: File name without extension                                        str
+        """
+
+        return os.path.splitext(os.path.basename(db_path))[0]
+
+    def __on_db_update(self, database_man: DataBaseMan) -> None:
+        """
+        Propagates changes of active profile, changes of inactive profiles are not sent
+        Params:                                                                     type:
+        @param database_man: Changed database                                       DataBaseMan
+        @return: None
+        """
+
+        if database_man is self.__active:
+            for listener in self.__update_listeners:
+                listener()
+        else:
+            """ Inactive profile edited - nothing to send """
+            pass
+
+    def __on_payload_update(self, database_man: DataBaseMan, frames: List[CompiledFrame]) -> None:
+        """
+        Propagates live payload updates of active profile
+        Params:                                                                     type:
+        @param database_man: Changed database                                       DataBaseMan
+        @param frames: Frames with replaced payloads                                List[CompiledFrame]
+        @return: None
+        """
+
+        if database_man is self.__active:
+            for listener in self.__payload_listeners:
+                listener(frames)
+
+    """ ============================================= Class interface ============================================= """
+
+    def add_profile(self, name: str, db_path: str) -> bool:
+        """
+        Loads database and compiles it into frames table
+        Params:                                                                     type:
+        @param name: Profile name                                                   str
+        @param db_path: Path to database file                                       str
+        @return: Information if profile was added, names must be unique             bool
+        """
+
+        if name in self.__profiles_d:
+            print('Profile {} not added - name already used'.format(name))
+            return False
+        database_man = DataBaseMan(db_path=db_path)
+        database_man.add_update_listener(lambda: self.__on_db_update(database_man=database_man))
+        database_man.add_payload_listener(lambda frames: self.__on_payload_update(database_man=database_man,
+                                                                                  frames=frames))
+        self.__profiles_d[name] = database_man
+        return True
+
+    def switch(self, name: str) -> bool:
+        """
+        Makes profile active, TX channels take its frames table in the next cycle
+        Params:                                                                     type:
+        @param name: Profile name                                                   str
+        @return: Information if profile was switched                                bool
+        """
+
+        database_man = self.get_profile(name=name)
+        if database_man is None:
+            print('Profile {} not found'.format(name))
+            return False
+        with self.__switch_lock:
+            self.__active_name, self.__active = name, database_man
+            for listener in self.__update_listeners:
+                listener()
+        print('Active profile: {}'.format(name))
+        return True
+
+    def get_active(self) -> DataBaseMan:
+        """
+        Provides database of active profile
+        Params:                                                                     type:
+        @return: Messages database manager                                          DataBaseMan
+        """
+
+        return self.__active
+
+    def get_active_name(self) -> str:
+        """
+        Provides name of active profile
+        Params:                                                                     type:
+        @return: Profile name                                                       str
+        """
+
+        return self.__active_name
+
+    def get_profile(self, name: str) -> Optional[DataBaseMan]:
+        """
+        Provides database of profile
+        Params:                                                                     type:
+        @param name: Profile name                                                   str
+        @return: Messages database manager or None if not found                     Optional[DataBaseMan]
+        """
+
+        return self.__profiles_d.get(name)
+
+    def get_profile_names(self) -> List[str]:
+        """
+        Provides names of all profiles
+        Params:                                                                     type:
+        @return: Profile names in order of adding                                   List[str]
+        """
+
+        return list(self.__profiles_d)
+
+    def get_frame_table(self) -> FrameTable:
+        """
+        Provides frames table of active profile, no lock is taken
+        Params:                                                                     type:
+        @return: Compiled frames                                                    FrameTable
+        """
+
+        return self.__active.get_frame_table()
+
+    def add_update_listener(self, listener: Callable[[], None]) -> None:
+        """
+        Registers function called after every change of active profile database and after profile switch
+        Params:                                                                     type:
+        @param listener: Function called with no arguments                          Callable
+        @return: None
+        """
+
+        self.__update_listeners.append(listener)
+
+    def add_payload_listener(self, listener: Callable[[List[CompiledFrame]], None]) -> None:
+        """
+        Registers function called after live payload updates of active profile, frames table is not changed
+        Params:                                                                     type:
+        @param listener: Function called with frames of changed payloads            Callable
+        @return: None
+        """
+
+        self.__payload_listeners.append(listener)
+
+    def flush(self) -> int:
+        """
+        Writes live updates of all profiles to their databases, updates made before profile switch are written too
+        Params:                                                                     type:
+        @return: Number of written messages                                         int
+        """
+
+        return sum(database_man.flush() for database_man in self.__profiles_d.values())
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+This module includes definition of class TrafficRecorder responsible for recording of transmitted and received CAN
+frames to log files (BLF, ASC or any other format supported by can.Logger). Send path and bus notifier only append
+frames to in-memory ring buffer, frames are converted and written in batches by background writer thread, so
+recording never blocks sending. When writer does not keep up, the oldest frames are dropped and counted.
+"""
+
+
+import logging
+import os
+import time
+from collections import deque
+from threading import Event, Thread
+from typing import Any, Dict, List, Optional
+import can
+
+
+logger = logging.getLogger(__name__)
+
+
+class TrafficRecorder(can.Listener):
+    """ Class for buffered recording of bus traffic """
+
+    __CAPACITY = 65536
+    __FLUSH_INTERVAL_S = 0.2
+
+    def __init__(self, path: str, channel: int = 0, capacity: int = __CAPACITY, rotate_bytes: Optional[int] = None,
+                 rotate_s: Optional[float] = None, flush_interval_s: float = __FLUSH_INTERVAL_S) -> None:
+        """
+        Setups ring buffer, log file is created when recording is started
+        Params:                                                                     type:
+        @param path: Path to log file, format is selected by extension (.blf, .asc) str
+        @param channel: Channel written to log with every frame                     int
+        @param capacity: Maximal number of frames waiting to be written            int
+        @param rotate_bytes: Start new file when log reaches size, None to disable  Optional[int]
+        @param rotate_s: Start new file after time in seconds, None to disable      Optional[float]
+        @param flush_interval_s: Period of writing buffered frames to file          float
+        @return: None
+        """
+
+        self.__path = path
+        self.__channel = channel
+        self.__rotate_bytes = rotate_bytes
+        self.__rotate_s = rotate_s
+        self.__flush_interval_s = flush_interval_s
+        self.__ring = deque(maxlen=capacity)
+        self.__stop_event = Event()
+        self.__writer_thread = None
+        self.__writer = None
+        self.__file_opened = 0.0
+        self.__files: List[str] = []
+        self.__recorded_cnt = 0
+        self.__dropped_cnt = 0
+
+    def __get_file_path(self) -> str:
+        """
+        Provides path of the next log file, files are numbered if rotation is enabled
+        Params:                                                                     type:
+        @return: Path to log file                                                   str
+        """
+
+        if self.__rotate_bytes is None and self.__rotate_s is None:
+            return self.__path
+        base, ext = os.path.splitext(self.__path)
+        return '{}_{:03d}{}'.format(base, len(self.__files), ext)
+
+    def __open_writer(self) -> None:
+        """
+        Opens new log file
+        Params:                                                                     type:
+        @return: None
+        """
+
+        path = self.__get_file_path()
+        if os.path.dirname(path) and not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        self.__writer = can.Logger(path)
+        self.__file_opened = time.monotonic()
+        self.__files.append(path)
+
+    def __close_writer(self) -> None:
+        """
+        Closes current log file
+        Params:                                                                     type:
+        @return: None
+        """
+
+        if self.__writer is not None:
+            self.__writer.stop()
+            self.__writer = None
+
+    def __is_rotation_due(self) -> bool:
+        """
+        Checks if current log file reached its size or time limit
+        Params:                                                                     type:
+        @return: Verdict if new file has to be started                              bool
+        """
+
+        return ((self.__rotate_s is not None and time.monotonic() - self.__file_opened >= self.__rotate_s) or
+                (self.__rotate_bytes is not None and self.__writer.file_size() >= self.__rotate_bytes))
+
+    def __flush(self) -> None:
+        """
+        Writes all buffered frames to log file
+        Params:                                                                     type:
+        @return: None
+        """
+
+        ring = self.__ring
+        for _ in range(len(ring)):
+            timestamp, msg, data = ring.popleft()
+            if data is None:
+                """ Received frame - bus provided a new message object """
+                msg.channel = self.__channel
+            else:
+                """ Sent frame - message object is reused by sender, payload copied when frame was sent """
+                msg = can.Message(timestamp=timestamp, arbitration_id=msg.arbitration_id,
+                                  is_extended_id=msg.is_extended_id, is_remote_frame=msg.is_remote_frame,
+                                  is_fd=msg.is_fd, bitrate_switch=msg.bitrate_switch, data=data,
+                                  channel=self.__channel, is_rx=False)
+            self.__writer.on_message_received(msg)
+            self.__recorded_cnt += 1
+        if self.__is_rotation_due():
+            self.__close_writer()
+            self.__open_writer()
+
+    def __run_writer(self) -> None:
+        """
+        Writer thread loop, buffered frames are written periodically until recording is stopped
+        Params:                                                                     type:
+        @return: None
+        """
+
+        try:
+            self.__open_writer()
+            while not self.__stop_event.wait(timeout=self.__flush_interval_s):
+                self.__flush()
+            self.__flush()
+        except (OSError, ValueError) as e:
+            logger.error('Recording to %s failed: %s', self.__path, e)
+        finally:
+            self.__close_writer()
+
+    """ ============================================= Class interface ============================================= """
+
+    def record_tx(self, msg: can.Message) -> None:
+        """
+        Adds sent frame to ring buffer, called by TX pipeline right after frame is sent
+        Params:                                                                     type:
+        @param msg: Sent frame                                                      can.Message
+        @return: None
+        """
+
+        if len(self.__ring) == self.__ring.maxlen:
+            self.__dropped_cnt += 1
+        self.__ring.append((time.time(), msg, bytes(msg.data)))
+
+    def on_message_received(self, msg: can.Message) -> None:
+        """
+        Adds received frame to ring buffer, called by bus notifier
+        Params:                                                                     type:
+        @param msg: Received frame                                                  can.Message
+        @return: None
+        """
+
+        if len(self.__ring) == self.__ring.maxlen:
+            self.__dropped_cnt += 1
+        self.__ring.append((msg.timestamp, msg, None))
+
+    def start(self) -> None:
+        """
+        Starts writer thread
+        Params:                                                                     type:
+        @return: None
+        """
+
+        self.__stop_event.clear()
+        self.__writer_thread = Thread(target=self.__run_writer, name='canvector-recorder', daemon=True)
+        self.__writer_thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops recording, buffered frames are written and log file is closed
+        Params:                                                                     type:
+        @return: None
+        """
+
+        self.__stop_event.set()
+        if self.__writer_thread is not None:
+            self.__writer_thread.join()
+            self.__writer_thread = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Provides recording statistics
+        Params:                                                                     type:
+        @return: Recorded and dropped frames, buffered frames and log files         Dict[str, Any]
+        """
+
+        return {'recorded': self.__recorded_cnt, 'dropped': self.__dropped_cnt, 'buffered': len(self.__ring),
+                'files': list(self.__files)}
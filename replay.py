@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+"""
+This module includes definition of class TraceReplay responsible for sending frames recorded in log files (ASC, BLF,
+python-can CSV and other formats supported by can.LogReader). Log is streamed frame by frame - file is never loaded
+as a whole, so traces of several GB can be replayed. Frames are sent by TX pipeline of the bus at original timing
+scaled by speed factor or as fast as the bus accepts them.
+"""
+
+
+import logging
+import time
+from threading import Event, Thread
+from typing import Collection, Dict, Iterator, List, Optional, Tuple
+import can
+
+from msgregistry import STD_ID_MAX
+from txpipeline import TxPipeline
+
+
+logger = logging.getLogger(__name__)
+
+
+class TraceReplay:
+    """ Class for replaying log file on a single bus """
+
+    MAX_SPEED = 0
+    __SPIN_S = 0.001
+    __BATCH_MAX = 256
+    __QUEUE_DEPTH_MAX = 1024
+
+    def __init__(self, path: str, tx_pipeline: TxPipeline, speed: float = 1.0,
+                 id_filter: Optional[Collection[int]] = None, id_map: Optional[Dict[int, int]] = None,
+                 log_channels: Optional[Collection] = None, loop: bool = False) -> None:
+        """
+        Setups replay, log file is opened when replay is started
+        Params:                                                                     type:
+        @param path: Path to log file                                               str
+        @param tx_pipeline: TX pipeline of the bus                                  TxPipeline
+        @param speed: Timing scale, 2.0 is twice as fast, MAX_SPEED sends frames
+                      without waiting                                               float
+        @param id_filter: CAN ids to be sent, None to send all                      Optional[Collection[int]]
+        @param id_map: CAN ids to be replaced, original id: sent id                 Optional[Dict[int, int]]
+        @param log_channels: Channels of log to be sent, None to send all           Optional[Collection]
+        @param loop: Start again from beginning when end of log is reached, log
+                     with zero duration is sent once                                bool
+        @return: None
+        """
+
+        self.__path = path
+        self.__tx_pipeline = tx_pipeline
+        self.__speed = speed
+        self.__id_filter = None if id_filter is None else frozenset(id_filter)
+        self.__id_map = dict(id_map or {})
+        self.__log_channels = None if log_channels is None else frozenset(log_channels)
+        self.__loop = loop
+        self.__stop_event = Event()
+        self.__replay_thread = None
+        self.__replayed_cnt = 0
+
+    def __read_msgs(self) -> Iterator[Tuple[float, can.Message]]:
+        """
+        Streams frames to be sent from log file, filtered and remapped
+        Params:                                                                     type:
+        @return: Time from the first frame of log in seconds and frame              Iterator[Tuple[float, can.Message]]
+        """
+
+        pass_offset = 0.0
+        while not self.__stop_event.is_set():
+            first_timestamp, offset, pass_sent = None, 0.0, False
+            with can.LogReader(self.__path) as reader:
+                for msg in reader:
+                    if first_timestamp is None:
+                        """ Timing is relative to the first frame of log, also if it is filtered out """
+                        first_timestamp = msg.timestamp
+                    if self.__stop_event.is_set():
+                        return
+                    offset = msg.timestamp - first_timestamp
+                    if (msg.is_error_frame or
+                            (self.__log_channels is not None and msg.channel not in self.__log_channels) or
+                            (self.__id_filter is not None and msg.arbitration_id not in self.__id_filter)):
+                        continue
+                    new_id = self.__id_map.get(msg.arbitration_id)
+                    if new_id is not None:
+                        msg.arbitration_id = new_id
+                        msg.is_extended_id = msg.is_extended_id or new_id > STD_ID_MAX
+                    msg.is_rx = False
+                    pass_sent = True
+                    yield pass_offset + offset, msg
+            if not self.__loop or not pass_sent:
+                return
+            if offset <= 0:
+                """ Log without duration has no cycle time - looping it would only spin """
+                logger.warning('Replay of %s not looped, log has zero duration', self.__path)
+                return
+            pass_offset += offset
+
+    def __submit(self, batch: List[can.Message]) -> None:
+        """
+        Queues frames to TX pipeline, waits while pipeline is loaded so frames are not dropped
+        Params:                                                                     type:
+        @param batch: Frames to be sent                                             List[can.Message]
+        @return: None
+        """
+
+        while self.__tx_pipeline.get_queue_depth() >= self.__QUEUE_DEPTH_MAX:
+            if self.__stop_event.wait(timeout=self.__SPIN_S):
+                return
+        self.__replayed_cnt += self.__tx_pipeline.submit(batch)
+        batch.clear()
+
+    def __sleep_until(self, deadline: float) -> bool:
+        """
+        Sleeps until deadline, last part is spun to reduce wake up latency
+        Params:                                                                     type:
+        @param deadline: Monotonic time to wake up                                  float
+        @return: Information if replay was stopped                                  bool
+        """
+
+        remaining = deadline - time.monotonic()
+        if remaining > self.__SPIN_S and self.__stop_event.wait(timeout=remaining - self.__SPIN_S):
+            return True
+        while time.monotonic() < deadline:
+            pass
+        return self.__stop_event.is_set()
+
+    def __run(self) -> None:
+        """
+        Replay thread loop, frames due at the same moment are queued as one batch
+        Params:                                                                     type:
+        @return: None
+        """
+
+        batch: List[can.Message] = []
+        start = time.monotonic()
+        try:
+            for offset, msg in self.__read_msgs():
+                if self.__speed != self.MAX_SPEED:
+                    deadline = start + offset / self.__speed
+                    if deadline > time.monotonic():
+                        """ Frame not due yet - send what is collected and wait """
+                        if batch:
+                            self.__submit(batch=batch)
+                        if self.__sleep_until(deadline=deadline):
+                            break
+                batch.append(msg)
+                if len(batch) >= self.__BATCH_MAX:
+                    self.__submit(batch=batch)
+            if batch and not self.__stop_event.is_set():
+                self.__submit(batch=batch)
+            while self.__tx_pipeline.get_queue_depth() and not self.__stop_event.wait(timeout=self.__SPIN_S):
+                """ Replay is running until the last frame is sent """
+                pass
+        except (OSError, ValueError, can.CanError) as e:
+            logger.error('Replay of %s failed: %s', self.__path, e)
+        print('Replay finished: {} frames sent'.format(self.__replayed_cnt))
+
+    """ ============================================= Class interface ============================================= """
+
+    def start(self) -> None:
+        """
+        Starts replay thread
+        Params:                                                                     type:
+        @return: None
+        """
+
+        self.__stop_event.clear()
+        self.__replay_thread = Thread(target=self.__run, name='canvector-replay', daemon=True)
+        self.__replay_thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops replay, frames already queued are still sent
+        Params:                                                                     type:
+        @return: None
+        """
+
+        self.__stop_event.set()
+        if self.__replay_thread is not None:
+            self.__replay_thread.join()
+
+    def is_running(self) -> bool:
+        """
+        Provides replay state
+        Params:                                                                     type:
+        @return: Information if log is being replayed                               bool
+        """
+
+        return self.__replay_thread is not None and self.__replay_thread.is_alive()
+
+    def get_replayed_count(self) -> int:
+        """
+        Provides number of frames queued to be sent
+        Params:                                                                     type:
+        @return: Number of replayed frames                                          int
+        """
+
+        return self.__replayed_cnt
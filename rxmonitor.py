@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+"""
+This module includes definition of class RxMonitor collecting statistics of received CAN frames and answering
+requests. Monitor is a bus notifier listener - per-id counters, intervals and last payload are kept in structures
+preallocated for given number of ids, so RX thread does not allocate per frame. Statistics are read by GUI or
+scripts at their own rate.
+Two levels of acceptance filters are supported:
+    - bus filters (can.BusABC.set_filters) - done by driver/hardware where supported, they apply to all listeners of
+      the bus (e.g. recorder too)
+    - monitor filters - checked in software by monitor only
+Reactive rules send database message when given id (optionally with payload pattern) is received, response is
+submitted directly from RX thread to TX pipeline. Statistics and rules are kept per CAN id and id type, so standard
+and extended frames of the same id value are never mixed - extended ids are written with 'x' suffix, e.g. '0x100x'.
+"""
+
+
+import time
+from array import array
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+import can
+
+from msgregistry import EXT_ID_MAX, STD_ID_MAX, format_msg_id, format_payload, parse_msg_id
+
+
+""" python-can acceptance filter, e.g. {'can_id': 0x100, 'can_mask': 0x7F0, 'extended': False} """
+RxFilter = Dict[str, Any]
+
+
+class RxRule(NamedTuple):
+    can_id: int
+    response_handle: int
+    data: bytes = b''
+    mask: bytes = b''
+    extended_id: bool = False
+
+
+def parse_rx_id(rx_id: str) -> Tuple[int, bool]:
+    """
+    Converts CAN id from command line format
+    Params:                                                                     type:
+    @param rx_id: CAN id, 'x' suffix marks extended id, e.g. '0x100x'           str
+    @return: CAN id and extended flag, ids over 11 bits are always extended     Tuple[int, bool]
+    @raise ValueError: Invalid CAN id
+    """
+
+    extended = len(rx_id) > 2 and rx_id[-1] in 'xX'
+    can_id = parse_msg_id(msg_id=rx_id[:-1] if extended else rx_id)
+    if not 0 <= can_id <= EXT_ID_MAX:
+        raise ValueError('CAN id {} exceeds 29-bit range'.format(rx_id))
+    return can_id, extended or can_id > STD_ID_MAX
+
+
+def format_rx_id(can_id: int, extended: bool) -> str:
+    """
+    Converts CAN id to command line format
+    Params:                                                                     type:
+    @param can_id: CAN id                                                       int
+    @param extended: Extended id                                                bool
+    @return: CAN id, extended with 'x' suffix, e.g. '0x100x'                    str
+    """
+
+    return format_msg_id(can_id=can_id) + ('x' if extended else '')
+
+
+def parse_rx_filter(rx_filter: str) -> RxFilter:
+    """
+    Converts acceptance filter from command line format
+    Params:                                                                     type:
+    @param rx_filter: CAN id with optional mask, e.g. '0x100' or '0x100x/0x700' str
+    @return: python-can filter                                                  RxFilter
+    @raise ValueError: Invalid CAN id or mask
+    """
+
+    can_id, _, can_mask = rx_filter.partition('/')
+    can_id, extended = parse_rx_id(rx_id=can_id)
+    return {'can_id': can_id, 'can_mask': parse_msg_id(msg_id=can_mask) if can_mask else
+            EXT_ID_MAX if extended else STD_ID_MAX, 'extended': extended}
+
+
+def parse_rx_pattern(pattern: str) -> Tuple[bytes, bytes]:
+    """
+    Converts payload pattern to compared bytes and mask
+    Params:                                                                     type:
+    @param pattern: Payload bytes, xx matches any byte, e.g. '0x02 0x10 xx'     str
+    @return: Payload and mask, only leading bytes of pattern are compared       Tuple[bytes, bytes]
+    """
+
+    tokens = pattern.split()
+    data = bytes(0 if token.lower() in ('xx', '*') else int(token, 16) for token in tokens)
+    mask = bytes(0 if token.lower() in ('xx', '*') else 0xFF for token in tokens)
+    return data, mask
+
+
+class RxMonitor(can.Listener):
+    """ Class for statistics of received frames and request/response rules """
+
+    __CAPACITY = 4096
+    __PAYLOAD_MAX = 64
+    __RATE_WINDOW_S = 1.0
+
+    def __init__(self, send_msg_h: Callable[[int], None], filters: Optional[Sequence[RxFilter]] = None,
+                 capacity: int = __CAPACITY) -> None:
+        """
+        Preallocates statistics of given number of ids
+        Params:                                                                     type:
+        @param send_msg_h: Function sending database message by handle              Callable
+        @param filters: Monitor acceptance filters, None to accept all frames       Optional[Sequence[RxFilter]]
+        @param capacity: Maximal number of monitored ids, frames of further ids
+                         are only counted                                           int
+        @return: None
+        """
+
+        self.__send_msg_h = send_msg_h
+        self.__capacity = capacity
+        self.__slots_d: Dict[Tuple[int, bool], int] = {}
+        self.__counts = array('Q', bytes(8 * capacity))
+        self.__last_times = array('d', bytes(8 * capacity))
+        self.__interval_sums = array('d', bytes(8 * capacity))
+        self.__interval_mins = array('d', [float('inf')]) * capacity
+        self.__interval_maxs = array('d', bytes(8 * capacity))
+        self.__lengths = array('B', bytes(capacity))
+        self.__payloads = bytearray(self.__PAYLOAD_MAX * capacity)
+        self.__rate_counts = array('Q', bytes(8 * capacity))
+        self.__rates = array('d', bytes(8 * capacity))
+        self.__rate_time = time.monotonic()
+        self.__exact_std_ids, self.__exact_ext_ids = frozenset(), frozenset()
+        self.__masked_filters: Optional[Tuple[Tuple[int, int, Optional[bool]], ...]] = None
+        self.__rules_d: Dict[Tuple[int, bool], Tuple[Tuple[int, int, int, int], ...]] = {}
+        self.__frames_cnt = 0
+        self.__filtered_cnt = 0
+        self.__overflow_cnt = 0
+        self.__error_frames_cnt = 0
+        self.__responses_cnt = 0
+        self.set_filters(filters=filters)
+
+    def __accept(self, msg: can.Message) -> bool:
+        """
+        Checks frame against monitor filters
+        Params:                                                                     type:
+        @param msg: Received frame                                                  can.Message
+        @return: Verdict if frame passes filters                                    bool
+        """
+
+        if msg.arbitration_id in (self.__exact_ext_ids if msg.is_extended_id else self.__exact_std_ids):
+            return True
+        for can_id, can_mask, extended in self.__masked_filters:
+            if (msg.arbitration_id & can_mask) == can_id and (extended is None or extended == msg.is_extended_id):
+                return True
+        return False
+
+    def __respond(self, msg: can.Message, rules: Tuple[Tuple[int, int, int, int], ...]) -> None:
+        """
+        Sends responses of rules matching received frame
+        Params:                                                                     type:
+        @param msg: Received frame                                                  can.Message
+        @param rules: Compiled rules of frame id: data, mask, length, handle        Tuple
+        @return: None
+        """
+
+        for data, mask, length, handle in rules:
+            if length == 0 or (len(msg.data) >= length and
+                               int.from_bytes(msg.data[:length], 'big') & mask == data):
+                self.__send_msg_h(handle)
+                self.__responses_cnt += 1
+
+    def __update_rates(self) -> None:
+        """
+        Computes frame rates of all ids when rate window elapsed
+        Params:                                                                     type:
+        @return: None
+        """
+
+        now = time.monotonic()
+        elapsed = now - self.__rate_time
+        if elapsed >= self.__RATE_WINDOW_S:
+            for slot in range(len(self.__slots_d)):
+                count = self.__counts[slot]
+                self.__rates[slot] = (count - self.__rate_counts[slot]) / elapsed
+                self.__rate_counts[slot] = count
+            self.__rate_time = now
+
+    """ ============================================= Class interface ============================================= """
+
+    def on_message_received(self, msg: can.Message) -> None:
+        """
+        Updates statistics of received frame and answers requests, called from notifier thread
+        Params:                                                                     type:
+        @param msg: Received frame                                                  can.Message
+        @return: None
+        """
+
+        if msg.is_error_frame:
+            self.__error_frames_cnt += 1
+            return
+        if self.__masked_filters is not None and not self.__accept(msg=msg):
+            self.__filtered_cnt += 1
+            return
+        self.__frames_cnt += 1
+
+        key = (msg.arbitration_id, msg.is_extended_id)
+        rules = self.__rules_d.get(key)
+        if rules is not None:
+            """ Response first - statistics do not delay it """
+            self.__respond(msg=msg, rules=rules)
+
+        slot = self.__slots_d.get(key)
+        if slot is None:
+            slot = len(self.__slots_d)
+            if slot >= self.__capacity:
+                self.__overflow_cnt += 1
+                return
+            self.__slots_d[key] = slot
+        count = self.__counts[slot]
+        if count:
+            interval = msg.timestamp - self.__last_times[slot]
+            self.__interval_sums[slot] += interval
+            if interval < self.__interval_mins[slot]:
+                self.__interval_mins[slot] = interval
+            if interval > self.__interval_maxs[slot]:
+                self.__interval_maxs[slot] = interval
+        self.__last_times[slot] = msg.timestamp
+        length = min(len(msg.data), self.__PAYLOAD_MAX)
+        offset = slot * self.__PAYLOAD_MAX
+        self.__payloads[offset:offset + length] = msg.data[:length]
+        self.__lengths[slot] = length
+        self.__counts[slot] = count + 1
+
+    def set_filters(self, filters: Optional[Sequence[RxFilter]]) -> None:
+        """
+        Setups monitor acceptance filters, filters with full mask are checked by single set lookup
+        Params:                                                                     type:
+        @param filters: python-can style filters, None to accept all frames         Optional[Sequence[RxFilter]]
+        @return: None
+        """
+
+        if not filters:
+            self.__exact_std_ids, self.__exact_ext_ids, self.__masked_filters = frozenset(), frozenset(), None
+            return
+        exact_std_ids, exact_ext_ids, masked_filters = set(), set(), []
+        for rx_filter in filters:
+            can_id, can_mask, extended = rx_filter['can_id'], rx_filter['can_mask'], rx_filter.get('extended')
+            if extended is not None and can_mask == (EXT_ID_MAX if extended else STD_ID_MAX):
+                (exact_ext_ids if extended else exact_std_ids).add(can_id)
+            else:
+                masked_filters.append((can_id & can_mask, can_mask, extended))
+        self.__exact_std_ids, self.__exact_ext_ids = frozenset(exact_std_ids), frozenset(exact_ext_ids)
+        self.__masked_filters = tuple(masked_filters)
+
+    def set_rules(self, rules: Sequence[RxRule]) -> None:
+        """
+        Replaces request/response rules, rules are compiled and swapped at once
+        Params:                                                                     type:
+        @param rules: Rules, frame matching several rules sends all responses       Sequence[RxRule]
+        @return: None
+        """
+
+        rules_d: Dict[Tuple[int, bool], List[Tuple[int, int, int, int]]] = {}
+        for rule in rules:
+            length = len(rule.data)
+            mask = int.from_bytes(rule.mask, 'big') if rule.mask else (1 << 8 * length) - 1
+            rules_d.setdefault((rule.can_id, rule.extended_id), []).append(
+                (int.from_bytes(rule.data, 'big') & mask, mask, length, rule.response_handle))
+        self.__rules_d = {key: tuple(id_rules) for key, id_rules in rules_d.items()}
+
+    def reset(self) -> None:
+        """
+        Clears statistics, ids keep their slots
+        Params:                                                                     type:
+        @return: None
+        """
+
+        for slot in range(len(self.__slots_d)):
+            self.__counts[slot] = self.__rate_counts[slot] = 0
+            self.__interval_sums[slot] = self.__interval_maxs[slot] = self.__rates[slot] = 0.0
+            self.__interval_mins[slot] = float('inf')
+        self.__frames_cnt = self.__filtered_cnt = self.__overflow_cnt = 0
+        self.__error_frames_cnt = self.__responses_cnt = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Provides statistics of all received ids
+        Params:                                                                     type:
+        @return: Counters and per-id count, rate, last payload and intervals       Dict[str, Any]
+        """
+
+        self.__update_rates()
+        ids_stats = {}
+        for (can_id, extended), slot in sorted(self.__slots_d.items()):
+            count = self.__counts[slot]
+            offset = slot * self.__PAYLOAD_MAX
+            id_stats = {'count': count, 'frames_per_s': self.__rates[slot],
+                        'payload': format_payload(payload=bytes(self.__payloads[offset:offset +
+                                                                                self.__lengths[slot]]))}
+            if count > 1:
+                id_stats.update(min_interval_ms=self.__interval_mins[slot] * 1000,
+                                avg_interval_ms=self.__interval_sums[slot] / (count - 1) * 1000,
+                                max_interval_ms=self.__interval_maxs[slot] * 1000)
+            ids_stats[format_rx_id(can_id=can_id, extended=extended)] = id_stats
+        return {'frames_received': self.__frames_cnt, 'frames_filtered': self.__filtered_cnt,
+                'ids_overflow': self.__overflow_cnt, 'error_frames': self.__error_frames_cnt,
+                'responses_sent': self.__responses_cnt, 'ids': ids_stats}
+
+    def format_stats(self, ids_max: int = 32) -> str:
+        """
+        Provides statistics as compact human readable text
+        Params:                                                                     type:
+        @param ids_max: Maximal number of listed ids                                int
+        @return: Statistics summary                                                 str
+        """
+
+        stats = self.get_stats()
+        lines = ['frames received: {}   filtered: {}   error frames: {}   responses: {}'.format(
+            stats['frames_received'], stats['frames_filtered'], stats['error_frames'], stats['responses_sent'])]
+        lines.append('{:>10} {:>8} {:>8} {:>24}  {}'.format('id', 'count', 'rate', 'interval min/avg/max', 'payload'))
+        for can_id, id_stats in list(stats['ids'].items())[:ids_max]:
+            lines.append('{:>10} {:>8} {:>8.1f} {:>24}  {}'.format(
+                can_id, id_stats['count'], id_stats['frames_per_s'],
+                '{:.1f}/{:.1f}/{:.1f}'.format(id_stats['min_interval_ms'], id_stats['avg_interval_ms'],
+                                              id_stats['max_interval_ms']) if 'avg_interval_ms' in id_stats else '-',
+                id_stats['payload']))
+        if len(stats['ids']) > ids_max:
+            lines.append('... {} more ids'.format(len(stats['ids']) - ids_max))
+        return '\n'.join(lines)
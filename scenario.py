@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+This module includes definition of class ScenarioEngine running scripted test sequences. Scenario is a text file with
+one action per line, messages are addressed by CAN id or name:
+    # comment
+    enable  0x100                   - start periodic transmission
+    payload EngineData 0x01 0x02    - change payload
+    period  0x100 20                - change period in ms
+    wait    500                     - advance time by ms
+    burst   0x200 10                - send frame N times back-to-back
+    disable 0x100                   - stop periodic transmission
+    at      2000                    - jump to absolute time in ms
+Scenario is compiled ahead of time - messages are resolved to handles, payloads parsed and actions due at the same
+moment merged into a single step. Engine only waits for deadlines on the same monotonic clock as TX scheduler and
+applies prepared steps, so sequences are reproducible and no parsing is done during the run.
+"""
+
+
+import logging
+import time
+from threading import Event, Thread
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from dbman import DataBaseMan
+from msgregistry import MsgRecord, parse_msg_id, parse_payload
+
+
+logger = logging.getLogger(__name__)
+
+SCENARIO_ACTIONS = ('enable', 'disable', 'payload', 'period', 'burst', 'wait', 'at')
+
+""" Handle, new payload, period enable and period, None keeps current value """
+LiveUpdate = Tuple[int, Optional[bytes], Optional[bool], Optional[int]]
+
+
+class ScenarioStep(NamedTuple):
+    time_s: float
+    updates: Tuple[LiveUpdate, ...]
+    bursts: Tuple[Tuple[int, int], ...]
+
+
+def _find_msg(target: str, database_man: DataBaseMan) -> Optional[MsgRecord]:
+    """
+    Finds message addressed by CAN id or name
+    Params:                                                                     type:
+    @param target: CAN id, e.g. '0x100', or message name                        str
+    @param database_man: Messages database manager                              DataBaseMan
+    @return: Message record or None if not found                                Optional[MsgRecord]
+    """
+
+    if target.lower().startswith('0x'):
+        return database_man.get_msg_by_id(can_id=parse_msg_id(msg_id=target))
+    return database_man.get_msg_by_name(name=target)
+
+
+def compile_scenario(lines: Iterable[str], database_man: DataBaseMan) -> List[ScenarioStep]:
+    """
+    Compiles scenario to steps sorted by time
+    Params:                                                                     type:
+    @param lines: Lines of scenario file                                        Iterable[str]
+    @param database_man: Messages database manager                              DataBaseMan
+    @return: Steps with all actions due at the same moment                      List[ScenarioStep]
+    """
+
+    steps_d: Dict[int, Tuple[List[LiveUpdate], List[Tuple[int, int]]]] = {}
+    time_ms = 0
+    for line_num, line in enumerate(lines, start=1):
+        tokens = line.split('#', 1)[0].split()
+        if not tokens:
+            continue
+        action, args = tokens[0].lower(), tokens[1:]
+        try:
+            if action not in SCENARIO_ACTIONS:
+                raise ValueError('unknown action {}, expected one of {}'.format(action, ', '.join(SCENARIO_ACTIONS)))
+            if action in ('wait', 'at'):
+                if len(args) != 1 or int(args[0]) < 0:
+                    raise ValueError('{} requires time in ms'.format(action))
+                time_ms = time_ms + int(args[0]) if action == 'wait' else int(args[0])
+                continue
+
+            if not args:
+                raise ValueError('{} requires message id or name'.format(action))
+            record = _find_msg(target=args[0], database_man=database_man)
+            if record is None:
+                raise ValueError('message {} not found in database'.format(args[0]))
+            updates, bursts = steps_d.setdefault(time_ms, ([], []))
+            if action in ('enable', 'disable'):
+                updates.append((record.handle, None, action == 'enable', None))
+            elif action == 'payload':
+                payload = parse_payload(payload=' '.join(args[1:]))
+                if len(payload) != len(record.payload):
+                    raise ValueError('payload must have {} bytes'.format(len(record.payload)))
+                updates.append((record.handle, payload, None, None))
+            elif action == 'period':
+                if len(args) != 2 or int(args[1]) < 1:
+                    raise ValueError('period requires period in ms')
+                updates.append((record.handle, None, None, int(args[1])))
+            else:
+                if len(args) != 2 or int(args[1]) < 1:
+                    raise ValueError('burst requires number of frames')
+                bursts.append((record.handle, int(args[1])))
+        except ValueError as e:
+            raise ValueError('line {}: {}'.format(line_num, e)) from None
+
+    if time_ms > max(steps_d, default=0):
+        """ Trailing wait - empty step marks end of scenario """
+        steps_d[time_ms] = ([], [])
+    return [ScenarioStep(time_s=step_time_ms / 1000, updates=tuple(updates), bursts=tuple(bursts))
+            for step_time_ms, (updates, bursts) in sorted(steps_d.items())]
+
+
+def load_scenario(path: str, database_man: DataBaseMan) -> List[ScenarioStep]:
+    """
+    Reads and compiles scenario file
+    Params:                                                                     type:
+    @param path: Path to scenario file                                          str
+    @param database_man: Messages database manager                              DataBaseMan
+    @return: Steps sorted by time                                               List[ScenarioStep]
+    """
+
+    with open(path) as scenario_file:
+        return compile_scenario(lines=scenario_file, database_man=database_man)
+
+
+class ScenarioEngine:
+    """ Class for running compiled scenario """
+
+    __SPIN_S = 0.001
+
+    def __init__(self, steps: List[ScenarioStep],
+                 update_msgs_h: Callable[[Iterable[LiveUpdate]], List[bool]],
+                 send_msg_h: Callable[[int, int], None], loop: bool = False) -> None:
+        """
+        Setups engine
+        Params:                                                                     type:
+        @param steps: Compiled scenario                                             List[ScenarioStep]
+        @param update_msgs_h: Function applying batch of live updates               Callable
+        @param send_msg_h: Function sending message by handle N times               Callable
+        @param loop: Start again when the last step is done, scenario length is
+                     time of the last step including trailing wait                  bool
+        @return: None
+        """
+
+        self.__steps = steps
+        self.__update_msgs_h = update_msgs_h
+        self.__send_msg_h = send_msg_h
+        self.__loop = loop
+        self.__stop_event = Event()
+        self.__scenario_thread = None
+        self.__executed_cnt = 0
+        self.__failed_cnt = 0
+        self.__max_late_s = 0.0
+
+    def __sleep_until(self, deadline: float) -> bool:
+        """
+        Sleeps until deadline, last part is spun to reduce wake up latency
+        Params:                                                                     type:
+        @param deadline: Monotonic time to wake up                                  float
+        @return: Information if scenario was stopped                                bool
+        """
+
+        remaining = deadline - time.monotonic()
+        if remaining > self.__SPIN_S and self.__stop_event.wait(timeout=remaining - self.__SPIN_S):
+            return True
+        while time.monotonic() < deadline:
+            pass
+        return self.__stop_event.is_set()
+
+    def __run(self) -> None:
+        """
+        Scenario thread loop, steps are applied at their deadlines
+        Params:                                                                     type:
+        @return: None
+        """
+
+        start = time.monotonic()
+        while True:
+            for step in self.__steps:
+                deadline = start + step.time_s
+                if self.__sleep_until(deadline=deadline):
+                    return
+                if step.updates:
+                    self.__failed_cnt += self.__update_msgs_h(step.updates).count(False)
+                for handle, count in step.bursts:
+                    self.__send_msg_h(handle, count)
+                self.__max_late_s = max(self.__max_late_s, time.monotonic() - deadline)
+                self.__executed_cnt += 1
+            if not self.__loop or not self.__steps or self.__steps[-1].time_s <= 0:
+                break
+            start += self.__steps[-1].time_s
+        print('Scenario finished: {} steps executed'.format(self.__executed_cnt))
+
+    """ ============================================= Class interface ============================================= """
+
+    def start(self) -> None:
+        """
+        Starts scenario thread
+        Params:                                                                     type:
+        @return: None
+        """
+
+        self.__stop_event.clear()
+        self.__scenario_thread = Thread(target=self.__run, name='canvector-scenario', daemon=True)
+        self.__scenario_thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops scenario, messages keep state set by executed steps
+        Params:                                                                     type:
+        @return: None
+        """
+
+        self.__stop_event.set()
+        if self.__scenario_thread is not None:
+            self.__scenario_thread.join()
+
+    def is_running(self) -> bool:
+        """
+        Provides scenario state
+        Params:                                                                     type:
+        @return: Information if scenario is running                                 bool
+        """
+
+        return self.__scenario_thread is not None and self.__scenario_thread.is_alive()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Provides scenario progress
+        Params:                                                                     type:
+        @return: Executed steps, failed updates and maximal step latency            Dict[str, Any]
+        """
+
+        return {'steps': len(self.__steps), 'executed': self.__executed_cnt, 'failed_updates': self.__failed_cnt,
+                'max_late_ms': round(self.__max_late_s * 1000, 3)}
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+This module includes definition of class DeadlineScheduler responsible for timing of periodic CAN messages.
+Each message is sent at its own period, deadlines are kept on monotonic clock and derived from the previous
+deadline (not from the moment of sending) so the cycle does not drift.
+"""
+
+
+import heapq
+import time
+from enum import Enum
+from threading import Event
+from typing import Callable, Dict, List, Tuple
+
+from frametable import CompiledFrame, FrameTable
+
+
+class OverrunPolicy(Enum):
+    CATCH_UP = 0,
+    SKIP = 1
+
+
+class DeadlineScheduler:
+    """ Class for sending periodic messages on their deadlines """
+
+    PERIOD_MIN_MS, PERIOD_MAX_MS = 1, 10000
+    __SPIN_S = 0.001
+    __MAX_CATCH_UP_CYCLES = 10
+
+    def __init__(self, get_frame_table_h: Callable[[], FrameTable],
+                 send_frames_h: Callable[[List[CompiledFrame]], None],
+                 overrun_policy: OverrunPolicy = OverrunPolicy.SKIP) -> None:
+        """
+        Setups external handlers
+        Params:                                                                     type:
+        @param get_frame_table_h: Function returning compiled frames table          Callable
+        @param send_frames_h: Function sending batch of due frames                  Callable
+        @param overrun_policy: Handling of deadlines missed on overrun              OverrunPolicy
+        @return: None
+        """
+
+        self.__get_frame_table_h = get_frame_table_h
+        self.__send_frames_h = send_frames_h
+        self.__overrun_policy = overrun_policy
+        self.__wake_event = Event()
+        self.__active = False
+        self.__stopped = False
+        self.__frame_table = None
+        self.__deadlines_heap = []
+        self.__overrun_cnt = 0
+
+    @staticmethod
+    def __get_period_s(frame: CompiledFrame) -> float:
+        """
+        Provides period of message clamped to supported range
+        Params:                                                                     type:
+        @param frame: Compiled CAN frame                                            CompiledFrame
+        @return: Period in seconds                                                  float
+        """
+
+        return min(max(frame.period, DeadlineScheduler.PERIOD_MIN_MS), DeadlineScheduler.PERIOD_MAX_MS) / 1000
+
+    def __resync(self, frame_table: FrameTable, now: float) -> None:
+        """
+        Rebuilds deadlines heap from frames table snapshot, deadlines of messages with unchanged period are kept
+        Params:                                                                     type:
+        @param frame_table: Compiled frames table snapshot                          FrameTable
+        @param now: Current monotonic time                                          float
+        @return: None
+        """
+
+        self.__frame_table = frame_table
+        old_deadlines_d: Dict[int, List] = {entry[1]: entry for entry in self.__deadlines_heap}
+        old_id_deadlines_d: Dict[Tuple[int, bool], List] = {}
+        for entry in self.__deadlines_heap:
+            old_id_deadlines_d.setdefault((entry[3].msg.arbitration_id, entry[3].msg.is_extended_id), entry)
+        self.__deadlines_heap = []
+        for frame in self.__frame_table.get_periodic_frames():
+            period_s = self.__get_period_s(frame=frame)
+            old_entry = old_deadlines_d.get(frame.handle)
+            if old_entry is None or old_entry[3].msg.arbitration_id != frame.msg.arbitration_id:
+                """ Handles differ between databases (profile switch) - message is matched by CAN id """
+                old_entry = old_id_deadlines_d.get((frame.msg.arbitration_id, frame.msg.is_extended_id))
+            if old_entry is not None and old_entry[2] == period_s:
+                """ Message already scheduled with the same period - keep its phase """
+                deadline = old_entry[0]
+            else:
+                """ New message or period changed - send it right away """
+                deadline = now
+            self.__deadlines_heap.append([deadline, frame.handle, period_s, frame])
+        heapq.heapify(self.__deadlines_heap)
+
+    def __get_next_deadline(self, deadline: float, period_s: float, now: float) -> float:
+        """
+        Computes next deadline of message, applies overrun policy if next deadline already passed
+        Params:                                                                     type:
+        @param deadline: Deadline which has just been served                        float
+        @param period_s: Period of message in seconds                               float
+        @param now: Current monotonic time                                          float
+        @return: Next deadline                                                      float
+        """
+
+        next_deadline = deadline + period_s
+        if next_deadline <= now:
+            """ Scheduler overrun - at least one cycle missed """
+            self.__overrun_cnt += 1
+            missed_cycles = int((now - deadline) / period_s)
+            if self.__overrun_policy == OverrunPolicy.SKIP or missed_cycles > self.__MAX_CATCH_UP_CYCLES:
+                """ Drop missed cycles, stay on the original grid """
+                next_deadline = deadline + (missed_cycles + 1) * period_s
+            else:
+                """ Missed cycles will be sent back-to-back """
+                pass
+        return next_deadline
+
+    def __sleep_until(self, deadline: float) -> bool:
+        """
+        Sleeps until deadline, last part is spun to reduce wake up latency
+        Params:                                                                     type:
+        @param deadline: Monotonic time to wake up                                  float
+        @return: Information if sleep was interrupted by update                     bool
+        """
+
+        remaining = deadline - time.monotonic()
+        if remaining > self.__SPIN_S and self.__wake_event.wait(timeout=remaining - self.__SPIN_S):
+            return True
+        while time.monotonic() < deadline:
+            if self.__wake_event.is_set():
+                return True
+        return False
+
+    """ ============================================= Class interface ============================================= """
+
+    def notify_update(self) -> None:
+        """
+        Wakes up scheduler to pick up changed frames table
+        Params:                                                                     type:
+        @return: None
+        """
+
+        self.__wake_event.set()
+
+    def set_active(self, active: bool) -> None:
+        """
+        Starts or pauses sending, scheduler does not wake up while paused
+        Params:                                                                     type:
+        @param active: Scheduler active                                             bool
+        @return: None
+        """
+
+        self.__active = active
+        self.__wake_event.set()
+
+    def stop(self) -> None:
+        """
+        Stops scheduler loop
+        Params:                                                                     type:
+        @return: None
+        """
+
+        self.__stopped = True
+        self.__wake_event.set()
+
+    def get_overrun_count(self) -> int:
+        """
+        Provides number of missed deadlines
+        Params:                                                                     type:
+        @return: Number of overruns since start                                     int
+        """
+
+        return self.__overrun_cnt
+
+    def run(self) -> None:
+        """
+        Scheduler loop, blocks until stopped
+        Params:                                                                     type:
+        @return: None
+        """
+
+        while not self.__stopped:
+            if not self.__active:
+                """ Scheduler paused - forget deadlines and sleep until activated """
+                self.__deadlines_heap = []
+                self.__frame_table = None
+                self.__wake_event.wait()
+                self.__wake_event.clear()
+                continue
+
+            """ Take current snapshot once per cycle, it is never modified by writers """
+            frame_table = self.__get_frame_table_h()
+            if self.__wake_event.is_set() or self.__frame_table is not frame_table:
+                self.__wake_event.clear()
+                self.__resync(frame_table=frame_table, now=time.monotonic())
+
+            if not self.__deadlines_heap:
+                """ No periodic messages - sleep until database changes """
+                self.__wake_event.wait()
+                continue
+
+            if self.__sleep_until(deadline=self.__deadlines_heap[0][0]):
+                """ Woken up by update - resync before sending """
+                continue
+
+            now = time.monotonic()
+            due_frames: List[CompiledFrame] = []
+            while self.__deadlines_heap and self.__deadlines_heap[0][0] <= now:
+                entry = self.__deadlines_heap[0]
+                due_frames.append(entry[3])
+                entry[0] = self.__get_next_deadline(deadline=entry[0], period_s=entry[2], now=now)
+                heapq.heapreplace(self.__deadlines_heap, entry)
+            self.__send_frames_h(due_frames)
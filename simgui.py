@@ -1,23 +1,29 @@
 # -*- coding: utf-8 -*-
 """
-This module includes definition of class SimGui responsible for simulation user interface.
+This module includes definition of class SimGui responsible for simulation user interface. Messages table is paged,
+widgets are created once for a single page and only rows affected by a change are updated.
 """
 
 
+import time
 from typing import Dict, Any, Callable
 import dearpygui.core as dpgc
 import dearpygui.simple as dpgs
 
+from msgregistry import format_msg_id, format_payload
+
 
 class SimGui:
     """ Class for handling application GUI """
 
-    __column_names = ['no', 'name', 'id', 'payload', 'modify', 'delete', '100ms', 'send']
-    __column_widths_d = dict(zip(__column_names, [50, 250, 100, 300, 50, 50, 50, 50]))
+    __column_names = ['no', 'name', 'id', 'payload', 'ch', 'ext', 'fd', 'brs', 'gen', 'modify', 'delete', '100ms',
+                      'send']
+    __column_widths_d = dict(zip(__column_names, [50, 250, 100, 300, 50, 40, 40, 40, 200, 50, 50, 50, 50]))
+    __flag_columns = ['ext', 'fd', 'brs']
     __column_items_d = dict(zip(__column_names, ['it_' + name for name in __column_names]))
     __column_items_new_d = dict(zip(__column_names, ['it_' + name + '_new' for name in __column_names]))
     __wnd_width, __wnd_height = 530, 160
-    __wnd_main_width, __wnd_main_height = 1000, 600
+    __wnd_main_width, __wnd_main_height = 1350, 600
     __sim_en_btn_width, __sim_en_btn_height = 120, 40
     __add_msg_btn_width, __add_msg_btn_height = 100, 30
     __popup_btn_width, __popup_btn_height = 75, 25
@@ -25,12 +31,31 @@ class SimGui:
     __item_msg_table = 'msg_table'
     __item_simulation_main = 'simulation_main'
     __item_bnt_add_message = 'add_message'
+    __item_import_msgs = 'import_msgs'
+    __item_import_path = '##import_path'
+    __item_import_result = '##import_result'
     __item_btn_start_sim = 'btn_start_sim'
     __item_btn_stop_sim = 'btn_stop_sim'
+    __item_btn_prev_page = 'btn_prev_page'
+    __item_btn_next_page = 'btn_next_page'
+    __item_profile_combo = 'Profile'
+    __profile_combo_width = 200
+    __item_page_label = '##page_label'
+    __item_stats_wnd = 'Statistics'
+    __item_stats_text = '##stats_text'
+    __item_stats_path = '##stats_path'
+    __stats_wnd_width, __stats_wnd_height = 600, 300
+    __item_rx_wnd = 'RX monitor'
+    __item_rx_text = '##rx_text'
+    __rx_wnd_width, __rx_wnd_height = 600, 250
+    __stats_refresh_s = 0.5
     __hide_label = '##'
 
     def __init__(self, switch_sim_en_h: Callable, add_msg_h: Callable, delete_msg_h: Callable, modify_msg_h: Callable,
-                 get_msg_db_h: Callable, send_msg_trig_h: Callable, version: str) -> None:
+                 get_msg_h: Callable, get_msgs_num_h: Callable, send_msg_trig_h: Callable, import_msgs_h: Callable,
+                 get_stats_h: Callable, export_stats_h: Callable, get_rx_stats_h: Callable, get_profiles_h: Callable,
+                 get_active_profile_h: Callable, switch_profile_h: Callable, version: str,
+                 page_size: int = 25) -> None:
         """
         Setups external handlers
         Params:                                                                     type:
@@ -38,9 +63,18 @@ class SimGui:
         @param add_msg_h: Function adding message to database                       Callable
         @param delete_msg_h: Function deleting message from database                Callable
         @param modify_msg_h: Function modifying message in database                 Callable
-        @param get_msg_db_h: Function returning messages database                   Callable
+        @param get_msg_h: Function returning message at specified index             Callable
+        @param get_msgs_num_h: Function returning number of messages                Callable
         @param send_msg_trig_h: Function triggering sending message                 Callable
+        @param import_msgs_h: Function importing messages from file                 Callable
+        @param get_stats_h: Function returning TX statistics summary                Callable
+        @param export_stats_h: Function saving TX statistics to file                Callable
+        @param get_rx_stats_h: Function returning RX monitor summary                Callable
+        @param get_profiles_h: Function returning names of preloaded profiles       Callable
+        @param get_active_profile_h: Function returning name of active profile      Callable
+        @param switch_profile_h: Function switching active profile                  Callable
         @param version: Application version                                         str
+        @param page_size: Number of table rows displayed at once                    int
         @return: None
         """
 
@@ -48,17 +82,66 @@ class SimGui:
         self.__add_msg_h = add_msg_h
         self.__delete_msg_h = delete_msg_h
         self.__modify_msg_h = modify_msg_h
-        self.__get_msg_config_h = get_msg_db_h
+        self.__get_msg_h = get_msg_h
+        self.__get_msgs_num_h = get_msgs_num_h
         self.__send_msg_trig_h = send_msg_trig_h
+        self.__import_msgs_h = import_msgs_h
+        self.__get_stats_h = get_stats_h
+        self.__export_stats_h = export_stats_h
+        self.__get_rx_stats_h = get_rx_stats_h
+        self.__get_profiles_h = get_profiles_h
+        self.__get_active_profile_h = get_active_profile_h
+        self.__switch_profile_h = switch_profile_h
+        self.__stats_refresh_time = 0.0
         self.__version = version
+        self.__page_size = page_size
+        self.__page = 0
+
+    def __slot_item(self, column: str, slot: int) -> str:
+        """
+        Provides name of table item
+        Params:                                                                     type:
+        @param column: Column name                                                  str
+        @param slot: Row of the table on screen                                     int
+        @return: Item name                                                          str
+        """
+
+        return self.__hide_label + self.__column_items_d[column] + str(slot)
+
+    @staticmethod
+    def __parse_channel(value: str) -> int:
+        """
+        Converts channel typed by user to number
+        Params:                                                                     type:
+        @param value: Channel as typed                                              str
+        @return: Channel, -1 if not a number                                        int
+        """
+
+        return int(value) if value.strip().isdigit() else -1
+
+    def __get_page_offset(self) -> int:
+        """
+        Provides database index of the first message on current page
+        Params:                                                                     type:
+        @return: Database index                                                     int
+        """
+
+        return self.__page * self.__page_size
 
     def __display_table(self) -> None:
         """
-        Displays messages configuration from database
+        Creates messages table, only rows of a single page are created and later bound to messages on demand
         Params:                                                                     type:
         @return: None
         """
 
+        """ Configure page selection """
+        dpgc.add_button(name=self.__item_btn_prev_page, label='  <  ', callback=self.__btn_page_clbk, callback_data=-1)
+        dpgc.add_same_line()
+        dpgc.add_text(self.__item_page_label, default_value='')
+        dpgc.add_same_line()
+        dpgc.add_button(name=self.__item_btn_next_page, label='  >  ', callback=self.__btn_page_clbk, callback_data=1)
+
         """ Configure columns """
         dpgc.add_managed_columns(name=self.__item_msg_table, columns=len(self.__column_names),
                                  parent=self.__item_simulation_main)
@@ -69,45 +152,53 @@ class SimGui:
                                           width=self.__column_widths_d[name])
 
         """ Add rows """
-        msg_config_df = self.__get_msg_config_h()
-        for (df_row_id, row), index in zip(msg_config_df.iterrows(), range(msg_config_df.shape[0])):
+        for slot in range(self.__page_size):
 
-            dpgc.add_text(str(index))
+            dpgc.add_text(self.__slot_item('no', slot), default_value='')
 
-            dpgc.add_input_text(name=self.__hide_label + self.__column_items_d['name'] + str(index),
+            dpgc.add_input_text(name=self.__slot_item('name', slot),
                                 width=self.__column_widths_d['name'] - self.__margin_10,
                                 enabled=False)
-            dpgc.set_value(self.__hide_label + self.__column_items_d['name'] + str(index), str(row['name']))
 
-            dpgc.add_input_text(name=self.__hide_label + self.__column_items_d['id'] + str(index),
+            dpgc.add_input_text(name=self.__slot_item('id', slot),
                                 width=self.__column_widths_d['id'] - self.__margin_10,
                                 enabled=False)
-            dpgc.set_value(self.__hide_label + self.__column_items_d['id'] + str(index), str(row['id']))
 
-            dpgc.add_input_text(name=self.__hide_label + self.__column_items_d['payload'] + str(index),
+            dpgc.add_input_text(name=self.__slot_item('payload', slot),
                                 width=self.__column_widths_d['payload'] - self.__margin_10,
                                 enabled=False)
-            dpgc.set_value(self.__hide_label + self.__column_items_d['payload'] + str(index), str(row['payload']))
 
-            dpgc.add_button(self.__hide_label + self.__column_items_d['modify'] + str(index), small=False, label=' ... ',
+            dpgc.add_input_text(name=self.__slot_item('ch', slot),
+                                width=self.__column_widths_d['ch'] - self.__margin_10,
+                                enabled=False)
+
+            for column in self.__flag_columns:
+                dpgc.add_checkbox(name=self.__slot_item(column, slot), enabled=False)
+
+            dpgc.add_input_text(name=self.__slot_item('gen', slot),
+                                width=self.__column_widths_d['gen'] - self.__margin_10,
+                                enabled=False)
+
+            dpgc.add_button(self.__slot_item('modify', slot), small=False, label=' ... ',
                             callback=self.__btn_modify_msg_clbk,
-                            callback_data={'index': index, 'source_checkbox': False})
+                            callback_data={'slot': slot, 'source_checkbox': False})
 
-            dpgc.add_button(self.__hide_label + self.__column_items_d['delete'] + str(index), small=False, label='  x  ',
+            dpgc.add_button(self.__slot_item('delete', slot), small=False, label='  x  ',
                             callback=self.__btn_del_msg_clbk,
-                            callback_data=index)
+                            callback_data=slot)
 
-            dpgc.add_checkbox(name=self.__hide_label + self.__column_items_d['100ms'] + str(index),
+            dpgc.add_checkbox(name=self.__slot_item('100ms', slot),
                               callback=self.__btn_modify_msg_clbk,
-                              callback_data={'index': index, 'source_checkbox': True})
-            dpgc.set_value(self.__hide_label + self.__column_items_d['100ms'] + str(index), bool(row['period_en']))
+                              callback_data={'slot': slot, 'source_checkbox': True})
 
-            dpgc.add_button(self.__hide_label + self.__column_items_d['send'] + str(index), label='  >  ',
+            dpgc.add_button(self.__slot_item('send', slot), label='  >  ',
                             callback=self.__btn_send_clbk,
-                            callback_data=index)
+                            callback_data=slot)
 
         dpgc.add_separator()
 
+        self.__bind_slots(first_slot=0)
+
         """ Add new message pop up """
         with dpgs.popup(popupparent='btn_add_msg', name=self.__item_bnt_add_message, modal=True,
                         mousebutton=dpgc.mvMouseButton_Left):
@@ -129,6 +220,23 @@ class SimGui:
                                 width=self.__column_widths_d['payload'] + self.__margin_30,
                                 hint='e.g. 0x50 0x40 0x30 0x20 0x10 0x00 0x00 0x00')
 
+            dpgc.add_text('Channel: \t')
+            dpgc.add_same_line()
+            dpgc.add_input_text(name=self.__hide_label + self.__column_items_d['ch'] + '_new',
+                                width=self.__column_widths_d['payload'] + self.__margin_30, default_value='0')
+
+            dpgc.add_checkbox(name=self.__hide_label + self.__column_items_d['ext'] + '_new', label='29-bit id')
+            dpgc.add_same_line()
+            dpgc.add_checkbox(name=self.__hide_label + self.__column_items_d['fd'] + '_new', label='CAN FD')
+            dpgc.add_same_line()
+            dpgc.add_checkbox(name=self.__hide_label + self.__column_items_d['brs'] + '_new', label='BRS')
+
+            dpgc.add_text('Generators:\t')
+            dpgc.add_same_line()
+            dpgc.add_input_text(name=self.__hide_label + self.__column_items_d['gen'] + '_new',
+                                width=self.__column_widths_d['payload'] + self.__margin_30,
+                                hint='e.g. counter(bit=0,len=4);crc8(byte=7,first=0,last=6)')
+
             dpgc.add_button(name='btn_add_msg_confirm', label='Add', width=self.__popup_btn_width,
                             height=self.__popup_btn_height, callback=self.__btn_add_msg_clbk)
             dpgc.add_same_line()
@@ -136,16 +244,86 @@ class SimGui:
             dpgc.add_button(name='btn_add_msg_cancel', label='Cancel', width=self.__popup_btn_width,
                             height=self.__popup_btn_height, callback=self.__btn_add_msg_clbk, callback_data=True)
 
-    def __update_msg_table(self) -> None:
+    def __bind_slot(self, slot: int) -> None:
+        """
+        Displays message in table row, row is hidden if there is no message for it
+        Params:                                                                     type:
+        @param slot: Row of the table on screen                                     int
+        @return: None
+        """
+
+        index = self.__get_page_offset() + slot
+        record = self.__get_msg_h(index=index)
+        for column in self.__column_names:
+            dpgc.configure_item(self.__slot_item(column, slot), show=record is not None)
+
+        if record is not None:
+            dpgc.set_value(self.__slot_item('no', slot), str(index))
+            dpgc.set_value(self.__slot_item('name', slot), str(record.name))
+            dpgc.set_value(self.__slot_item('id', slot), format_msg_id(can_id=record.can_id))
+            dpgc.set_value(self.__slot_item('payload', slot), format_payload(payload=record.payload))
+            dpgc.set_value(self.__slot_item('ch', slot), str(record.channel))
+            dpgc.set_value(self.__slot_item('ext', slot), bool(record.extended_id))
+            dpgc.set_value(self.__slot_item('fd', slot), bool(record.fd))
+            dpgc.set_value(self.__slot_item('brs', slot), bool(record.brs))
+            dpgc.set_value(self.__slot_item('gen', slot), record.generators)
+            dpgc.set_value(self.__slot_item('100ms', slot), bool(record.period_en))
+            dpgc.configure_item(self.__slot_item('name', slot), enabled=False)
+            dpgc.configure_item(self.__slot_item('id', slot), enabled=False)
+            dpgc.configure_item(self.__slot_item('payload', slot), enabled=False)
+            dpgc.configure_item(self.__slot_item('ch', slot), enabled=False)
+            for column in self.__flag_columns:
+                dpgc.configure_item(self.__slot_item(column, slot), enabled=False)
+            dpgc.configure_item(self.__slot_item('gen', slot), enabled=False)
+            dpgc.configure_item(self.__slot_item('modify', slot), label=' ... ')
+        else:
+            """ No message for this row - row stays hidden """
+            pass
+
+    def __bind_slots(self, first_slot: int) -> None:
         """
-        Reloads messages configuration table
+        Displays messages in table rows starting from specified row till the end of page
         Params:                                                                     type:
+        @param first_slot: First row of the table to be updated                     int
         @return: None
         """
 
-        dpgc.delete_item(self.__item_msg_table)
-        dpgc.delete_item(self.__item_bnt_add_message)
-        self.__display_table()
+        pages_num = max(1, -(-self.__get_msgs_num_h() // self.__page_size))
+        if self.__page >= pages_num:
+            """ Current page does not exist anymore - go to the last one """
+            self.__page = pages_num - 1
+            first_slot = 0
+        dpgc.set_value(self.__item_page_label, 'page {}/{}'.format(self.__page + 1, pages_num))
+
+        for slot in range(first_slot, self.__page_size):
+            self.__bind_slot(slot=slot)
+
+    def __update_msg_table(self, index: int = 0) -> None:
+        """
+        Reloads messages table from message at specified index, only rows of current page are touched
+        Params:                                                                     type:
+        @param index: Index of the first changed message in database                int
+        @return: None
+        """
+
+        first_slot = index - self.__get_page_offset()
+        if first_slot < self.__page_size:
+            self.__bind_slots(first_slot=max(0, first_slot))
+        else:
+            """ Changed message is on next pages - only page counter changes """
+            self.__bind_slots(first_slot=self.__page_size)
+
+    def __btn_page_clbk(self, sender: str, step: int) -> None:
+        """
+        Callback for previous/next page buttons
+        Params:                                                                     type:
+        @param sender: Not used                                                     str
+        @param step: Number of pages to move                                        int
+        @return: None
+        """
+
+        self.__page = max(0, self.__page + step)
+        self.__bind_slots(first_slot=0)
 
     def __btn_switch_sim_en_clbk(self, sender: str, sim_en: bool) -> None:
         """
@@ -174,69 +352,167 @@ class SimGui:
         else:
             if self.__add_msg_h(name=dpgc.get_value(self.__hide_label + self.__column_items_new_d['name']),
                                 msg_id=dpgc.get_value(self.__hide_label + self.__column_items_new_d['id']),
-                                payload=dpgc.get_value(self.__hide_label + self.__column_items_new_d['payload'])):
-                self.__update_msg_table()
+                                payload=dpgc.get_value(self.__hide_label + self.__column_items_new_d['payload']),
+                                channel=self.__parse_channel(
+                                    value=dpgc.get_value(self.__hide_label + self.__column_items_new_d['ch'])),
+                                extended_id=(dpgc.get_value(self.__hide_label + self.__column_items_new_d['ext'])
+                                             or None),
+                                fd=dpgc.get_value(self.__hide_label + self.__column_items_new_d['fd']),
+                                brs=dpgc.get_value(self.__hide_label + self.__column_items_new_d['brs']),
+                                generators=dpgc.get_value(self.__hide_label + self.__column_items_new_d['gen'])):
+                self.__update_msg_table(index=self.__get_msgs_num_h() - 1)
             else:
                 """ Provided message is invalid """
             pass
 
-    def __btn_del_msg_clbk(self, sender: str, index: int) -> None:
+    def __btn_import_msgs_clbk(self, sender: str, is_cancel=False) -> None:
+        """
+        Callback for import messages/cancel buttons
+        Params:                                                                     type:
+        @param sender: Not used                                                     str
+        @param is_cancel: Import canceled                                           bool
+        @return: None
+        """
+
+        if is_cancel:
+            dpgc.close_popup(self.__item_import_msgs)
+        else:
+            result = self.__import_msgs_h(path=dpgc.get_value(self.__item_import_path))
+            dpgc.set_value(self.__item_import_result, 'Imported: {}, invalid rows: {}{}'.format(
+                result.imported_num, len(result.invalid_rows),
+                ''.join('\n  row {}: {}'.format(row, reason) for row, reason in result.invalid_rows[:10])))
+            if result.imported_num:
+                self.__update_msg_table(index=self.__get_msgs_num_h() - result.imported_num)
+            else:
+                """ Nothing imported, table not changed """
+                pass
+
+    def __render_clbk(self, sender: str, data: Any) -> None:
+        """
+        Callback called every frame, refreshes statistics and RX monitor panels at fixed rate, not per received frame
+        Params:                                                                     type:
+        @param sender: Not used                                                     str
+        @param data: Not used                                                       Any
+        @return: None
+        """
+
+        now = time.monotonic()
+        if now - self.__stats_refresh_time >= self.__stats_refresh_s:
+            self.__stats_refresh_time = now
+            dpgc.set_value(self.__item_stats_text, self.__get_stats_h())
+            dpgc.set_value(self.__item_rx_text, self.__get_rx_stats_h())
+            self.__sync_profile_combo()
+        else:
+            """ Statistics refreshed recently """
+            pass
+
+    def __sync_profile_combo(self) -> None:
+        """
+        Shows profile switched by API (script, command line) in selector, table shows messages of the new profile
+        Params:                                                                     type:
+        @return: None
+        """
+
+        active_profile = self.__get_active_profile_h()
+        if dpgc.get_value(self.__item_profile_combo) != active_profile:
+            dpgc.set_value(self.__item_profile_combo, active_profile)
+            self.__page = 0
+            self.__bind_slots(first_slot=0)
+
+    def __btn_export_stats_clbk(self, sender: str, data: Any) -> None:
+        """
+        Callback for export statistics button
+        Params:                                                                     type:
+        @param sender: Not used                                                     str
+        @param data: Not used                                                       Any
+        @return: None
+        """
+
+        try:
+            self.__export_stats_h(path=dpgc.get_value(self.__item_stats_path))
+        except OSError as e:
+            print('Could not export statistics:', e)
+
+    def __profile_combo_clbk(self, sender: str, data: Any) -> None:
+        """
+        Callback for profile selector, table shows messages of the new profile from the first page
+        Params:                                                                     type:
+        @param sender: Not used                                                     str
+        @param data: Not used                                                       Any
+        @return: None
+        """
+
+        if self.__switch_profile_h(name=dpgc.get_value(self.__item_profile_combo)):
+            self.__page = 0
+            self.__bind_slots(first_slot=0)
+        else:
+            """ Profile not switched - selector shows active one """
+            dpgc.set_value(self.__item_profile_combo, self.__get_active_profile_h())
+
+    def __btn_del_msg_clbk(self, sender: str, slot: int) -> None:
         """
         Callback for delete message buttons
         Params:                                                                     type:
         @param sender: Not used                                                     str
-        @param index: Index of message to be deleted                                int
+        @param slot: Row of the table with message to be deleted                    int
         @return: None
         """
 
+        index = self.__get_page_offset() + slot
         self.__delete_msg_h(index=index)
-        self.__update_msg_table()
+        self.__update_msg_table(index=index)
 
     def __btn_modify_msg_clbk(self, sender: str, data: Dict[str, Any]) -> None:
         """
         Callback for modify message buttons
         Params:                                                                     type:
         @param sender: Not used                                                     str
-        @param data: Modified message                                               Dict[str, Any]
+        @param data: Row of the table with modified message                         Dict[str, Any]
         @return: None
         """
 
+        slot = data['slot']
+
         """ Check if this is first step for modification - clicked modify button """
-        if not (dpgc.get_item_configuration(self.__hide_label + self.__column_items_d['name'] +
-                                            str(data['index'])))['enabled'] and not data['source_checkbox']:
+        if not (dpgc.get_item_configuration(self.__slot_item('name', slot)))['enabled'] and not data['source_checkbox']:
 
             """ Clicked modify button - enable editing"""
-            dpgc.configure_item(self.__hide_label + self.__column_items_d['name'] + str(data['index']), enabled=True)
-            dpgc.configure_item(self.__hide_label + self.__column_items_d['id'] + str(data['index']), enabled=True)
-            dpgc.configure_item(self.__hide_label + self.__column_items_d['payload'] + str(data['index']), enabled=True)
-            dpgc.configure_item(self.__hide_label + self.__column_items_d['modify'] + str(data['index']), label=' /ok ')
+            dpgc.configure_item(self.__slot_item('name', slot), enabled=True)
+            dpgc.configure_item(self.__slot_item('id', slot), enabled=True)
+            dpgc.configure_item(self.__slot_item('payload', slot), enabled=True)
+            dpgc.configure_item(self.__slot_item('ch', slot), enabled=True)
+            for column in self.__flag_columns:
+                dpgc.configure_item(self.__slot_item(column, slot), enabled=True)
+            dpgc.configure_item(self.__slot_item('gen', slot), enabled=True)
+            dpgc.configure_item(self.__slot_item('modify', slot), label=' /ok ')
         else:
             """ Save updated values """
-            if self.__modify_msg_h(index=data['index'],
-                                   name=dpgc.get_value(self.__hide_label + self.__column_items_d['name'] +
-                                                       str(data['index'])),
-                                   msg_id=dpgc.get_value(self.__hide_label + self.__column_items_d['id'] +
-                                                         str(data['index'])),
-                                   payload=dpgc.get_value(self.__hide_label + self.__column_items_d['payload'] +
-                                                          str(data['index'])),
-                                   period_en=dpgc.get_value(self.__hide_label + self.__column_items_d['100ms'] +
-                                                            str(data['index']))):
-                self.__update_msg_table()
+            if self.__modify_msg_h(index=self.__get_page_offset() + slot,
+                                   name=dpgc.get_value(self.__slot_item('name', slot)),
+                                   msg_id=dpgc.get_value(self.__slot_item('id', slot)),
+                                   payload=dpgc.get_value(self.__slot_item('payload', slot)),
+                                   period_en=dpgc.get_value(self.__slot_item('100ms', slot)),
+                                   channel=self.__parse_channel(value=dpgc.get_value(self.__slot_item('ch', slot))),
+                                   extended_id=dpgc.get_value(self.__slot_item('ext', slot)),
+                                   fd=dpgc.get_value(self.__slot_item('fd', slot)),
+                                   brs=dpgc.get_value(self.__slot_item('brs', slot)),
+                                   generators=dpgc.get_value(self.__slot_item('gen', slot))):
+                self.__bind_slot(slot=slot)
             else:
                 """ Provided message is invalid """
                 pass
 
-    def __btn_send_clbk(self, sender: str, index: int) -> None:
+    def __btn_send_clbk(self, sender: str, slot: int) -> None:
         """
         Callback for send message buttons
         Params:                                                                     type:
         @param sender: Not used                                                     str
-        @param index: Index of message to be sent                                   int
+        @param slot: Row of the table with message to be sent                       int
         @return: None
         """
 
         """ Callback for send message buttons """
-        self.__send_msg_trig_h(index=index)
+        self.__send_msg_trig_h(index=self.__get_page_offset() + slot)
 
     """ ============================================= Class interface ============================================= """
 
@@ -258,13 +534,53 @@ class SimGui:
             dpgc.add_button(name=self.__item_btn_stop_sim, label='Stop simulation', width=self.__sim_en_btn_width,
                             height=self.__sim_en_btn_height, callback=self.__btn_switch_sim_en_clbk,
                             callback_data=False, enabled=False)
+            dpgc.add_same_line()
+            dpgc.add_combo(name=self.__item_profile_combo, items=self.__get_profiles_h(),
+                           default_value=self.__get_active_profile_h(), width=self.__profile_combo_width,
+                           callback=self.__profile_combo_clbk)
             dpgc.add_spacing()
             dpgc.add_button(name='btn_add_msg', label='Add message', width=self.__add_msg_btn_width,
                             height=self.__add_msg_btn_height)
+            dpgc.add_same_line()
+            dpgc.add_button(name='btn_import_msgs', label='Import', width=self.__add_msg_btn_width,
+                            height=self.__add_msg_btn_height)
+
+            """ Import messages pop up """
+            with dpgs.popup(popupparent='btn_import_msgs', name=self.__item_import_msgs, modal=True,
+                            mousebutton=dpgc.mvMouseButton_Left):
+                dpgc.add_text('File:\t\t')
+                dpgc.add_same_line()
+                dpgc.add_input_text(name=self.__item_import_path,
+                                    width=self.__column_widths_d['payload'] + self.__margin_30,
+                                    hint='e.g. candb/vehicle.csv or candb/vehicle.dbc')
+                dpgc.add_text(self.__item_import_result, default_value='')
+                dpgc.add_button(name='btn_import_msgs_confirm', label='Import', width=self.__popup_btn_width,
+                                height=self.__popup_btn_height, callback=self.__btn_import_msgs_clbk)
+                dpgc.add_same_line()
+                dpgc.add_button(name='btn_import_msgs_cancel', label='Cancel', width=self.__popup_btn_width,
+                                height=self.__popup_btn_height, callback=self.__btn_import_msgs_clbk,
+                                callback_data=True)
 
             dpgc.add_spacing()
             dpgc.add_separator()
 
             self.__display_table()
 
+        """ Statistics panel """
+        with dpgs.window(name=self.__item_stats_wnd, width=self.__stats_wnd_width, height=self.__stats_wnd_height,
+                         x_pos=self.__wnd_main_width - self.__stats_wnd_width - self.__margin_30,
+                         y_pos=self.__margin_30):
+            dpgc.add_input_text(name=self.__item_stats_path, width=self.__column_widths_d['payload'],
+                                default_value='tx_stats.json')
+            dpgc.add_same_line()
+            dpgc.add_button(name='btn_export_stats', label='Export', callback=self.__btn_export_stats_clbk)
+            dpgc.add_text(self.__item_stats_text, default_value='')
+
+        """ RX monitor panel """
+        with dpgs.window(name=self.__item_rx_wnd, width=self.__rx_wnd_width, height=self.__rx_wnd_height,
+                         x_pos=self.__wnd_main_width - self.__rx_wnd_width - self.__margin_30,
+                         y_pos=self.__stats_wnd_height + 2 * self.__margin_30):
+            dpgc.add_text(self.__item_rx_text, default_value='')
+
+        dpgc.set_render_callback(self.__render_clbk)
         dpgc.start_dearpygui(primary_window=self.__item_simulation_main)
@@ -0,0 +1,428 @@
+# -*- coding: utf-8 -*-
+"""
+This module includes definition of messages database storage backends:
+    - CsvMsgStorage    - human readable csv file, changes are collected and the file is rewritten and atomically
+                         replaced once per write delay (0.5 s) and on flush or close, so bursts of edits cost a single
+                         write. Every write still costs O(N) of messages - use SQLite for large databases
+    - SqliteMsgStorage - SQLite database in WAL mode, every change is a single keyed write
+
+Messages are stored as records (name, id, payload, period_en, period, channel, extended_id, fd, brs, generators)
+identified by integer key. Columns missing in files created by older versions get default values.
+
+Conversion between formats:
+    $ python storage.py import candb/db.csv candb/db.sqlite
+    $ python storage.py export candb/db.sqlite candb/db.csv
+"""
+
+
+import argparse
+import csv
+import os
+import sqlite3
+from threading import Lock, Timer
+from typing import Dict, List, Optional, Tuple, Union
+
+
+StorageRecord = Tuple[str, str, str, bool, int, int, bool, bool, bool, str]
+
+DB_HEADERS = ['name', 'id', 'payload', 'period_en', 'period', 'channel', 'extended_id', 'fd', 'brs', 'generators']
+SQLITE_EXTENSIONS = ('.sqlite', '.sqlite3', '.db')
+
+
+def atomic_write_csv(path: str, records: List[StorageRecord]) -> None:
+    """
+    Writes records to csv file, file is replaced only after new content is completely written to disk
+    Params:                                                                     type:
+    @param path: Path to csv file                                               str
+    @param records: Records to be written                                       List[StorageRecord]
+    @return: None
+    """
+
+    temp_path = path + '.temp'
+    with open(temp_path, 'w', newline='') as temp_file:
+        writer = csv.writer(temp_file)
+        writer.writerow(DB_HEADERS)
+        writer.writerows(records)
+        temp_file.flush()
+        os.fsync(temp_file.fileno())
+    os.replace(temp_path, path)
+
+
+def read_csv_records(path: str) -> List[StorageRecord]:
+    """
+    Reads records from csv file
+    Params:                                                                     type:
+    @param path: Path to csv file                                               str
+    @return: Records in file order                                              List[StorageRecord]
+    """
+
+    with open(path, newline='') as csv_file:
+        return [(row['name'], row['id'], row['payload'], row['period_en'] == 'True', int(row['period'] or 100),
+                 int(row.get('channel') or 0), row.get('extended_id') == 'True', row.get('fd') == 'True',
+                 row.get('brs') == 'True', row.get('generators') or '') for row in csv.DictReader(csv_file)]
+
+
+class CsvMsgStorage:
+    """ Class for storing messages database in csv file """
+
+    __WRITE_DELAY_S = 0.5
+
+    def __init__(self, path: str, write_delay_s: Optional[float] = __WRITE_DELAY_S) -> None:
+        """
+        Opens csv file, creates it if it does not exist
+        Params:                                                                     type:
+        @param path: Path to csv file                                               str
+        @param write_delay_s: Time changes are collected before file is written,
+                              None to write file on every change                    Optional[float]
+        @return: None
+        """
+
+        self.__path = path
+        self.__write_delay_s = write_delay_s
+        self.__records_d = {}
+        self.__next_key = 0
+        self.__records_lock = Lock()
+        self.__write_lock = Lock()
+        self.__write_timer: Optional[Timer] = None
+        self.__dirty = False
+        if not os.path.exists(path):
+            if os.path.dirname(path) and not os.path.exists(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            atomic_write_csv(path=path, records=[])
+            print('Created db file: {}'.format(path))
+        else:
+            """ Db file already exists """
+            pass
+
+    def __schedule_write(self) -> None:
+        """
+        Schedules file write after change, changes made until the write are written together. Must be called with
+        records lock acquired
+        Params:                                                                     type:
+        @return: None
+        """
+
+        self.__dirty = True
+        if self.__write_delay_s is None:
+            return
+        if self.__write_timer is None:
+            """ Timer thread is not daemon, so pending changes are written also when application exits """
+            self.__write_timer = Timer(self.__write_delay_s, self.flush)
+            self.__write_timer.name = 'canvector-csv-write'
+            self.__write_timer.start()
+
+    """ ============================================= Class interface ============================================= """
+
+    def load(self) -> List[Tuple[int, StorageRecord]]:
+        """
+        Loads all records
+        Params:                                                                     type:
+        @return: Keys and records in database order                                 List[Tuple[int, StorageRecord]]
+        """
+
+        self.__records_d = dict(enumerate(read_csv_records(path=self.__path)))
+        self.__next_key = len(self.__records_d)
+        return list(self.__records_d.items())
+
+    def insert(self, record: StorageRecord) -> int:
+        """
+        Adds record at the end of database
+        Params:                                                                     type:
+        @param record: Message record                                               StorageRecord
+        @return: Key of added record                                                int
+        """
+
+        with self.__records_lock:
+            key = self.__next_key
+            self.__next_key += 1
+            self.__records_d[key] = record
+            self.__schedule_write()
+        if self.__write_delay_s is None:
+            self.flush()
+        return key
+
+    def insert_many(self, records: List[StorageRecord]) -> List[int]:
+        """
+        Adds records at the end of database, they are written together
+        Params:                                                                     type:
+        @param records: Message records                                             List[StorageRecord]
+        @return: Keys of added records                                              List[int]
+        """
+
+        with self.__records_lock:
+            keys = list(range(self.__next_key, self.__next_key + len(records)))
+            self.__next_key += len(records)
+            self.__records_d.update(zip(keys, records))
+            self.__schedule_write()
+        if self.__write_delay_s is None:
+            self.flush()
+        return keys
+
+    def update(self, key: int, record: StorageRecord) -> None:
+        """
+        Replaces record
+        Params:                                                                     type:
+        @param key: Key of the record                                               int
+        @param record: Message record                                               StorageRecord
+        @return: None
+        """
+
+        with self.__records_lock:
+            self.__records_d[key] = record
+            self.__schedule_write()
+        if self.__write_delay_s is None:
+            self.flush()
+
+    def update_many(self, records_d: Dict[int, StorageRecord]) -> None:
+        """
+        Replaces records, they are written together
+        Params:                                                                     type:
+        @param records_d: Message records by key                                    Dict[int, StorageRecord]
+        @return: None
+        """
+
+        with self.__records_lock:
+            self.__records_d.update(records_d)
+            self.__schedule_write()
+        if self.__write_delay_s is None:
+            self.flush()
+
+    def delete(self, key: int) -> None:
+        """
+        Removes record
+        Params:                                                                     type:
+        @param key: Key of the record                                               int
+        @return: None
+        """
+
+        with self.__records_lock:
+            del self.__records_d[key]
+            self.__schedule_write()
+        if self.__write_delay_s is None:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Writes pending changes to csv file at once, file is replaced only after it is completely written
+        Params:                                                                     type:
+        @return: None
+        """
+
+        with self.__write_lock:
+            with self.__records_lock:
+                if self.__write_timer is not None:
+                    self.__write_timer.cancel()
+                    self.__write_timer = None
+                if not self.__dirty:
+                    return
+                records = list(self.__records_d.values())
+                self.__dirty = False
+            """ Changes made while file is written schedule the next write """
+            atomic_write_csv(path=self.__path, records=records)
+
+    def close(self) -> None:
+        """
+        Closes storage, pending changes are written
+        Params:                                                                     type:
+        @return: None
+        """
+
+        self.flush()
+
+
+class SqliteMsgStorage:
+    """ Class for storing messages database in SQLite file """
+
+    __COLUMN_TYPES_D = {'name': 'TEXT', 'id': 'TEXT', 'payload': 'TEXT', 'period_en': 'INTEGER',
+                        'period': 'INTEGER', 'channel': 'INTEGER NOT NULL DEFAULT 0',
+                        'extended_id': 'INTEGER NOT NULL DEFAULT 0', 'fd': 'INTEGER NOT NULL DEFAULT 0',
+                        'brs': 'INTEGER NOT NULL DEFAULT 0', 'generators': "TEXT NOT NULL DEFAULT ''"}
+    __COLUMNS = ', '.join(DB_HEADERS)
+    __INSERT_SQL = 'INSERT INTO msgs ({}) VALUES ({})'.format(__COLUMNS, ', '.join('?' * len(DB_HEADERS)))
+    __UPDATE_SQL = 'UPDATE msgs SET {} WHERE key = ?'.format(', '.join(column + ' = ?' for column in DB_HEADERS))
+
+    def __init__(self, path: str) -> None:
+        """
+        Opens SQLite database in WAL mode, creates it if it does not exist
+        Params:                                                                     type:
+        @param path: Path to SQLite file                                            str
+        @return: None
+        """
+
+        if os.path.dirname(path) and not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        self.__lock = Lock()
+        self.__conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.__conn.execute('PRAGMA journal_mode=WAL')
+        self.__conn.execute('PRAGMA synchronous=NORMAL')
+        self.__conn.execute('CREATE TABLE IF NOT EXISTS msgs (key INTEGER PRIMARY KEY AUTOINCREMENT, {})'.format(
+            ', '.join(column + ' ' + self.__COLUMN_TYPES_D[column] for column in DB_HEADERS)))
+        existing_columns = [row[1] for row in self.__conn.execute('PRAGMA table_info(msgs)')]
+        for column in DB_HEADERS:
+            if column not in existing_columns:
+                """ Database created by older version - add missing column """
+                self.__conn.execute('ALTER TABLE msgs ADD COLUMN {} {}'.format(column, self.__COLUMN_TYPES_D[column]))
+
+    """ ============================================= Class interface ============================================= """
+
+    def load(self) -> List[Tuple[int, StorageRecord]]:
+        """
+        Loads all records
+        Params:                                                                     type:
+        @return: Keys and records in database order                                 List[Tuple[int, StorageRecord]]
+        """
+
+        with self.__lock:
+            rows = self.__conn.execute('SELECT key, {} FROM msgs ORDER BY key'.format(self.__COLUMNS)).fetchall()
+        return [(key, (name, msg_id, payload, bool(period_en), int(period), int(channel), bool(extended_id), bool(fd),
+                       bool(brs), generators))
+                for key, name, msg_id, payload, period_en, period, channel, extended_id, fd, brs, generators in rows]
+
+    def insert(self, record: StorageRecord) -> int:
+        """
+        Adds record at the end of database
+        Params:                                                                     type:
+        @param record: Message record                                               StorageRecord
+        @return: Key of added record                                                int
+        """
+
+        with self.__lock:
+            return self.__conn.execute(self.__INSERT_SQL, record).lastrowid
+
+    def insert_many(self, records: List[StorageRecord]) -> List[int]:
+        """
+        Adds records at the end of database in a single transaction
+        Params:                                                                     type:
+        @param records: Message records                                             List[StorageRecord]
+        @return: Keys of added records                                              List[int]
+        """
+
+        with self.__lock:
+            self.__conn.execute('BEGIN')
+            try:
+                keys = [self.__conn.execute(self.__INSERT_SQL, record).lastrowid for record in records]
+            except sqlite3.Error:
+                self.__conn.execute('ROLLBACK')
+                raise
+            self.__conn.execute('COMMIT')
+        return keys
+
+    def update(self, key: int, record: StorageRecord) -> None:
+        """
+        Replaces record
+        Params:                                                                     type:
+        @param key: Key of the record                                               int
+        @param record: Message record                                               StorageRecord
+        @return: None
+        """
+
+        with self.__lock:
+            self.__conn.execute(self.__UPDATE_SQL, (*record, key))
+
+    def update_many(self, records_d: Dict[int, StorageRecord]) -> None:
+        """
+        Replaces records in a single transaction
+        Params:                                                                     type:
+        @param records_d: Message records by key                                    Dict[int, StorageRecord]
+        @return: None
+        """
+
+        with self.__lock:
+            self.__conn.execute('BEGIN')
+            try:
+                self.__conn.executemany(self.__UPDATE_SQL, [(*record, key) for key, record in records_d.items()])
+            except sqlite3.Error:
+                self.__conn.execute('ROLLBACK')
+                raise
+            self.__conn.execute('COMMIT')
+
+    def delete(self, key: int) -> None:
+        """
+        Removes record
+        Params:                                                                     type:
+        @param key: Key of the record                                               int
+        @return: None
+        """
+
+        with self.__lock:
+            self.__conn.execute('DELETE FROM msgs WHERE key = ?', (key, ))
+
+    def flush(self) -> None:
+        """
+        Writes pending changes, every change is already committed so nothing has to be done
+        Params:                                                                     type:
+        @return: None
+        """
+
+        pass
+
+    def close(self) -> None:
+        """
+        Closes database connection
+        Params:                                                                     type:
+        @return: None
+        """
+
+        with self.__lock:
+            self.__conn.close()
+
+
+def open_storage(path: str) -> Union[CsvMsgStorage, SqliteMsgStorage]:
+    """
+    Opens storage backend matching file extension
+    Params:                                                                     type:
+    @param path: Path to database file                                          str
+    @return: Storage backend                                                    Union[CsvMsgStorage, SqliteMsgStorage]
+    """
+
+    if os.path.splitext(path)[1].lower() in SQLITE_EXTENSIONS:
+        return SqliteMsgStorage(path=path)
+    else:
+        return CsvMsgStorage(path=path)
+
+
+def import_csv(csv_path: str, sqlite_path: str) -> int:
+    """
+    Imports csv database into SQLite database, records are appended to existing ones
+    Params:                                                                     type:
+    @param csv_path: Path to source csv file                                    str
+    @param sqlite_path: Path to target SQLite file                              str
+    @return: Number of imported records                                         int
+    """
+
+    records = read_csv_records(path=csv_path)
+    sqlite_storage = SqliteMsgStorage(path=sqlite_path)
+    sqlite_storage.insert_many(records=records)
+    sqlite_storage.close()
+    return len(records)
+
+
+def export_csv(sqlite_path: str, csv_path: str) -> int:
+    """
+    Exports SQLite database into csv file, existing csv file is atomically replaced
+    Params:                                                                     type:
+    @param sqlite_path: Path to source SQLite file                              str
+    @param csv_path: Path to target csv file                                    str
+    @return: Number of exported records                                         int
+    """
+
+    sqlite_storage = SqliteMsgStorage(path=sqlite_path)
+    records = [record for key, record in sqlite_storage.load()]
+    sqlite_storage.close()
+    atomic_write_csv(path=csv_path, records=records)
+    return len(records)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Messages database conversion')
+    parser.add_argument('operation', choices=['import', 'export'], help='import csv to SQLite or export SQLite to csv')
+    parser.add_argument('source', help='source database file')
+    parser.add_argument('target', help='target database file')
+    args = parser.parse_args()
+
+    if args.operation == 'import':
+        print('Imported {} messages to {}'.format(import_csv(csv_path=args.source, sqlite_path=args.target),
+                                                  args.target))
+    else:
+        print('Exported {} messages to {}'.format(export_csv(sqlite_path=args.source, csv_path=args.target),
+                                                  args.target))
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+This module includes definition of class TxTelemetry collecting timing of transmitted CAN frames. Hot path only
+stores send timestamp in preallocated per-id ring buffer, statistics are computed on demand.
+"""
+
+
+import json
+import statistics
+import time
+from array import array
+from collections import deque
+from threading import Lock
+from typing import Any, Callable, Dict, Optional
+
+
+class TxTelemetry:
+    """ Class for per-message timing statistics """
+
+    HIST_BOUNDS_MS = (0.1, 0.5, 1, 2, 5, 10, 50)
+    __RING_SIZE = 256
+    __RATE_WINDOW_S = 5.0
+
+    def __init__(self, ring_size: int = __RING_SIZE) -> None:
+        """
+        Setups empty statistics
+        Params:                                                                     type:
+        @param ring_size: Number of send timestamps kept per CAN id                 int
+        @return: None
+        """
+
+        self.__ring_size = ring_size
+        self.__rings_d: Dict[int, array] = {}
+        self.__ring_pos_d: Dict[int, int] = {}
+        self.__expected_periods_d: Dict[int, int] = {}
+        self.__counters_d: Dict[str, Callable[[], Any]] = {}
+        self.__frames_cnt = 0
+        self.__rate_lock = Lock()
+        self.__rate_samples = deque([(time.monotonic(), 0)])
+
+    def __get_timestamps(self, can_id: int) -> list:
+        """
+        Provides send timestamps of CAN id in chronological order
+        Params:                                                                     type:
+        @param can_id: CAN id                                                       int
+        @return: Send timestamps                                                    list
+        """
+
+        ring, pos = self.__rings_d[can_id], self.__ring_pos_d[can_id]
+        if pos <= self.__ring_size:
+            return list(ring[:pos])
+        else:
+            start = pos % self.__ring_size
+            return list(ring[start:]) + list(ring[:start])
+
+    def __get_id_stats(self, can_id: int) -> Dict[str, Any]:
+        """
+        Computes statistics of single CAN id from its ring buffer
+        Params:                                                                     type:
+        @param can_id: CAN id                                                       int
+        @return: Statistics                                                         Dict[str, Any]
+        """
+
+        timestamps = self.__get_timestamps(can_id=can_id)
+        intervals_ms = [(t_next - t_prev) * 1000 for t_prev, t_next in zip(timestamps, timestamps[1:])]
+        expected_ms = self.__expected_periods_d.get(can_id)
+        id_stats = {'count': self.__ring_pos_d[can_id], 'expected_period_ms': expected_ms}
+        if intervals_ms:
+            id_stats['mean_period_ms'] = statistics.fmean(intervals_ms)
+            id_stats['jitter_ms'] = statistics.pstdev(intervals_ms)
+            if expected_ms:
+                errors_ms = [abs(interval - expected_ms) for interval in intervals_ms]
+                id_stats['mean_period_error_ms'] = id_stats['mean_period_ms'] - expected_ms
+                id_stats['max_period_error_ms'] = max(errors_ms)
+                histogram = [0] * (len(self.HIST_BOUNDS_MS) + 1)
+                for error in errors_ms:
+                    histogram[sum(error > bound for bound in self.HIST_BOUNDS_MS)] += 1
+                id_stats['error_histogram'] = dict(zip(['<={}ms'.format(bound) for bound in self.HIST_BOUNDS_MS] +
+                                                       ['>{}ms'.format(self.HIST_BOUNDS_MS[-1])], histogram))
+        return id_stats
+
+    """ ============================================= Class interface ============================================= """
+
+    def record_tx(self, can_id: int, timestamp: float) -> None:
+        """
+        Stores send timestamp of CAN frame, called from TX path
+        Params:                                                                     type:
+        @param can_id: CAN id                                                       int
+        @param timestamp: Monotonic time of sending                                 float
+        @return: None
+        """
+
+        ring = self.__rings_d.get(can_id)
+        if ring is None:
+            self.__ring_pos_d[can_id] = 0
+            ring = self.__rings_d[can_id] = array('d', bytes(8 * self.__ring_size))
+        pos = self.__ring_pos_d[can_id]
+        ring[pos % self.__ring_size] = timestamp
+        self.__ring_pos_d[can_id] = pos + 1
+        self.__frames_cnt += 1
+
+    def set_expected_periods(self, expected_periods_d: Dict[int, int]) -> None:
+        """
+        Setups configured periods used for period error computation
+        Params:                                                                     type:
+        @param expected_periods_d: Period in ms by CAN id                           Dict[int, int]
+        @return: None
+        """
+
+        self.__expected_periods_d = dict(expected_periods_d)
+
+    def add_counter(self, name: str, provider: Callable[[], Any]) -> None:
+        """
+        Registers external counter included in statistics, e.g. scheduler overruns or queue depth
+        Params:                                                                     type:
+        @param name: Counter name                                                   str
+        @param provider: Function returning counter value                           Callable
+        @return: None
+        """
+
+        self.__counters_d[name] = provider
+
+    def get_frames_rate(self) -> float:
+        """
+        Provides number of frames sent per second in rolling window
+        Params:                                                                     type:
+        @return: Frames per second                                                  float
+        """
+
+        with self.__rate_lock:
+            now, frames_cnt = time.monotonic(), self.__frames_cnt
+            while len(self.__rate_samples) > 1 and now - self.__rate_samples[1][0] >= self.__RATE_WINDOW_S:
+                self.__rate_samples.popleft()
+            first_time, first_cnt = self.__rate_samples[0]
+            self.__rate_samples.append((now, frames_cnt))
+        return (frames_cnt - first_cnt) / max(now - first_time, 1e-9)
+
+    def get_stats(self, can_id: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Provides statistics of all CAN ids or specified one
+        Params:                                                                     type:
+        @param can_id: CAN id, None for all                                         Optional[int]
+        @return: Statistics                                                         Dict[str, Any]
+        """
+
+        can_ids = [can_id] if can_id is not None else sorted(list(self.__rings_d))
+        return {'frames_sent': self.__frames_cnt,
+                'frames_per_s': self.get_frames_rate(),
+                'counters': {name: provider() for name, provider in self.__counters_d.items()},
+                'ids': {'0x{:X}'.format(can_id): self.__get_id_stats(can_id=can_id)
+                        for can_id in can_ids if can_id in self.__rings_d}}
+
+    def format_stats(self) -> str:
+        """
+        Provides statistics as human readable text
+        Params:                                                                     type:
+        @return: Statistics summary                                                 str
+        """
+
+        stats = self.get_stats()
+        lines = ['frames sent: {}   frames/s: {:.1f}'.format(stats['frames_sent'], stats['frames_per_s'])]
+        lines += ['{}: {}'.format(name, value) for name, value in stats['counters'].items()]
+        lines.append('{:>10} {:>8} {:>10} {:>10} {:>10} {:>10}'.format('id', 'count', 'period', 'mean', 'jitter',
+                                                                   'max err'))
+        for can_id, id_stats in stats['ids'].items():
+            lines.append('{:>10} {:>8} {:>10} {:>10.3f} {:>10.3f} {:>10.3f}'.format(
+                can_id, id_stats['count'], str(id_stats['expected_period_ms']), id_stats.get('mean_period_ms', 0),
+                id_stats.get('jitter_ms', 0), id_stats.get('max_period_error_ms', 0)))
+        return '\n'.join(lines)
+
+    def export(self, path: str) -> None:
+        """
+        Saves statistics to file, JSON if path ends with .json, text otherwise
+        Params:                                                                     type:
+        @param path: Path to output file                                            str
+        @return: None
+        """
+
+        with open(path, 'w') as stats_file:
+            if path.lower().endswith('.json'):
+                json.dump(self.get_stats(), stats_file, indent=2)
+            else:
+                stats_file.write(self.format_stats())
@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""
+Tests import application modules from repository root, same as benchmarks.
+"""
+
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
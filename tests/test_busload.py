@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of bus load computation - CRC15, bit counts of classic and CAN FD frames including stuff bits, and validation
+of payload length of generated stress frames.
+"""
+
+
+import os
+
+import can
+import pytest
+
+from busload import _crc15, create_stress, frame_bits, generate_frames
+from frametable import FrameTable
+
+
+def test_crc15_check_value():
+    """ CRC-15/CAN check value of ASCII '123456789' """
+    bits = [(byte >> shift) & 1 for byte in b'123456789' for shift in range(7, -1, -1)]
+    assert _crc15(bits) == 0x059E
+
+
+def test_classic_frame_of_zeros():
+    """ 34 dominant bits from SOF to the end of CRC (CRC of zeros is zero) - stuff bit after every 5 of them """
+    msg = can.Message(arbitration_id=0x000, is_extended_id=False, data=b'')
+    assert frame_bits(msg=msg) == (34 + 6 + 13, 0)
+
+
+def test_fd_frame_of_zeros():
+    """ 22 bits from SOF to DLC with 3 stuff bits, stuff count and CRC17 with 6 fixed stuff bits, tail """
+    msg = can.Message(arbitration_id=0x000, is_extended_id=False, is_fd=True, data=b'')
+    assert frame_bits(msg=msg) == (22 + 3 + 27 + 13, 0)
+
+
+def test_fd_frame_with_bit_rate_switch():
+    """ Bits after BRS, data phase stuff bit, CRC field and CRC delimiter are sent with data bitrate """
+    msg = can.Message(arbitration_id=0x000, is_extended_id=False, is_fd=True, bitrate_switch=True, data=b'')
+    assert frame_bits(msg=msg) == (17 + 2 + 12, 5 + 1 + 27 + 1)
+
+
+@pytest.mark.parametrize('extended_id', [False, True])
+def test_classic_frames_within_stuffing_bounds(extended_id):
+    """ Unstuffed length and worst case number of stuff bits of classic frames """
+    header_bits, id_mask = (54, 0x1FFFFFFF) if extended_id else (34, 0x7FF)
+    for length in range(9):
+        for _ in range(20):
+            msg = can.Message(arbitration_id=int.from_bytes(os.urandom(4), 'little') & id_mask,
+                              is_extended_id=extended_id, data=os.urandom(length))
+            stuffed_bits = header_bits + 8 * length
+            bits, data_phase_bits = frame_bits(msg=msg)
+            assert stuffed_bits + 13 <= bits <= stuffed_bits + 13 + (stuffed_bits - 1) // 4
+            assert data_phase_bits == 0
+
+
+@pytest.mark.parametrize('length, fd', [(9, False), (-1, False), (10, True), (65, True)])
+def test_invalid_length_of_generated_frames_is_rejected(capsys, length, fd):
+    with pytest.raises(ValueError):
+        generate_frames(id_first=0x100, id_last=0x101, length=length, fd=fd)
+    assert create_stress(frame_table=FrameTable(frames=(), version=0), tx_pipeline=None, bus_kwargs={},
+                         target_load=0.5, id_range=(0x100, 0x101), length=length, fd=fd) is None
+    assert 'Stress not started' in capsys.readouterr().out
+
+
+def test_generated_frames():
+    msgs = generate_frames(id_first=0x7FE, id_last=0x801, length=12, fd=True, brs=True)
+    assert [msg.arbitration_id for msg in msgs] == [0x7FE, 0x7FF, 0x800, 0x801]
+    assert all(msg.is_extended_id and msg.is_fd and msg.bitrate_switch and len(msg.data) == 12 for msg in msgs)
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of DBC signal encoders - Intel and Motorola layouts, signed, scaled and float signals, range checks and live
+signal updates of the messages database.
+"""
+
+
+import contextlib
+import io
+import struct
+
+import pytest
+
+from dbcsignals import MessageEncoder, SignalEncoder
+from dbman import DataBaseMan
+
+
+def encode(signal: SignalEncoder, value: float, length: int = 8, fill: int = 0x00) -> bytes:
+    payload = bytearray([fill] * length)
+    signal.encode_into(payload=payload, value=value)
+    return bytes(payload)
+
+
+def test_intel_signal_within_byte():
+    signal = SignalEncoder(name='sig', start_bit=4, length=4)
+    assert encode(signal=signal, value=0xA) == b'\xA0' + bytes(7)
+    assert encode(signal=signal, value=0x5, fill=0xFF) == b'\x5F' + b'\xFF' * 7
+
+
+def test_intel_signal_spanning_bytes():
+    signal = SignalEncoder(name='sig', start_bit=4, length=12)
+    payload = encode(signal=signal, value=0xABC)
+    assert payload == b'\xC0\xAB' + bytes(6)
+    assert signal.decode(payload=payload) == 0xABC
+
+
+def test_motorola_signal_spanning_bytes():
+    """ Start bit 7 is MSB of byte 0, 16 bits are big endian in bytes 0 and 1 """
+    signal = SignalEncoder(name='sig', start_bit=7, length=16, little_endian=False)
+    payload = encode(signal=signal, value=0x1234)
+    assert payload == b'\x12\x34' + bytes(6)
+    assert signal.decode(payload=payload) == 0x1234
+
+
+def test_motorola_signal_not_aligned_to_bytes():
+    """ MSB in bit 3 of byte 0, 12 bits - 4 bits in byte 0 and 8 bits in byte 1 """
+    signal = SignalEncoder(name='sig', start_bit=3, length=12, little_endian=False)
+    payload = encode(signal=signal, value=0xABC, fill=0xFF)
+    assert payload == b'\xFA\xBC' + b'\xFF' * 6
+    assert signal.decode(payload=payload) == 0xABC
+
+
+def test_signed_signal_round_trip():
+    signal = SignalEncoder(name='sig', start_bit=8, length=8, is_signed=True)
+    payload = encode(signal=signal, value=-2)
+    assert payload[1] == 0xFE
+    assert signal.decode(payload=payload) == -2
+
+
+def test_scale_and_offset():
+    signal = SignalEncoder(name='sig', start_bit=0, length=16, scale=0.25, offset=-40)
+    payload = encode(signal=signal, value=90.5)
+    assert int.from_bytes(payload[:2], 'little') == 522
+    assert signal.decode(payload=payload) == pytest.approx(90.5)
+
+
+def test_float_signal():
+    signal = SignalEncoder(name='sig', start_bit=0, length=32, is_float=True)
+    payload = encode(signal=signal, value=1.5)
+    assert payload[:4] == struct.pack('<f', 1.5)
+    assert signal.decode(payload=payload) == 1.5
+
+
+@pytest.mark.parametrize('value', [256, -1, 10.5])
+def test_value_out_of_range_is_rejected(value):
+    signal = SignalEncoder(name='sig', start_bit=0, length=8, maximum=10 if value == 10.5 else None)
+    with pytest.raises(ValueError):
+        encode(signal=signal, value=value)
+
+
+def test_invalid_layout_is_rejected():
+    with pytest.raises(ValueError):
+        SignalEncoder(name='sig', start_bit=0, length=16, is_float=True)
+    with pytest.raises(ValueError):
+        MessageEncoder(name='msg', can_id=0x100, length=1, signals=[SignalEncoder(name='sig', start_bit=4, length=8)])
+
+
+def test_message_not_changed_if_any_value_invalid():
+    encoder = MessageEncoder(name='msg', can_id=0x100, length=2, signals=[
+        SignalEncoder(name='a', start_bit=0, length=8), SignalEncoder(name='b', start_bit=8, length=4)])
+    payload = bytearray(2)
+    with pytest.raises(ValueError):
+        encoder.encode_into(payload=payload, values={'a': 1, 'b': 16})
+    with pytest.raises(ValueError):
+        encoder.encode_into(payload=payload, values={'a': 1, 'c': 0})
+    assert payload == bytearray(2)
+    encoder.encode_into(payload=payload, values={'a': 1, 'b': 15})
+    assert encoder.decode(payload=bytes(payload)) == {'a': 1, 'b': 15}
+
+
+def test_live_signal_update_keeps_frames_table(tmp_path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        database_man = DataBaseMan(db_path=str(tmp_path / 'db.csv'))
+        assert database_man.add_msg(name='msg', msg_id='0x100', payload='0x00 0x00')
+    encoder = MessageEncoder(name='msg', can_id=0x100, length=2, signals=[
+        SignalEncoder(name='speed', start_bit=7, length=16, little_endian=False)])
+    assert database_man.set_encoders(encoders_d={0x100: encoder}) == 1
+    handle = database_man.get_handle(index=0)
+    frame_table = database_man.get_frame_table()
+    frame = frame_table.get_frame_by_handle(handle=handle)
+    updated_frames = []
+    database_man.add_payload_listener(updated_frames.extend)
+
+    assert database_man.update_signals_live(updates=[(handle, {'speed': 0x1234}), (handle, {'speed': 0x10000})]) == \
+        [True, False]
+    assert database_man.get_frame_table() is frame_table
+    assert frame_table.get_frame_by_handle(handle=handle) is frame and bytes(frame.msg.data) == b'\x12\x34'
+    assert updated_frames == [frame]
+    assert database_man.get_msg(handle=handle).payload == b'\x12\x34'
+    assert database_man.get_signals(handle=handle) == {'speed': 0x1234}
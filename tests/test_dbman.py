@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of live updates of DataBaseMan - payloads of the same length are replaced in place, period and payload length
+changes publish new frames table snapshot.
+"""
+
+
+import contextlib
+import io
+
+import pytest
+
+from dbman import DataBaseMan
+
+
+@pytest.fixture
+def database_man(tmp_path) -> DataBaseMan:
+    with contextlib.redirect_stdout(io.StringIO()):
+        database_man = DataBaseMan(db_path=str(tmp_path / 'db.csv'))
+        for i in range(3):
+            assert database_man.add_msg(name='msg{}'.format(i), msg_id='0x{:X}'.format(0x100 + i), payload='0x00 0x00')
+    return database_man
+
+
+def test_same_length_payload_replaced_in_place(database_man):
+    handles = [database_man.get_handle(index=index) for index in range(3)]
+    frame_table = database_man.get_frame_table()
+    frames = [frame_table.get_frame_by_handle(handle=handle) for handle in handles]
+    updated_frames, published = [], []
+    database_man.add_payload_listener(updated_frames.extend)
+    database_man.add_update_listener(lambda: published.append(True))
+
+    assert database_man.update_msgs_live(updates=[(handles[0], b'\x01\x02', None, None),
+                                                  (handles[2], b'\x03\x04', False, 100)]) == [True, True]
+    assert database_man.get_frame_table() is frame_table and not published
+    assert updated_frames == [frames[0], frames[2]]
+    assert bytes(frames[0].msg.data) == b'\x01\x02' and bytes(frames[2].msg.data) == b'\x03\x04'
+    assert bytes(frames[1].msg.data) == b'\x00\x00'
+    assert database_man.get_msg(handle=handles[0]).payload == b'\x01\x02'
+
+
+def test_period_and_length_changes_publish_new_table(database_man):
+    handles = [database_man.get_handle(index=index) for index in range(3)]
+    frame_table = database_man.get_frame_table()
+    updated_frames = []
+    database_man.add_payload_listener(updated_frames.extend)
+
+    assert database_man.update_msgs_live(updates=[(handles[0], b'\x01\x02\x03', None, None),
+                                                  (handles[1], None, None, 50),
+                                                  (handles[2], b'\x05\x06', None, None),
+                                                  (handles[0], b'\x07\x08\x09', None, None)]) == [True] * 4
+    new_frame_table = database_man.get_frame_table()
+    assert new_frame_table.get_version() == frame_table.get_version() + 1
+    assert bytes(new_frame_table.get_frame_by_handle(handle=handles[0]).msg.data) == b'\x07\x08\x09'
+    assert new_frame_table.get_frame_by_handle(handle=handles[1]).period == 50
+    assert new_frame_table.get_frame_by_handle(handle=handles[2]) is frame_table.get_frame_by_handle(handle=handles[2])
+    assert updated_frames == [frame_table.get_frame_by_handle(handle=handles[2])]
+
+
+def test_invalid_update_changes_nothing(database_man):
+    handle = database_man.get_handle(index=0)
+    frame_table = database_man.get_frame_table()
+    assert database_man.update_msgs_live(updates=[(handle, bytes(9), None, None), (handle, None, None, 0)]) == \
+        [False, False]
+    assert database_man.get_frame_table() is frame_table
+    assert database_man.get_msg(handle=handle).payload == b'\x00\x00'
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of bulk import validation - every invalid row is reported with its reason and valid rows are normalized.
+"""
+
+
+import pandas as pd
+import pytest
+
+from msgimport import validate_msgs
+
+
+def create_msgs(rows: list, columns: tuple = ('name', 'id', 'payload')) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=list(columns), dtype=str)
+
+
+def test_valid_messages_get_defaults():
+    valid_df, invalid_rows = validate_msgs(msgs_df=create_msgs([('a', '0x100', '0x01 0x02'),
+                                                                 ('b', '0x18DAF110', '0x00'),
+                                                                 ('c', '0x200', ' '.join(['0x00'] * 12))]))
+    assert invalid_rows == []
+    assert list(valid_df['name']) == ['a', 'b', 'c']
+    assert list(valid_df['extended_id']) == [False, True, False]
+    assert list(valid_df['fd']) == [False, False, True]
+    assert list(valid_df['period']) == [100] * 3 and list(valid_df['channel']) == [0] * 3
+    assert list(valid_df['period_en']) == [False] * 3 and list(valid_df['generators']) == [''] * 3
+
+
+@pytest.mark.parametrize('row, reason', [
+    (('x', 'zz', '0x00', '', '', '', '', '', ''), 'msg id is not valid hex value'),
+    (('x', '0x100', '0x1', '', '', '', '', '', ''), 'msg payload is in incorrect format'),
+    (('x', '0x800', '0x00', '', '', '', '', '', ''), 'msg id exceeds 11-bit (29-bit if extended) range'),
+    (('x', '0x1FFFFFFFFFFFFFFFF', '0x00', '', '', '', 'true', '', ''),
+     'msg id exceeds 11-bit (29-bit if extended) range'),
+    (('x', '0x100', ' '.join(['0x00'] * 9), '', '', '', '', 'false', ''),
+     'msg payload length is not valid CAN (CAN FD) frame length'),
+    (('x', '0x100', ' '.join(['0x00'] * 10), '', '', '', '', 'true', ''),
+     'msg payload length is not valid CAN (CAN FD) frame length'),
+    (('x', '0x100', '0x00', '', '', '', '', '', 'true'), 'bit rate switch is allowed only in CAN FD frame'),
+    (('x', '0x100', '0x00', 'true', '0', '', '', '', ''), 'period is not integer in range 1-10000 ms'),
+    (('x', '0x100', '0x00', 'true', '10.5', '', '', '', ''), 'period is not integer in range 1-10000 ms'),
+])
+def test_invalid_row_is_reported(row, reason):
+    columns = ('name', 'id', 'payload', 'period_en', 'period', 'channel', 'extended_id', 'fd', 'brs')
+    valid_row = ('ok', '0x7FF', '0x00', 'true', '10', '0', 'false', 'false', 'false')
+    valid_df, invalid_rows = validate_msgs(msgs_df=create_msgs([valid_row, row], columns=columns))
+    assert invalid_rows == [(1, reason)]
+    assert list(valid_df['name']) == ['ok'] and list(valid_df['period_en']) == [True]
+
+
+def test_invalid_generators_are_reported():
+    msgs_df = create_msgs([('a', '0x100', '0x00 0x00', 'counter(bit=0,len=8)'),
+                           ('b', '0x101', '0x00', 'counter(bit=8,len=8)')],
+                          columns=('name', 'id', 'payload', 'generators'))
+    valid_df, invalid_rows = validate_msgs(msgs_df=msgs_df)
+    assert list(valid_df['name']) == ['a'] and list(valid_df['generators']) == ['counter(bit=0,len=8)']
+    assert [row for row, _ in invalid_rows] == [1]
+
+
+def test_extended_flag_allows_29_bit_id_of_small_value():
+    msgs_df = create_msgs([('a', '0x100', '0x00', 'true'), ('b', '0x1000', '0x00', 'false')],
+                          columns=('name', 'id', 'payload', 'extended_id'))
+    valid_df, invalid_rows = validate_msgs(msgs_df=msgs_df)
+    assert list(valid_df['extended_id']) == [True]
+    assert invalid_rows == [(1, 'msg id exceeds 11-bit (29-bit if extended) range')]
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of MsgRegistry and DataBaseMan handles - handles stay stable when other messages are deleted and re-added.
+"""
+
+
+import contextlib
+import io
+import random
+
+import pytest
+
+from dbman import DataBaseMan
+from msgregistry import MsgRecord, MsgRegistry
+
+
+def create_record(handle: int, can_id: int, name: str = '') -> MsgRecord:
+    return MsgRecord(handle=handle, name=name or 'msg{}'.format(handle), can_id=can_id, payload=bytes(8),
+                     period_en=False, period=100)
+
+
+def create_registry() -> MsgRegistry:
+    registry = MsgRegistry()
+    for handle, can_id in ((10, 0x100), (11, 0x200), (12, 0x300)):
+        registry.put(record=create_record(handle=handle, can_id=can_id))
+    return registry
+
+
+def test_delete_keeps_handles_of_other_messages():
+    registry = create_registry()
+    assert registry.delete(handle=11).can_id == 0x200
+    assert registry.get(handle=11) is None
+    assert registry.get(handle=10).can_id == 0x100 and registry.get(handle=12).can_id == 0x300
+    assert [registry.get_handle(index=index) for index in range(3)] == [10, 12, None]
+    assert registry.get_index(handle=12) == 1
+    assert registry.get_by_id(can_id=0x200) is None and registry.get_by_name(name='msg11') is None
+
+
+def test_readded_message_gets_its_handle_back_at_the_end():
+    registry = create_registry()
+    registry.delete(handle=10)
+    registry.put(record=create_record(handle=10, can_id=0x100))
+    assert [registry.get_handle(index=index) for index in range(3)] == [11, 12, 10]
+    assert registry.get_by_id(can_id=0x100).handle == 10
+    assert registry.get_by_name(name='msg10').handle == 10
+
+
+def test_replaced_message_keeps_handle_and_position():
+    registry = create_registry()
+    registry.put(record=create_record(handle=11, can_id=0x201, name='renamed'))
+    assert registry.get_index(handle=11) == 1
+    assert registry.get_by_id(can_id=0x200) is None and registry.get_by_name(name='msg11') is None
+    assert registry.get_by_id(can_id=0x201).handle == 11 and registry.get_by_name(name='renamed').handle == 11
+
+
+def test_duplicate_ids_resolve_to_first_remaining_message():
+    registry = create_registry()
+    registry.put(record=create_record(handle=13, can_id=0x100))
+    assert registry.get_by_id(can_id=0x100).handle == 10
+    registry.delete(handle=10)
+    assert registry.get_by_id(can_id=0x100).handle == 13
+
+
+@pytest.mark.parametrize('db_name', ['db.csv', 'db.sqlite'])
+def test_database_handles_survive_delete_and_readd(tmp_path, db_name):
+    with contextlib.redirect_stdout(io.StringIO()):
+        database_man = DataBaseMan(db_path=str(tmp_path / db_name))
+        for i in range(3):
+            assert database_man.add_msg(name='msg{}'.format(i), msg_id='0x{:X}'.format(0x100 + i), payload='0x00')
+        handles = [database_man.get_handle(index=index) for index in range(3)]
+
+        """ Deleted message is the last one, so its key is the first candidate for reuse """
+        database_man.delete_msg_by_handle(handle=handles[2])
+        database_man.delete_msg_by_handle(handle=handles[0])
+        assert database_man.add_msg(name='msg2', msg_id='0x102', payload='0x00')
+        new_handle = database_man.get_msg_by_id(can_id=0x102).handle
+
+    assert new_handle not in handles
+    assert database_man.get_msg(handle=handles[1]).can_id == 0x101
+    assert database_man.get_msg(handle=handles[0]) is None and database_man.get_msg(handle=handles[2]) is None
+    assert [database_man.get_handle(index=index) for index in range(2)] == [handles[1], new_handle]
+    frame_table = database_man.get_frame_table()
+    assert frame_table.get_frame_by_handle(handle=handles[1]).msg.arbitration_id == 0x101
+    assert frame_table.get_frame_by_handle(handle=new_handle).msg.arbitration_id == 0x102
+
+
+def test_positions_follow_puts_and_deletes():
+    registry, handles = MsgRegistry(), []
+    random_gen = random.Random(7)
+    for step in range(500):
+        if handles and random_gen.random() < 0.4:
+            handle = random_gen.choice(handles)
+            handles.remove(handle)
+            registry.delete(handle=handle)
+        else:
+            handle = random_gen.randrange(100)
+            if handle not in handles:
+                handles.append(handle)
+            registry.put(record=create_record(handle=handle, can_id=0x100 + step))
+        probe = random_gen.randrange(100)
+        assert registry.get_index(handle=probe) == (handles.index(probe) if probe in handles else None)
+    assert [registry.get_handle(index=index) for index in range(len(handles))] == handles
+    assert [registry.get_index(handle=handle) for handle in handles] == list(range(len(handles)))
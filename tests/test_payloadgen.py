@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of payload generators - counter, ramp and CRC8 values written to sent messages, bursts and queued messages.
+"""
+
+
+from typing import List
+
+import pytest
+
+from frametable import CompiledFrame, FrameTable
+from msgregistry import MsgRecord
+from payloadgen import PayloadEngine, crc8_table, parse_generators
+
+
+def create_frame(generators: str, handle: int = 1, payload: bytes = bytes(8)) -> CompiledFrame:
+    return CompiledFrame(record=MsgRecord(handle=handle, name='msg', can_id=0x100 + handle, payload=payload,
+                                          period_en=True, period=10, generators=generators))
+
+
+def crc8(data: bytes, poly: int = 0x1D, init: int = 0xFF, xor_out: int = 0xFF) -> int:
+    """ Bitwise reference of MSB-first CRC8 """
+    crc = init
+    for value in data:
+        crc ^= value
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc ^ xor_out
+
+
+def send_cycles(frame: CompiledFrame, cycles: int) -> List[bytes]:
+    engine, frame_table = PayloadEngine(), FrameTable(frames=[frame], version=1)
+    return [bytes(engine.generate(frame_table=frame_table, frames=[frame])[0].data) for _ in range(cycles)]
+
+
+def test_counter_wraps_from_max_to_min():
+    frame = create_frame(generators='counter(bit=4,len=4,min=2,max=5)', payload=b'\x0A' + bytes(7))
+    payloads = send_cycles(frame=frame, cycles=6)
+    assert [payload[0] >> 4 for payload in payloads] == [2, 3, 4, 5, 2, 3]
+    assert all(payload[0] & 0x0F == 0x0A and payload[1:] == bytes(7) for payload in payloads)
+
+
+def test_counter_spanning_bytes_with_step():
+    frame = create_frame(generators='counter(bit=4,len=12,step=0x100)')
+    payloads = send_cycles(frame=frame, cycles=3)
+    assert [int.from_bytes(payload[:2], 'little') >> 4 for payload in payloads] == [0x000, 0x100, 0x200]
+
+
+def test_ramp_goes_up_and_back_down():
+    frame = create_frame(generators='ramp(bit=8,len=8,min=10,max=20,step=5)')
+    assert [payload[1] for payload in send_cycles(frame=frame, cycles=7)] == [10, 15, 20, 15, 10, 15, 20]
+
+
+def test_seq_takes_values_in_turn():
+    frame = create_frame(generators='seq(bit=16,len=8,values=1|2|4)')
+    assert [payload[2] for payload in send_cycles(frame=frame, cycles=4)] == [1, 2, 4, 1]
+
+
+def test_crc8_covers_generated_fields():
+    frame = create_frame(generators='crc8(byte=7,first=0,last=6);counter(bit=0,len=8)', payload=bytes(range(8)))
+    for cycle, payload in enumerate(send_cycles(frame=frame, cycles=3)):
+        assert payload[0] == cycle
+        assert payload[7] == crc8(data=payload[:7])
+
+
+def test_crc8_table_matches_bitwise_crc():
+    table = crc8_table(poly=0x2F)
+    for value in (0x00, 0x01, 0x80, 0xA5, 0xFF):
+        assert table[value] == crc8(data=bytes([value]), poly=0x2F, init=0, xor_out=0)
+
+
+def test_burst_frames_carry_their_own_values():
+    frame = create_frame(generators='counter(bit=0,len=8);crc8(byte=7,first=0,last=6)')
+    engine, frame_table = PayloadEngine(), FrameTable(frames=[frame], version=1)
+    msgs = engine.generate(frame_table=frame_table, frames=(frame, ) * 4)
+    assert len({id(msg) for msg in msgs}) == 4
+    assert [msg.data[0] for msg in msgs] == [0, 1, 2, 3]
+    assert all(msg.data[7] == crc8(data=bytes(msg.data[:7])) for msg in msgs)
+    assert engine.generate(frame_table=frame_table, frames=[frame])[0].data[0] == 4
+
+
+def test_queued_message_is_not_modified_by_next_cycle():
+    frame = create_frame(generators='counter(bit=0,len=8)')
+    engine, frame_table = PayloadEngine(), FrameTable(frames=[frame], version=1)
+    queued = engine.generate(frame_table=frame_table, frames=[frame])[0]
+    engine.generate(frame_table=frame_table, frames=[frame])
+    assert queued.data[0] == 0
+    assert queued is not frame.msg and frame.msg.data == bytearray(8)
+
+
+def test_static_frames_share_compiled_message():
+    static_frame, dynamic_frame = create_frame(generators='', handle=1), create_frame(generators='counter()', handle=2)
+    engine = PayloadEngine()
+    msgs = engine.generate(frame_table=FrameTable(frames=[static_frame, dynamic_frame], version=1),
+                           frames=[static_frame, dynamic_frame, static_frame])
+    assert msgs[0] is static_frame.msg and msgs[2] is static_frame.msg and msgs[1] is not dynamic_frame.msg
+
+
+def test_state_kept_for_unchanged_frame_in_new_table():
+    frame = create_frame(generators='counter(bit=0,len=8)')
+    engine = PayloadEngine()
+    engine.generate(frame_table=FrameTable(frames=[frame], version=1), frames=[frame, frame])
+    other_frame = create_frame(generators='counter(bit=0,len=8)', handle=2)
+    frame_table = FrameTable(frames=[frame, other_frame], version=2)
+    msgs = engine.generate(frame_table=frame_table, frames=[frame, other_frame])
+    assert [msg.data[0] for msg in msgs] == [2, 0]
+
+
+@pytest.mark.parametrize('spec', ['counter(bit=60,len=8)', 'ramp(min=5,max=300)', 'crc8(byte=8)', 'foo()',
+                                  'counter(bit=x)', 'seq(len=2,values=1|7)'])
+def test_invalid_generators_are_rejected(spec):
+    with pytest.raises(ValueError):
+        parse_generators(spec=spec, payload_len=8)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of ProfileManager - live updates made before profile switch are written to database of their profile, also when
+saved by control server.
+"""
+
+
+import contextlib
+import io
+import json
+import socket
+
+import pytest
+
+from ctrlserver import ControlServer
+from dbman import DataBaseMan
+from profiles import ProfileManager
+
+
+@pytest.fixture
+def profile_man(tmp_path) -> ProfileManager:
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name in ('a', 'b'):
+            database_man = DataBaseMan(db_path=str(tmp_path / '{}.csv'.format(name)))
+            assert database_man.add_msg(name='msg', msg_id='0x100', payload='0x00')
+            database_man.flush()
+        return ProfileManager(profiles_d={name: str(tmp_path / '{}.csv'.format(name)) for name in ('a', 'b')})
+
+
+def read_payload(db_path: str) -> bytes:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return DataBaseMan(db_path=db_path).get_msg_by_id(can_id=0x100).payload
+
+
+def test_flush_writes_updates_of_inactive_profile(tmp_path, profile_man):
+    database_man = profile_man.get_active()
+    assert database_man.update_msgs_live(updates=[(database_man.get_handle(index=0), b'\x01', None, None)]) == [True]
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert profile_man.switch(name='b')
+    assert profile_man.flush() == 1
+    assert read_payload(db_path=str(tmp_path / 'a.csv')) == b'\x01'
+    assert read_payload(db_path=str(tmp_path / 'b.csv')) == b'\x00'
+
+
+def test_control_server_saves_profile_switched_away(tmp_path, profile_man):
+    unix_path = str(tmp_path / 'ctrl.sock')
+    server = ControlServer(get_database_man_h=profile_man.get_active, flush_h=profile_man.flush, unix_path=unix_path,
+                           flush_delay_s=None)
+    assert server.start()
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(unix_path)
+            stream = client.makefile('rwb')
+
+            def request(request_d: dict) -> dict:
+                stream.write(json.dumps(request_d).encode() + b'\n')
+                stream.flush()
+                return json.loads(stream.readline())
+
+            assert request({'cmd': 'update', 'msgs': [{'id': '0x100', 'payload': '0x02'}]})['applied'] == 1
+            with contextlib.redirect_stdout(io.StringIO()):
+                assert profile_man.switch(name='b')
+            assert request({'cmd': 'save'}) == {'ok': True, 'saved': 1}
+    finally:
+        server.stop()
+    assert read_payload(db_path=str(tmp_path / 'a.csv')) == b'\x02'
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of RxMonitor - statistics and response rules of standard and extended frames with the same id value are kept
+apart, and parsing of ids with extended suffix.
+"""
+
+
+import can
+import pytest
+
+from rxmonitor import RxMonitor, RxRule, parse_rx_filter, parse_rx_id
+
+
+def receive(monitor: RxMonitor, can_id: int, extended_id: bool, data: bytes = b'\x01', timestamp: float = 0.0) -> None:
+    monitor.on_message_received(can.Message(arbitration_id=can_id, is_extended_id=extended_id, data=data,
+                                            timestamp=timestamp))
+
+
+def test_standard_and_extended_ids_have_own_statistics():
+    monitor = RxMonitor(send_msg_h=lambda handle: None)
+    receive(monitor=monitor, can_id=0x100, extended_id=False, data=b'\x01', timestamp=1.0)
+    receive(monitor=monitor, can_id=0x100, extended_id=True, data=b'\x02', timestamp=1.005)
+    receive(monitor=monitor, can_id=0x100, extended_id=False, data=b'\x03', timestamp=1.01)
+    ids_stats = monitor.get_stats()['ids']
+    assert set(ids_stats) == {'0x100', '0x100x'}
+    assert ids_stats['0x100']['count'] == 2 and ids_stats['0x100']['payload'] == '0x03'
+    assert ids_stats['0x100']['min_interval_ms'] == pytest.approx(10)
+    assert ids_stats['0x100x']['count'] == 1 and ids_stats['0x100x']['payload'] == '0x02'
+
+
+def test_rules_answer_only_their_id_type():
+    sent_handles = []
+    monitor = RxMonitor(send_msg_h=sent_handles.append)
+    monitor.set_rules(rules=[RxRule(can_id=0x7DF, response_handle=1),
+                             RxRule(can_id=0x7DF, response_handle=2, data=b'\x02', extended_id=True)])
+    receive(monitor=monitor, can_id=0x7DF, extended_id=False)
+    receive(monitor=monitor, can_id=0x7DF, extended_id=True, data=b'\x01')
+    receive(monitor=monitor, can_id=0x7DF, extended_id=True, data=b'\x02\x00')
+    assert sent_handles == [1, 2]
+
+
+@pytest.mark.parametrize('rx_id, expected', [('0x100', (0x100, False)), ('0x100x', (0x100, True)),
+                                             ('0x100X', (0x100, True)), ('0x18DAF110', (0x18DAF110, True))])
+def test_parse_rx_id(rx_id, expected):
+    assert parse_rx_id(rx_id=rx_id) == expected
+
+
+@pytest.mark.parametrize('rx_id', ['0x', 'zz', '0x20000000'])
+def test_invalid_rx_id_is_rejected(rx_id):
+    with pytest.raises(ValueError):
+        parse_rx_id(rx_id=rx_id)
+
+
+def test_filter_of_extended_id():
+    assert parse_rx_filter(rx_filter='0x100x') == {'can_id': 0x100, 'can_mask': 0x1FFFFFFF, 'extended': True}
+    assert parse_rx_filter(rx_filter='0x700/0x700') == {'can_id': 0x700, 'can_mask': 0x700, 'extended': False}
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of DeadlineScheduler - phase retention on frames table change and overrun policies. Scheduler runs through its
+public interface on a fake monotonic clock, waits advance the clock instead of sleeping, so tests do not depend on
+timing of the machine.
+"""
+
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import pytest
+
+import scheduler as scheduler_module
+from frametable import CompiledFrame, FrameTable
+from msgregistry import MsgRecord
+from scheduler import DeadlineScheduler, OverrunPolicy
+
+
+class FakeClock:
+    """ Monotonic clock advanced by waits, every read takes a tick so spin loops end """
+
+    TICK_S = 0.00001
+
+    def __init__(self, now: float) -> None:
+        self.now = now
+        self.actions: List[Tuple[float, Callable[[], None]]] = []
+
+    def at(self, time_s: float, action: Callable[[], None]) -> None:
+        self.actions.append((time_s, action))
+        self.actions.sort(key=lambda time_action: time_action[0])
+
+    def run_next_action(self) -> None:
+        time_s, action = self.actions.pop(0)
+        self.now = max(self.now, time_s)
+        action()
+
+    def advance(self, time_s: float) -> None:
+        while self.actions and self.actions[0][0] <= time_s:
+            self.run_next_action()
+        self.now = max(self.now, time_s)
+
+    def monotonic(self) -> float:
+        now = self.now
+        self.advance(time_s=now + self.TICK_S)
+        return now
+
+
+class FakeEvent:
+    """ Event whose wait advances fake clock until it is set or timeout elapses """
+
+    def __init__(self, clock: FakeClock) -> None:
+        self.__clock = clock
+        self.__flag = False
+
+    def set(self) -> None:
+        self.__flag = True
+
+    def clear(self) -> None:
+        self.__flag = False
+
+    def is_set(self) -> bool:
+        return self.__flag
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        target = None if timeout is None else self.__clock.now + timeout
+        while not self.__flag and self.__clock.actions and (target is None or self.__clock.actions[0][0] <= target):
+            self.__clock.run_next_action()
+        if not self.__flag:
+            assert target is not None, 'scheduler waits with nothing to wake it up'
+            self.__clock.now = max(self.__clock.now, target)
+        return self.__flag
+
+
+def create_frame(handle: int, can_id: int, period: int = 100, extended_id: bool = False,
+                 payload: bytes = bytes(8)) -> CompiledFrame:
+    return CompiledFrame(record=MsgRecord(handle=handle, name='msg{}'.format(handle), can_id=can_id, payload=payload,
+                                          period_en=True, period=period, extended_id=extended_id))
+
+
+def run_scheduler(monkeypatch, frames: Sequence[CompiledFrame], until: float,
+                  updates: Sequence[Tuple[float, Sequence[CompiledFrame]]] = (),
+                  overrun_policy: OverrunPolicy = OverrunPolicy.SKIP,
+                  send_time_s: Optional[Dict[int, float]] = None) -> Tuple[List[Tuple[float, List[int]]], int]:
+    """ Runs scheduler from time 10.0 until given time, frames table is replaced at update times """
+    clock = FakeClock(now=10.0)
+    monkeypatch.setattr(scheduler_module, 'time', clock)
+    monkeypatch.setattr(scheduler_module, 'Event', lambda: FakeEvent(clock=clock))
+    frame_table = [FrameTable(frames=frames, version=0)]
+    sends = []
+
+    def send_frames(due_frames: List[CompiledFrame]) -> None:
+        sends.append((round(clock.now, 3), [frame.handle for frame in due_frames]))
+        """ Send of given order number takes given time, e.g. blocked bus """
+        clock.advance(time_s=clock.now + (send_time_s or {}).get(len(sends), 0))
+
+    def publish(update_frames: Sequence[CompiledFrame]) -> None:
+        frame_table[0] = FrameTable(frames=update_frames, version=frame_table[0].get_version() + 1)
+        scheduler.notify_update()
+
+    scheduler = DeadlineScheduler(get_frame_table_h=lambda: frame_table[0], send_frames_h=send_frames,
+                                  overrun_policy=overrun_policy)
+    for time_s, update_frames in updates:
+        clock.at(time_s=time_s, action=lambda update_frames=update_frames: publish(update_frames=update_frames))
+    clock.at(time_s=until, action=scheduler.stop)
+    scheduler.set_active(True)
+    scheduler.run()
+    return sends, scheduler.get_overrun_count()
+
+
+def get_send_times(sends: List[Tuple[float, List[int]]], handle: int) -> List[float]:
+    return [time_s for time_s, handles in sends for sent_handle in handles if sent_handle == handle]
+
+
+def test_new_message_is_due_immediately(monkeypatch):
+    sends, _ = run_scheduler(monkeypatch, frames=[create_frame(handle=1, can_id=0x100)], until=10.25)
+    assert sends == [(10.0, [1]), (10.1, [1]), (10.2, [1])]
+
+
+def test_messages_due_together_are_sent_in_one_batch(monkeypatch):
+    sends, _ = run_scheduler(monkeypatch, frames=[create_frame(handle=1, can_id=0x100),
+                                                  create_frame(handle=2, can_id=0x200, period=50)], until=10.12)
+    assert sorted(sends[0][1]) == [1, 2] and sends[0][0] == 10.0
+    assert get_send_times(sends=sends, handle=2) == [10.0, 10.05, 10.1]
+
+
+def test_phase_kept_for_same_handle(monkeypatch):
+    """ Payload change publishes new compiled frame with the same handle """
+    sends, _ = run_scheduler(monkeypatch, frames=[create_frame(handle=1, can_id=0x100)], until=10.35,
+                             updates=[(10.05, [create_frame(handle=1, can_id=0x100, payload=b'\x01' * 8)])])
+    assert get_send_times(sends=sends, handle=1) == [10.0, 10.1, 10.2, 10.3]
+
+
+def test_period_change_restarts_phase(monkeypatch):
+    sends, _ = run_scheduler(monkeypatch, frames=[create_frame(handle=1, can_id=0x100)], until=10.17,
+                             updates=[(10.05, [create_frame(handle=1, can_id=0x100, period=50)])])
+    assert get_send_times(sends=sends, handle=1) == [10.0, 10.05, 10.1, 10.15]
+
+
+def test_id_change_of_same_handle_restarts_phase(monkeypatch):
+    sends, _ = run_scheduler(monkeypatch, frames=[create_frame(handle=1, can_id=0x100)], until=10.22,
+                             updates=[(10.05, [create_frame(handle=1, can_id=0x101)])])
+    assert get_send_times(sends=sends, handle=1) == [10.0, 10.05, 10.15]
+
+
+def test_phase_kept_for_same_can_id_across_profile_switch(monkeypatch):
+    """ Other profile - handles differ, messages are matched by CAN id """
+    sends, _ = run_scheduler(monkeypatch, frames=[create_frame(handle=1, can_id=0x100)], until=10.25,
+                             updates=[(10.05, [create_frame(handle=8, can_id=0x100),
+                                               create_frame(handle=9, can_id=0x300)])])
+    assert get_send_times(sends=sends, handle=1) == [10.0]
+    assert get_send_times(sends=sends, handle=8) == [10.1, 10.2]
+    assert get_send_times(sends=sends, handle=9) == [10.05, 10.15]
+
+
+def test_profile_switch_does_not_match_handle_of_other_id(monkeypatch):
+    """ Handle 1 belongs to 0x200 in the other profile - phase of 0x200 is kept, not of handle 1 """
+    sends, _ = run_scheduler(monkeypatch, frames=[create_frame(handle=1, can_id=0x100),
+                                                  create_frame(handle=2, can_id=0x200, period=50)], until=10.22,
+                             updates=[(10.07, [create_frame(handle=1, can_id=0x200, period=50)])])
+    assert get_send_times(sends=sends, handle=1) == [10.0, 10.1, 10.15, 10.2]
+
+
+def test_profile_switch_does_not_match_standard_and_extended_id(monkeypatch):
+    sends, _ = run_scheduler(monkeypatch, frames=[create_frame(handle=1, can_id=0x100)], until=10.17,
+                             updates=[(10.05, [create_frame(handle=5, can_id=0x100, extended_id=True)])])
+    assert get_send_times(sends=sends, handle=5) == [10.05, 10.15]
+
+
+def test_paused_scheduler_sends_nothing_and_restarts_phase(monkeypatch):
+    clock = FakeClock(now=10.0)
+    monkeypatch.setattr(scheduler_module, 'time', clock)
+    monkeypatch.setattr(scheduler_module, 'Event', lambda: FakeEvent(clock=clock))
+    sends = []
+    frame_table = FrameTable(frames=[create_frame(handle=1, can_id=0x100)], version=0)
+    scheduler = DeadlineScheduler(get_frame_table_h=lambda: frame_table,
+                                  send_frames_h=lambda frames: sends.append(round(clock.now, 3)))
+    clock.at(time_s=10.15, action=lambda: scheduler.set_active(False))
+    clock.at(time_s=10.53, action=lambda: scheduler.set_active(True))
+    clock.at(time_s=10.7, action=scheduler.stop)
+    scheduler.set_active(True)
+    scheduler.run()
+    assert sends == [10.0, 10.1, 10.53, 10.63]
+
+
+def test_deadline_in_time_has_no_overrun(monkeypatch):
+    for overrun_policy in OverrunPolicy:
+        sends, overrun_cnt = run_scheduler(monkeypatch, frames=[create_frame(handle=1, can_id=0x100)], until=10.25,
+                                           overrun_policy=overrun_policy, send_time_s={1: 0.02})
+        assert get_send_times(sends=sends, handle=1) == [10.0, 10.1, 10.2]
+        assert overrun_cnt == 0
+
+
+def test_skip_drops_missed_cycles_and_keeps_grid(monkeypatch):
+    sends, overrun_cnt = run_scheduler(monkeypatch, frames=[create_frame(handle=1, can_id=0x100)], until=10.55,
+                                       overrun_policy=OverrunPolicy.SKIP, send_time_s={1: 0.35})
+    assert sends == [(10.0, [1]), (10.35, [1]), (10.4, [1]), (10.5, [1])]
+    assert overrun_cnt == 1
+
+
+def test_catch_up_sends_missed_cycles_back_to_back(monkeypatch):
+    sends, overrun_cnt = run_scheduler(monkeypatch, frames=[create_frame(handle=1, can_id=0x100)], until=10.45,
+                                       overrun_policy=OverrunPolicy.CATCH_UP, send_time_s={1: 0.35})
+    """ Deadlines 10.1, 10.2 and 10.3 are sent at once, the next one is back on the grid """
+    assert sends == [(10.0, [1]), (10.35, [1, 1, 1]), (10.4, [1])]
+    assert overrun_cnt == 2
+
+
+def test_catch_up_skips_when_too_many_cycles_missed(monkeypatch):
+    sends, overrun_cnt = run_scheduler(monkeypatch, frames=[create_frame(handle=1, can_id=0x100)], until=12.15,
+                                       overrun_policy=OverrunPolicy.CATCH_UP, send_time_s={1: 2.05})
+    assert sends == [(10.0, [1]), (12.05, [1]), (12.1, [1])]
+    assert overrun_cnt == 1
+
+
+@pytest.mark.parametrize('period, expected_period_s', [(0, 0.001), (20000, 10.0)])
+def test_period_clamped_to_supported_range(monkeypatch, period, expected_period_s):
+    sends, _ = run_scheduler(monkeypatch, frames=[create_frame(handle=1, can_id=0x100, period=period)],
+                             until=10.0 + 2.5 * expected_period_s)
+    assert get_send_times(sends=sends, handle=1) == [10.0, round(10.0 + expected_period_s, 3),
+                                                     round(10.0 + 2 * expected_period_s, 3)]
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Tests of storage backends - csv storage collects changes into a single file write, both backends keep keys and order.
+"""
+
+
+import contextlib
+import io
+import time
+
+import pytest
+
+from storage import CsvMsgStorage, SqliteMsgStorage, read_csv_records
+
+
+def create_record(name: str, payload: str = '0x00') -> tuple:
+    return name, '0x100', payload, False, 100, 0, False, False, False, ''
+
+
+def open_csv(path: str, write_delay_s=10.0) -> CsvMsgStorage:
+    with contextlib.redirect_stdout(io.StringIO()):
+        storage = CsvMsgStorage(path=path, write_delay_s=write_delay_s)
+    storage.load()
+    return storage
+
+
+def test_csv_changes_are_written_on_flush(tmp_path):
+    path = str(tmp_path / 'db.csv')
+    storage = open_csv(path=path)
+    keys = [storage.insert(record=create_record(name='msg{}'.format(i))) for i in range(3)]
+    storage.update(key=keys[0], record=create_record(name='msg0', payload='0x01'))
+    storage.delete(key=keys[1])
+    assert read_csv_records(path=path) == []
+    storage.flush()
+    assert read_csv_records(path=path) == [create_record(name='msg0', payload='0x01'), create_record(name='msg2')]
+    storage.close()
+
+
+def test_csv_changes_are_written_after_delay(tmp_path):
+    path = str(tmp_path / 'db.csv')
+    storage = open_csv(path=path, write_delay_s=0.05)
+    storage.insert_many(records=[create_record(name='a'), create_record(name='b')])
+    storage.update_many(records_d={0: create_record(name='a', payload='0x02')})
+    deadline = time.monotonic() + 5
+    while not read_csv_records(path=path) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert read_csv_records(path=path) == [create_record(name='a', payload='0x02'), create_record(name='b')]
+    storage.close()
+
+
+def test_csv_written_on_every_change_without_delay(tmp_path):
+    path = str(tmp_path / 'db.csv')
+    storage = open_csv(path=path, write_delay_s=None)
+    storage.insert(record=create_record(name='a'))
+    assert read_csv_records(path=path) == [create_record(name='a')]
+
+
+@pytest.mark.parametrize('db_name', ['db.csv', 'db.sqlite'])
+def test_keys_and_order_survive_reopen(tmp_path, db_name):
+    path = str(tmp_path / db_name)
+    storage = open_csv(path=path) if db_name.endswith('.csv') else SqliteMsgStorage(path=path)
+    keys = storage.insert_many(records=[create_record(name='a'), create_record(name='b')])
+    key = storage.insert(record=create_record(name='c'))
+    storage.delete(key=keys[0])
+    storage.close()
+    storage = open_csv(path=path) if db_name.endswith('.csv') else SqliteMsgStorage(path=path)
+    assert [record[0] for _, record in storage.load()] == ['b', 'c']
+    assert key not in keys
+    storage.close()
@@ -0,0 +1,534 @@
+# -*- coding: utf-8 -*-
+"""
+This module includes definition of class TxChannel responsible for transmission on a single bus. Every channel owns
+its bus, TX scheduler worker, TX pipeline and statistics, so several networks are served in parallel and a slow
+bus does not delay frames of the others.
+"""
+
+
+from enum import Enum
+from threading import Thread
+from typing import Any, Callable, Collection, Dict, List, Optional, Sequence, Tuple
+import can
+
+from busload import BusLoadStress, create_stress
+from cyclictx import CyclicTxManager
+from frametable import CompiledFrame, FrameTable
+from payloadgen import PayloadEngine
+from recorder import TrafficRecorder
+from replay import TraceReplay
+from rxmonitor import RxFilter, RxMonitor
+from scheduler import DeadlineScheduler
+from telemetry import TxTelemetry
+from txpipeline import TxPipeline
+from txprocess import TxProcess
+
+
+class TxMode(Enum):
+    SCHEDULER = 0,
+    CYCLIC_TASKS = 1,
+    TX_PROCESS = 2
+
+
+class TxChannel:
+    """ Class for transmission of messages assigned to a single bus """
+
+    def __init__(self, channel: int, tx_mode: TxMode, bus_kwargs: Dict[str, Any],
+                 get_frame_table_h: Callable[[], FrameTable]) -> None:
+        """
+        Setups bus and periodic transmission
+        Params:                                                                     type:
+        @param channel: Index of the bus in messages database                       int
+        @param tx_mode: Periodic transmission by scheduler, cyclic tasks or process TxMode
+        @param bus_kwargs: Arguments of python-can bus                              Dict[str, Any]
+        @param get_frame_table_h: Function returning compiled frames table          Callable
+        @return: None
+        """
+
+        self.__channel = channel
+        self.__tx_mode = tx_mode
+        self.__bus_kwargs = bus_kwargs
+        self.__get_frame_table_h = get_frame_table_h
+        self.__sim_active = False
+        if tx_mode == TxMode.TX_PROCESS:
+            """ Bus is owned by TX process """
+            self.__bus = None
+            self.__tx_process = TxProcess(bus_kwargs=bus_kwargs)
+            self.__tx_process.publish(frame_table=self.__get_channel_table())
+        else:
+            self.__bus = self.__config_bus_interface(bus_kwargs=bus_kwargs)
+            self.__tx_process = None
+        self.__payload_engine = PayloadEngine()
+        self.__telemetry = TxTelemetry()
+        self.__tx_pipeline = TxPipeline(bus=self.__bus, telemetry=self.__telemetry)
+        self.__scheduler = DeadlineScheduler(get_frame_table_h=self.__get_channel_table,
+                                             send_frames_h=self.__send_msgs_periodic)
+        self.__telemetry.add_counter(name='scheduler_overruns', provider=self.__scheduler.get_overrun_count)
+        self.__telemetry.add_counter(name='tx_queue_depth', provider=self.__tx_pipeline.get_queue_depth)
+        self.__telemetry.add_counter(name='tx_queue_depth_max', provider=self.__tx_pipeline.get_max_queue_depth)
+        self.__telemetry.add_counter(name='tx_errors', provider=self.__tx_pipeline.get_error_counters)
+        self.__update_expected_periods()
+        self.__cyclic_tx_man = CyclicTxManager(bus=self.__bus)
+        self.__replay = None
+        self.__stress: Optional[BusLoadStress] = None
+        self.__notifier = None
+        self.__recorder = None
+        self.__rx_monitor: Optional[RxMonitor] = None
+
+    @staticmethod
+    def __config_bus_interface(bus_kwargs: Dict[str, Any]) -> can.interface.Bus:
+        """
+        Performs bus configuration
+        Params:                                                                     type:
+        @param bus_kwargs: Arguments of python-can bus                              Dict[str, Any]
+        @return: Configured bus object                                              can.interface.Bus
+        """
+        try:
+            return can.interface.Bus(**bus_kwargs)
+
+        except ImportError:
+            print('Could not import Vector hardware configuration!')
+
+    def __get_channel_table(self) -> FrameTable:
+        """
+        Provides current snapshot of messages sent on this bus
+        Params:                                                                     type:
+        @return: Compiled frames table                                              FrameTable
+        """
+
+        return self.__get_frame_table_h().get_channel_table(channel=self.__channel)
+
+    def __update_expected_periods(self) -> None:
+        """
+        Provides configured periods of periodic messages to telemetry
+        Params:                                                                     type:
+        @return: None
+        """
+
+        self.__telemetry.set_expected_periods({frame.msg.arbitration_id: frame.period for frame in
+                                               self.__get_channel_table().get_periodic_frames()})
+
+    def __sync_cyclic_tasks(self) -> None:
+        """
+        Updates bus cyclic tasks according to simulation state and database
+        Params:                                                                     type:
+        @return: None
+        """
+
+        if self.__sim_active:
+            self.__cyclic_tx_man.sync(frame_table=self.__get_channel_table(),
+                                      period_min_ms=DeadlineScheduler.PERIOD_MIN_MS,
+                                      period_max_ms=DeadlineScheduler.PERIOD_MAX_MS)
+        else:
+            self.__cyclic_tx_man.stop_all()
+
+    def __send_msgs_periodic(self, frames: List[CompiledFrame]) -> None:
+        """
+        Sends periodic messages which reached their deadline
+        Params:                                                                     type:
+        @param frames: Compiled CAN frames due to be sent                           List[CompiledFrame]
+        @return: None
+        """
+
+        if self.__sim_active:
+            self.__tx_pipeline.submit(self.__payload_engine.generate(frame_table=self.__get_channel_table(),
+                                                                     frames=frames))
+        else:
+            """ Simulation is not active, do nothing """
+            pass
+
+    """ ============================================= Class interface ============================================= """
+
+    def on_db_update(self) -> None:
+        """
+        Propagates database changes to periodic transmission
+        Params:                                                                     type:
+        @return: None
+        """
+
+        if self.__tx_mode == TxMode.CYCLIC_TASKS:
+            self.__sync_cyclic_tasks()
+        elif self.__tx_mode == TxMode.TX_PROCESS:
+            self.__tx_process.publish(frame_table=self.__get_channel_table())
+        else:
+            self.__scheduler.notify_update()
+        self.__update_expected_periods()
+
+    def on_payload_update(self, frames: List[CompiledFrame]) -> None:
+        """
+        Propagates live payload updates, scheduler sends payload of compiled frame so it needs no update
+        Params:                                                                     type:
+        @param frames: Frames with replaced payloads                                List[CompiledFrame]
+        @return: None
+        """
+
+        frames = [frame for frame in frames if frame.channel == self.__channel]
+        if not frames:
+            return
+        if self.__tx_mode == TxMode.CYCLIC_TASKS:
+            if self.__sim_active:
+                self.__cyclic_tx_man.update_payloads(frames=frames)
+        elif self.__tx_mode == TxMode.TX_PROCESS:
+            self.__tx_process.update_payloads(frames=frames)
+
+    def set_active(self, active: bool) -> None:
+        """
+        Enables or disables transmission
+        Params:                                                                     type:
+        @param active: Simulation enable                                            bool
+        @return: None
+        """
+
+        self.__sim_active = active
+        if not active:
+            self.stop_replay()
+            self.stop_stress()
+        if self.__tx_mode == TxMode.CYCLIC_TASKS:
+            self.__sync_cyclic_tasks()
+        elif self.__tx_mode == TxMode.TX_PROCESS:
+            self.__tx_process.set_active(active=active)
+        else:
+            self.__scheduler.set_active(active=active)
+
+    def send(self, frame: CompiledFrame, count: int = 1) -> None:
+        """
+        Sends message once or as a burst of frames queued back-to-back
+        Params:                                                                     type:
+        @param frame: Compiled CAN frame                                            CompiledFrame
+        @param count: Number of frames                                              int
+        @return: None
+        """
+
+        if self.__sim_active:
+            if self.__tx_process is not None:
+                self.__tx_process.send(handle=frame.handle, count=count)
+            else:
+                self.__tx_pipeline.submit(self.__payload_engine.generate(frame_table=self.__get_channel_table(),
+                                                                         frames=(frame, ) * count))
+        else:
+            """ Simulation is not active, do nothing """
+            pass
+
+    def start_replay(self, path: str, speed: float = 1.0, id_filter: Optional[Collection[int]] = None,
+                     id_map: Optional[Dict[int, int]] = None, log_channels: Optional[Collection] = None,
+                     loop: bool = False) -> bool:
+        """
+        Starts replay of log file on this bus, replay in progress is stopped
+        Params:                                                                     type:
+        @param path: Path to log file (ASC, BLF, CSV, ...)                          str
+        @param speed: Timing scale, TraceReplay.MAX_SPEED sends without waiting     float
+        @param id_filter: CAN ids to be sent, None to send all                      Optional[Collection[int]]
+        @param id_map: CAN ids to be replaced, original id: sent id                 Optional[Dict[int, int]]
+        @param log_channels: Channels of log to be sent, None to send all           Optional[Collection]
+        @param loop: Start again from beginning when end of log is reached          bool
+        @return: Information if replay was started                                  bool
+        """
+
+        if not self.__sim_active:
+            print('Replay not started - simulation is not active')
+            return False
+
+        self.stop_replay()
+        replay_kwargs = dict(path=path, speed=speed, id_filter=id_filter, id_map=id_map, log_channels=log_channels,
+                             loop=loop)
+        if self.__tx_process is not None:
+            self.__tx_process.start_replay(replay_kwargs=replay_kwargs)
+        else:
+            self.__replay = TraceReplay(tx_pipeline=self.__tx_pipeline, **replay_kwargs)
+            self.__replay.start()
+        return True
+
+    def stop_replay(self) -> None:
+        """
+        Stops replay of log file
+        Params:                                                                     type:
+        @return: None
+        """
+
+        if self.__tx_process is not None:
+            self.__tx_process.stop_replay()
+        elif self.__replay is not None:
+            self.__replay.stop()
+            self.__replay = None
+
+    def is_replay_running(self) -> bool:
+        """
+        Provides replay state
+        Params:                                                                     type:
+        @return: Information if log is being replayed on this bus                   bool
+        """
+
+        if self.__tx_process is not None:
+            return self.__tx_process.is_replay_running()
+        else:
+            return self.__replay is not None and self.__replay.is_running()
+
+    def start_stress(self, target_load: float, id_range: Optional[Tuple[int, int]] = None, length: int = 8,
+                     fd: bool = False, brs: bool = False) -> bool:
+        """
+        Starts sending frames at requested bus load, stress in progress is stopped
+        Params:                                                                     type:
+        @param target_load: Requested bus load 0.0-1.0, BusLoadStress.SATURATE
+                            keeps TX queue full                                     float
+        @param id_range: First and last CAN id, None to send database messages      Optional[Tuple[int, int]]
+        @param length: Payload length of generated frames                           int
+        @param fd: Generated frames are CAN FD                                      bool
+        @param brs: Generated frames use CAN FD bit rate switch                     bool
+        @return: Information if stress was started                                  bool
+        """
+
+        if not self.__sim_active:
+            print('Stress not started - simulation is not active')
+            return False
+
+        self.stop_stress()
+        stress_kwargs = dict(target_load=target_load, id_range=id_range, length=length, fd=fd, brs=brs)
+        if self.__tx_process is not None:
+            self.__tx_process.start_stress(stress_kwargs=stress_kwargs)
+            return True
+        self.__stress = create_stress(frame_table=self.__get_channel_table(), tx_pipeline=self.__tx_pipeline,
+                                      bus_kwargs=self.__bus_kwargs, **stress_kwargs)
+        if self.__stress is None or not self.__stress.start():
+            self.__stress = None
+            return False
+        return True
+
+    def stop_stress(self) -> None:
+        """
+        Stops bus load stress
+        Params:                                                                     type:
+        @return: None
+        """
+
+        if self.__tx_process is not None:
+            self.__tx_process.stop_stress()
+        elif self.__stress is not None:
+            self.__stress.stop()
+            self.__stress = None
+
+    def get_stress_stats(self) -> Dict[str, Any]:
+        """
+        Provides requested and achieved bus load
+        Params:                                                                     type:
+        @return: Loads in percent and frames per second, empty if not running       Dict[str, Any]
+        """
+
+        if self.__tx_process is not None:
+            return self.__tx_process.get_stress_stats()
+        else:
+            return self.__stress.get_stats() if self.__stress is not None else {}
+
+    def add_rx_listener(self, listener: can.Listener) -> bool:
+        """
+        Registers listener of received frames, bus notifier is started with the first listener
+        Params:                                                                     type:
+        @param listener: Listener called from notifier thread                       can.Listener
+        @return: Information if listener was registered                             bool
+        """
+
+        if self.__bus is None:
+            """ Bus not available in this process """
+            return False
+        if self.__notifier is None:
+            self.__notifier = can.Notifier(self.__bus, [listener], timeout=0.1)
+        else:
+            self.__notifier.add_listener(listener)
+        return True
+
+    def remove_rx_listener(self, listener: can.Listener) -> None:
+        """
+        Unregisters listener of received frames
+        Params:                                                                     type:
+        @param listener: Listener registered with add_rx_listener                   can.Listener
+        @return: None
+        """
+
+        if self.__notifier is not None and listener in self.__notifier.listeners:
+            self.__notifier.remove_listener(listener)
+
+    def start_rx_monitor(self, send_msg_h: Callable[[int], None], filters: Optional[Sequence[RxFilter]] = None,
+                         bus_filters: Optional[Sequence[RxFilter]] = None) -> bool:
+        """
+        Starts statistics of received frames, monitor in progress is stopped
+        Params:                                                                     type:
+        @param send_msg_h: Function sending database message by handle, used by
+                           request/response rules                                   Callable
+        @param filters: Monitor acceptance filters, None to monitor all frames     Optional[Sequence[RxFilter]]
+        @param bus_filters: Driver/hardware acceptance filters of the bus, they
+                            apply also to recording, None to receive all frames     Optional[Sequence[RxFilter]]
+        @return: Information if monitor was started                                 bool
+        """
+
+        if self.__bus is None:
+            print('RX monitor not started - bus not available in this process')
+            return False
+
+        self.stop_rx_monitor()
+        self.__bus.set_filters(bus_filters or None)
+        self.__rx_monitor = RxMonitor(send_msg_h=send_msg_h, filters=filters)
+        return self.add_rx_listener(listener=self.__rx_monitor)
+
+    def stop_rx_monitor(self) -> None:
+        """
+        Stops statistics of received frames and request/response rules, bus filters are removed
+        Params:                                                                     type:
+        @return: None
+        """
+
+        if self.__rx_monitor is not None:
+            self.remove_rx_listener(listener=self.__rx_monitor)
+            self.__bus.set_filters(None)
+            self.__rx_monitor = None
+
+    def get_rx_monitor(self) -> Optional[RxMonitor]:
+        """
+        Provides monitor of received frames
+        Params:                                                                     type:
+        @return: RX monitor, None if not started                                    Optional[RxMonitor]
+        """
+
+        return self.__rx_monitor
+
+    def start_recording(self, path: str, rx: bool = True, rotate_bytes: Optional[int] = None,
+                        rotate_s: Optional[float] = None) -> None:
+        """
+        Starts recording of frames sent and received on this bus, recording in progress is stopped
+        Params:                                                                     type:
+        @param path: Path to log file (.blf, .asc)                                  str
+        @param rx: Record also received frames                                      bool
+        @param rotate_bytes: Start new file when log reaches size, None to disable  Optional[int]
+        @param rotate_s: Start new file after time in seconds, None to disable      Optional[float]
+        @return: None
+        """
+
+        self.stop_recording()
+        if self.__tx_process is not None:
+            self.__tx_process.start_recording(record_kwargs=dict(path=path, channel=self.__channel, rx=rx,
+                                                                 rotate_bytes=rotate_bytes, rotate_s=rotate_s))
+        else:
+            self.__recorder = TrafficRecorder(path=path, channel=self.__channel, rotate_bytes=rotate_bytes,
+                                              rotate_s=rotate_s)
+            self.__recorder.start()
+            self.__tx_pipeline.add_tx_listener(self.__recorder.record_tx)
+            if rx:
+                self.add_rx_listener(listener=self.__recorder)
+
+    def stop_recording(self) -> None:
+        """
+        Stops recording, buffered frames are written to log file
+        Params:                                                                     type:
+        @return: None
+        """
+
+        if self.__tx_process is not None:
+            self.__tx_process.stop_recording()
+        elif self.__recorder is not None:
+            self.__tx_pipeline.remove_tx_listener(self.__recorder.record_tx)
+            self.remove_rx_listener(listener=self.__recorder)
+            self.__recorder.stop()
+            self.__recorder = None
+
+    def get_recording_stats(self) -> Dict[str, Any]:
+        """
+        Provides recording statistics
+        Params:                                                                     type:
+        @return: Recorded and dropped frames, empty if not recording                Dict[str, Any]
+        """
+
+        if self.__tx_process is not None:
+            return self.__tx_process.get_recording_stats()
+        else:
+            return self.__recorder.get_stats() if self.__recorder is not None else {}
+
+    def get_channel(self) -> int:
+        """
+        Provides index of the bus in messages database
+        Params:                                                                     type:
+        @return: Channel index                                                      int
+        """
+
+        return self.__channel
+
+    def get_telemetry(self) -> TxTelemetry:
+        """
+        Provides statistics of sent frames, not used when transmission runs in TX process
+        Params:                                                                     type:
+        @return: TX telemetry                                                       TxTelemetry
+        """
+
+        return self.__telemetry
+
+    def get_tx_pipeline(self) -> TxPipeline:
+        """
+        Provides TX pipeline
+        Params:                                                                     type:
+        @return: TX pipeline                                                        TxPipeline
+        """
+
+        return self.__tx_pipeline
+
+    def get_tx_process(self) -> Optional[TxProcess]:
+        """
+        Provides TX process controller
+        Params:                                                                     type:
+        @return: TX process, None if transmission runs in this process              Optional[TxProcess]
+        """
+
+        return self.__tx_process
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Provides TX statistics of the bus
+        Params:                                                                     type:
+        @return: Statistics                                                         Dict[str, Any]
+        """
+
+        return self.__tx_process.get_stats() if self.__tx_process is not None else self.__telemetry.get_stats()
+
+    def format_stats(self) -> str:
+        """
+        Provides TX statistics of the bus as human readable text
+        Params:                                                                     type:
+        @return: Statistics summary                                                 str
+        """
+
+        if self.__tx_process is not None:
+            return self.__tx_process.format_stats()
+        elif self.__stress is not None:
+            return '{}\nStress: {}'.format(self.__telemetry.format_stats(), self.__stress.format_stats())
+        else:
+            return self.__telemetry.format_stats()
+
+    def start(self, daemon: bool) -> None:
+        """
+        Starts TX pipeline and scheduler worker
+        Params:                                                                     type:
+        @param daemon: Scheduler worker does not keep application alive             bool
+        @return: None
+        """
+
+        if self.__tx_process is not None:
+            self.__tx_process.start()
+        else:
+            self.__tx_pipeline.start()
+            Thread(target=self.__scheduler.run, name='canvector-sched-{}'.format(self.__channel),
+                   daemon=daemon).start()
+
+    def stop(self) -> None:
+        """
+        Stops periodic transmission, TX pipeline and releases bus
+        Params:                                                                     type:
+        @return: None
+        """
+
+        self.set_active(active=False)
+        self.stop_recording()
+        self.stop_rx_monitor()
+        if self.__notifier is not None:
+            self.__notifier.stop()
+        if self.__tx_process is not None:
+            self.__tx_process.stop()
+        self.__scheduler.stop()
+        self.__tx_pipeline.stop()
+        if self.__bus is not None:
+            self.__bus.shutdown()
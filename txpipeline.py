@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+This module includes definition of class TxPipeline responsible for sending CAN frames. Frames are submitted in
+batches to a bounded queue and sent back-to-back by a single sender thread which owns the bus.
+"""
+
+
+import logging
+import time
+from collections import Counter, OrderedDict, deque
+from enum import Enum
+from threading import Condition, Thread
+from typing import Callable, Dict, Iterable, Optional
+import can
+
+from telemetry import TxTelemetry
+
+
+logger = logging.getLogger(__name__)
+
+
+class BackpressurePolicy(Enum):
+    BLOCK = 0,
+    DROP_OLDEST = 1,
+    COALESCE = 2
+
+
+class TxError(Enum):
+    CAN_ERROR = 'can_error'
+    BUS_UNAVAILABLE = 'bus_unavailable'
+    QUEUE_FULL_DROPPED = 'queue_full_dropped'
+    QUEUE_FULL_TIMEOUT = 'queue_full_timeout'
+    COALESCED = 'coalesced'
+
+
+class TxPipeline:
+    """ Class for queueing and sending CAN frames """
+
+    def __init__(self, bus: Optional[can.BusABC], capacity: int = 16384,
+                 policy: BackpressurePolicy = BackpressurePolicy.DROP_OLDEST,
+                 telemetry: Optional[TxTelemetry] = None) -> None:
+        """
+        Setups bus and queue
+        Params:                                                                     type:
+        @param bus: Configured bus object, None if bus not available                can.BusABC
+        @param capacity: Maximal number of frames waiting in queue                  int
+        @param policy: Handling of frames submitted to full queue                   BackpressurePolicy
+        @param telemetry: Statistics of sent frames                                 Optional[TxTelemetry]
+        @return: None
+        """
+
+        self.__bus = bus
+        self.__telemetry = telemetry
+        self.__max_queue_depth = 0
+        self.__capacity = capacity
+        self.__policy = policy
+        self.__queue = OrderedDict() if policy == BackpressurePolicy.COALESCE else deque()
+        self.__queue_cond = Condition()
+        self.__errors_cnt = Counter()
+        self.__sent_cnt = 0
+        self.__tx_listeners = ()
+        self.__sender_thread = None
+        self.__stopped = False
+
+    def __put(self, msg: can.Message, timeout: Optional[float]) -> bool:
+        """
+        Puts single frame to queue, must be called with queue condition acquired
+        Params:                                                                     type:
+        @param msg: Frame to be sent                                                can.Message
+        @param timeout: Maximal time to wait for space in BLOCK policy              Optional[float]
+        @return: Information if frame was queued                                    bool
+        """
+
+        if self.__policy == BackpressurePolicy.COALESCE:
+            key = (msg.arbitration_id, msg.is_extended_id)
+            if key in self.__queue:
+                """ Frame with the same id still waiting - replace its data keeping position in queue """
+                self.__queue[key] = msg
+                self.__errors_cnt[TxError.COALESCED.value] += 1
+                return True
+            elif len(self.__queue) >= self.__capacity:
+                self.__queue.popitem(last=False)
+                self.__errors_cnt[TxError.QUEUE_FULL_DROPPED.value] += 1
+            self.__queue[key] = msg
+            return True
+
+        if len(self.__queue) >= self.__capacity:
+            if self.__policy == BackpressurePolicy.BLOCK:
+                if not self.__queue_cond.wait_for(lambda: len(self.__queue) < self.__capacity or self.__stopped,
+                                                  timeout=timeout) or self.__stopped:
+                    self.__errors_cnt[TxError.QUEUE_FULL_TIMEOUT.value] += 1
+                    return False
+            else:
+                self.__queue.popleft()
+                self.__errors_cnt[TxError.QUEUE_FULL_DROPPED.value] += 1
+        self.__queue.append(msg)
+        return True
+
+    def __take_batch(self) -> list:
+        """
+        Waits for frames and takes all of them from queue
+        Params:                                                                     type:
+        @return: Frames to be sent, empty if pipeline stopped                       list
+        """
+
+        with self.__queue_cond:
+            self.__queue_cond.wait_for(lambda: self.__queue or self.__stopped)
+            batch = list(self.__queue.values()) if isinstance(self.__queue, OrderedDict) else list(self.__queue)
+            self.__queue.clear()
+            self.__queue_cond.notify_all()
+        return batch
+
+    def __sender(self) -> None:
+        """
+        Sender thread loop, sends queued frames back-to-back
+        Params:                                                                     type:
+        @return: None
+        """
+
+        debug_log = logger.isEnabledFor(logging.DEBUG)
+        while not self.__stopped:
+            for msg in self.__take_batch():
+                try:
+                    self.__bus.send(msg)
+                    self.__sent_cnt += 1
+                    if self.__telemetry is not None:
+                        self.__telemetry.record_tx(can_id=msg.arbitration_id, timestamp=time.monotonic())
+                    for listener in self.__tx_listeners:
+                        listener(msg)
+                    if debug_log:
+                        logger.debug('Message sent: [%s] %s', hex(msg.arbitration_id), msg.data.hex(' '))
+                except can.CanError as e:
+                    self.__errors_cnt[TxError.CAN_ERROR.value] += 1
+                    logger.debug('Message not sent: [%s] %s', hex(msg.arbitration_id), e)
+                except AttributeError:
+                    self.__errors_cnt[TxError.BUS_UNAVAILABLE.value] += 1
+
+    """ ============================================= Class interface ============================================= """
+
+    def submit(self, msgs: Iterable[can.Message], timeout: Optional[float] = None) -> int:
+        """
+        Queues batch of frames to be sent
+        Params:                                                                     type:
+        @param msgs: Frames to be sent                                              Iterable[can.Message]
+        @param timeout: Maximal time to wait for space in BLOCK policy              Optional[float]
+        @return: Number of frames queued                                            int
+        """
+
+        queued_num = 0
+        with self.__queue_cond:
+            for msg in msgs:
+                queued_num += self.__put(msg=msg, timeout=timeout)
+            self.__max_queue_depth = max(self.__max_queue_depth, len(self.__queue))
+            self.__queue_cond.notify_all()
+        return queued_num
+
+    def start(self) -> None:
+        """
+        Starts sender thread
+        Params:                                                                     type:
+        @return: None
+        """
+
+        self.__stopped = False
+        self.__sender_thread = Thread(target=self.__sender, daemon=True)
+        self.__sender_thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops sender thread, frames still waiting in queue are discarded
+        Params:                                                                     type:
+        @return: None
+        """
+
+        with self.__queue_cond:
+            self.__stopped = True
+            self.__queue.clear()
+            self.__queue_cond.notify_all()
+        if self.__sender_thread is not None:
+            self.__sender_thread.join()
+
+    def add_tx_listener(self, listener: Callable[[can.Message], None]) -> None:
+        """
+        Registers function called by sender thread after every sent frame, it must not block
+        Params:                                                                     type:
+        @param listener: Function called with sent frame                            Callable
+        @return: None
+        """
+
+        self.__tx_listeners = self.__tx_listeners + (listener, )
+
+    def remove_tx_listener(self, listener: Callable[[can.Message], None]) -> None:
+        """
+        Unregisters function called after every sent frame
+        Params:                                                                     type:
+        @param listener: Function registered with add_tx_listener                   Callable
+        @return: None
+        """
+
+        self.__tx_listeners = tuple(tx_listener for tx_listener in self.__tx_listeners if tx_listener != listener)
+
+    def get_queue_depth(self) -> int:
+        """
+        Provides number of frames waiting in queue
+        Params:                                                                     type:
+        @return: Queue depth                                                        int
+        """
+
+        return len(self.__queue)
+
+    def get_max_queue_depth(self) -> int:
+        """
+        Provides the highest number of frames waiting in queue since start
+        Params:                                                                     type:
+        @return: Maximal queue depth                                                int
+        """
+
+        return self.__max_queue_depth
+
+    def get_sent_count(self) -> int:
+        """
+        Provides number of frames sent successfully
+        Params:                                                                     type:
+        @return: Number of sent frames                                              int
+        """
+
+        return self.__sent_cnt
+
+    def get_error_counters(self) -> Dict[str, int]:
+        """
+        Provides number of errors per reason
+        Params:                                                                     type:
+        @return: Errors count by reason                                             Dict[str, int]
+        """
+
+        return dict(self.__errors_cnt)
@@ -0,0 +1,595 @@
+# -*- coding: utf-8 -*-
+"""
+This module includes definition of class TxProcess running TX scheduler, TX pipeline and bus in a separate process,
+so periodic frames are isolated from GIL contention of the user interface.
+
+Compiled frames table is kept in shared memory block written in place by the main process. Block starts with header
+(sequence number, frames number) followed by fixed size frame slots. Writer makes the sequence number odd while
+slots are modified, reader in TX process copies slots only when the sequence number changed and retries if it
+was modified during the copy. Commands (simulation enable, triggered send, replay, recording, stress, statistics)
+are sent over a pipe, payload generators do not fit in fixed size slots and are sent with update command when they
+change.
+"""
+
+
+import logging
+import multiprocessing
+import struct
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from threading import Lock, Thread
+from typing import Any, Dict, List, Optional, Tuple
+import can
+
+from busload import create_stress
+from frametable import CompiledFrame, FrameTable
+from msgregistry import MsgRecord
+from payloadgen import GeneratorRule, PayloadEngine
+from recorder import TrafficRecorder
+from replay import TraceReplay
+from scheduler import DeadlineScheduler
+from telemetry import TxTelemetry
+from txpipeline import TxPipeline
+
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct('<QI')
+""" handle, CAN id, flags, payload length, period, payload """
+FRAME_SLOT = struct.Struct('<qIBBxxI64s')
+FLAG_PERIOD_EN, FLAG_EXTENDED_ID, FLAG_FD, FLAG_BRS = 0x01, 0x02, 0x04, 0x08
+
+
+class SharedFrameTable:
+    """ Class for reading compiled frames table from shared memory block, used in TX process """
+
+    def __init__(self, shm: SharedMemory) -> None:
+        """
+        Setups shared memory block
+        Params:                                                                     type:
+        @param shm: Shared memory block written by TxProcess                        SharedMemory
+        @return: None
+        """
+
+        self.__shm = shm
+        self.__read_lock = Lock()
+        self.__seq = None
+        self.__frame_table = FrameTable(frames=(), version=0)
+        self.__slots_d: Dict[int, Tuple[bytes, CompiledFrame]] = {}
+        self.__generators_d: Dict[int, Tuple[GeneratorRule, ...]] = {}
+
+    def __read_slots(self) -> Optional[Tuple[int, List[bytes]]]:
+        """
+        Copies frame slots from shared memory, seqlock protocol
+        Params:                                                                     type:
+        @return: Sequence number and raw slots, None if block modified during copy  Optional[Tuple]
+        """
+
+        buf = self.__shm.buf
+        seq, frames_num = HEADER.unpack_from(buf, 0)
+        if seq & 1:
+            """ Writer in progress """
+            return None
+        slots = [bytes(buf[HEADER.size + i * FRAME_SLOT.size:HEADER.size + (i + 1) * FRAME_SLOT.size])
+                 for i in range(frames_num)]
+        return (seq, slots) if HEADER.unpack_from(buf, 0)[0] == seq else None
+
+    def __rebuild(self) -> FrameTable:
+        """
+        Rebuilds frames table from shared memory block, compiled frames of unchanged slots are reused
+        Params:                                                                     type:
+        @return: Compiled frames table                                              FrameTable
+        """
+
+        read_result = self.__read_slots()
+        while read_result is None:
+            read_result = self.__read_slots()
+        seq, slots = read_result
+        frames, slots_d = [], {}
+        for slot in slots:
+            handle, can_id, flags, length, period, payload = FRAME_SLOT.unpack(slot)
+            old_slot = self.__slots_d.get(handle)
+            generators = self.__generators_d.get(handle, ())
+            if old_slot is not None and old_slot[0] == slot and old_slot[1].generators == generators:
+                """ Frame not changed - reuse compiled frame """
+                frame = old_slot[1]
+            else:
+                frame = CompiledFrame(record=MsgRecord(handle=handle, name='', can_id=can_id,
+                                                       payload=payload[:length],
+                                                       period_en=bool(flags & FLAG_PERIOD_EN), period=period,
+                                                       extended_id=bool(flags & FLAG_EXTENDED_ID),
+                                                       fd=bool(flags & FLAG_FD), brs=bool(flags & FLAG_BRS)))
+                frame.generators = generators
+            frames.append(frame)
+            slots_d[handle] = (slot, frame)
+        self.__slots_d = slots_d
+        self.__frame_table = FrameTable(frames=frames, version=seq // 2)
+        self.__seq = seq
+        return self.__frame_table
+
+    """ ============================================= Class interface ============================================= """
+
+    def set_generators(self, generators_d: Dict[int, Tuple[GeneratorRule, ...]]) -> None:
+        """
+        Setups payload generators of frames, frames table is rebuilt on next read
+        Params:                                                                     type:
+        @param generators_d: Generators of frames with dynamic payload by handle    Dict[int, Tuple]
+        @return: None
+        """
+
+        with self.__read_lock:
+            self.__generators_d = generators_d
+            self.__seq = None
+
+    def get_frame_table(self) -> FrameTable:
+        """
+        Provides current frames table, table is rebuilt only if shared memory block changed
+        Params:                                                                     type:
+        @return: Compiled frames table                                              FrameTable
+        """
+
+        seq = HEADER.unpack_from(self.__shm.buf, 0)[0]
+        if seq == self.__seq:
+            return self.__frame_table
+
+        with self.__read_lock:
+            return self.__rebuild() if seq != self.__seq else self.__frame_table
+
+
+def _serve_commands(conn: Connection, shared_table: SharedFrameTable, bus_kwargs: Dict[str, Any]) -> None:
+    """
+    Owns bus and serves commands of main process until stopped
+    Params:                                                                     type:
+    @param conn: Pipe end for commands from main process                        Connection
+    @param shared_table: Frames table in shared memory block                    SharedFrameTable
+    @param bus_kwargs: Arguments of python-can bus                              Dict[str, Any]
+    @return: None
+    """
+
+    try:
+        bus = can.interface.Bus(**bus_kwargs)
+    except ImportError:
+        print('Could not import Vector hardware configuration!')
+        bus = None
+
+    sim_active = False
+    payload_engine = PayloadEngine()
+    replay = None
+    recorder = None
+    stress = None
+    notifier = None
+
+    def send_msgs_periodic(frames: List[CompiledFrame]) -> None:
+        """ Sends periodic messages which reached their deadline """
+        if sim_active:
+            tx_pipeline.submit(payload_engine.generate(frame_table=shared_table.get_frame_table(), frames=frames))
+
+    def update_expected_periods() -> None:
+        """ Provides configured periods of periodic messages to telemetry """
+        telemetry.set_expected_periods({frame.msg.arbitration_id: frame.period for frame in
+                                        shared_table.get_frame_table().get_periodic_frames()})
+
+    telemetry = TxTelemetry()
+    tx_pipeline = TxPipeline(bus=bus, telemetry=telemetry)
+    scheduler = DeadlineScheduler(get_frame_table_h=shared_table.get_frame_table,
+                                  send_frames_h=send_msgs_periodic)
+    telemetry.add_counter(name='scheduler_overruns', provider=scheduler.get_overrun_count)
+    telemetry.add_counter(name='tx_queue_depth', provider=tx_pipeline.get_queue_depth)
+    telemetry.add_counter(name='tx_queue_depth_max', provider=tx_pipeline.get_max_queue_depth)
+    telemetry.add_counter(name='tx_errors', provider=tx_pipeline.get_error_counters)
+    update_expected_periods()
+
+    tx_pipeline.start()
+    scheduler_thread = Thread(target=scheduler.run, daemon=True)
+    scheduler_thread.start()
+
+    while True:
+        try:
+            command, arg = conn.recv()
+        except EOFError:
+            """ Main process died """
+            break
+        if command == 'update':
+            if arg is not None:
+                shared_table.set_generators(generators_d=arg)
+            scheduler.notify_update()
+            update_expected_periods()
+        elif command == 'active':
+            sim_active = arg
+            scheduler.set_active(active=arg)
+            if not arg and stress is not None:
+                stress.stop()
+                stress = None
+        elif command == 'send':
+            frame_table = shared_table.get_frame_table()
+            handle, count = arg
+            frame = frame_table.get_frame_by_handle(handle=handle)
+            if sim_active and frame is not None:
+                tx_pipeline.submit(payload_engine.generate(frame_table=frame_table, frames=(frame, ) * count))
+        elif command == 'replay':
+            if replay is not None:
+                replay.stop()
+                replay = None
+            if arg is not None and sim_active:
+                replay = TraceReplay(tx_pipeline=tx_pipeline, **arg)
+                replay.start()
+        elif command == 'stress':
+            if stress is not None:
+                stress.stop()
+                stress = None
+            if arg is not None and sim_active:
+                stress = create_stress(frame_table=shared_table.get_frame_table(), tx_pipeline=tx_pipeline,
+                                       bus_kwargs=bus_kwargs, **arg)
+                if stress is None or not stress.start():
+                    stress = None
+        elif command == 'stress_stats':
+            conn.send(stress.get_stats() if stress is not None else {})
+        elif command == 'record':
+            if recorder is not None:
+                tx_pipeline.remove_tx_listener(recorder.record_tx)
+                if notifier is not None and recorder in notifier.listeners:
+                    notifier.remove_listener(recorder)
+                recorder.stop()
+                recorder = None
+            if arg is not None:
+                rx = arg.pop('rx')
+                recorder = TrafficRecorder(**arg)
+                recorder.start()
+                tx_pipeline.add_tx_listener(recorder.record_tx)
+                if rx and bus is not None:
+                    if notifier is None:
+                        notifier = can.Notifier(bus, [], timeout=0.1)
+                    notifier.add_listener(recorder)
+        elif command == 'record_stats':
+            conn.send(recorder.get_stats() if recorder is not None else {})
+        elif command == 'replay_running':
+            conn.send(replay is not None and replay.is_running())
+        elif command == 'stats':
+            conn.send(telemetry.get_stats())
+        elif command == 'format_stats':
+            conn.send(telemetry.format_stats() if stress is None else
+                      '{}\nStress: {}'.format(telemetry.format_stats(), stress.format_stats()))
+        elif command == 'export_stats':
+            telemetry.export(path=arg)
+            conn.send(None)
+        elif command == 'stop':
+            break
+        else:
+            logger.error('Unknown TX process command: %s', command)
+
+    sim_active = False
+    if replay is not None:
+        replay.stop()
+    if stress is not None:
+        stress.stop()
+    if notifier is not None:
+        notifier.stop()
+    if recorder is not None:
+        recorder.stop()
+    scheduler.stop()
+    scheduler_thread.join()
+    tx_pipeline.stop()
+    if bus is not None:
+        bus.shutdown()
+
+
+def tx_process_main(conn: Connection, shm_name: str, bus_kwargs: Dict[str, Any]) -> None:
+    """
+    Entry point of TX process, mapping of shared memory block is closed also if serving fails
+    Params:                                                                     type:
+    @param conn: Pipe end for commands from main process                        Connection
+    @param shm_name: Name of shared memory block with frames table              str
+    @param bus_kwargs: Arguments of python-can bus                              Dict[str, Any]
+    @return: None
+    """
+
+    shm = SharedMemory(name=shm_name)
+    try:
+        _serve_commands(conn=conn, shared_table=SharedFrameTable(shm=shm), bus_kwargs=bus_kwargs)
+    finally:
+        """ Block is owned by main process - TX process only closes its mapping, never unlinks it """
+        shm.close()
+        conn.close()
+
+
+class TxProcess:
+    """ Class for controlling TX process from main process """
+
+    __CAPACITY = 16384
+
+    def __init__(self, bus_kwargs: Dict[str, Any], capacity: int = __CAPACITY) -> None:
+        """
+        Allocates shared memory block for frames table
+        Params:                                                                     type:
+        @param bus_kwargs: Arguments of python-can bus created in TX process        Dict[str, Any]
+        @param capacity: Maximal number of frames in shared table                   int
+        @return: None
+        """
+
+        self.__bus_kwargs = bus_kwargs
+        self.__capacity = capacity
+        self.__shm = SharedMemory(create=True, size=HEADER.size + capacity * FRAME_SLOT.size)
+        self.__shm_released = False
+        HEADER.pack_into(self.__shm.buf, 0, 0, 0)
+        self.__seq = 0
+        self.__written_frames: List[CompiledFrame] = []
+        self.__slot_indexes_d: Dict[int, int] = {}
+        self.__generators_d: Dict[int, Tuple[GeneratorRule, ...]] = {}
+        self.__write_lock = Lock()
+        self.__conn_lock = Lock()
+        self.__conn = None
+        self.__process = None
+
+    @staticmethod
+    def __write_slot(buf: memoryview, index: int, frame: CompiledFrame) -> None:
+        """
+        Writes compiled frame to its slot, must be called with sequence number odd
+        Params:                                                                     type:
+        @param buf: Buffer of shared memory block                                   memoryview
+        @param index: Index of the slot                                             int
+        @param frame: Compiled CAN frame                                            CompiledFrame
+        @return: None
+        """
+
+        msg = frame.msg
+        data = bytes(msg.data)
+        flags = ((FLAG_PERIOD_EN if frame.period_en else 0) | (FLAG_EXTENDED_ID if msg.is_extended_id else 0) |
+                 (FLAG_FD if msg.is_fd else 0) | (FLAG_BRS if msg.bitrate_switch else 0))
+        FRAME_SLOT.pack_into(buf, HEADER.size + index * FRAME_SLOT.size, frame.handle, msg.arbitration_id, flags,
+                             len(data), frame.period, data)
+
+    def __request(self, command: str, arg: Any = None, reply: bool = False) -> Any:
+        """
+        Sends command to TX process
+        Params:                                                                     type:
+        @param command: Command name                                                str
+        @param arg: Command argument                                                Any
+        @param reply: Wait for response                                             bool
+        @return: Response of TX process or None                                     Any
+        """
+
+        with self.__conn_lock:
+            if self.__conn is None:
+                return None
+            try:
+                self.__conn.send((command, arg))
+                return self.__conn.recv() if reply else None
+            except (OSError, EOFError) as e:
+                logger.error('TX process not available: %s', e)
+                return None
+
+    """ ============================================= Class interface ============================================= """
+
+    def publish(self, frame_table: FrameTable) -> None:
+        """
+        Writes changed frames to shared memory block and notifies TX process
+        Params:                                                                     type:
+        @param frame_table: Compiled frames table snapshot                          FrameTable
+        @return: None
+        """
+
+        frames = frame_table.get_frames()
+        if len(frames) > self.__capacity:
+            logger.error('Frames table exceeds TX process capacity, %d frames not sent', len(frames) - self.__capacity)
+            frames = frames[:self.__capacity]
+
+        with self.__write_lock:
+            if self.__shm_released:
+                """ TX process stopped """
+                return
+            buf = self.__shm.buf
+            self.__seq += 1
+            HEADER.pack_into(buf, 0, self.__seq, len(self.__written_frames))
+            for i, frame in enumerate(frames):
+                if i < len(self.__written_frames) and self.__written_frames[i] is frame:
+                    """ Compiled frames are shared between snapshots - slot is up to date """
+                    continue
+                self.__write_slot(buf=buf, index=i, frame=frame)
+            self.__seq += 1
+            HEADER.pack_into(buf, 0, self.__seq, len(frames))
+            self.__written_frames = list(frames)
+            self.__slot_indexes_d = {frame.handle: i for i, frame in enumerate(frames)}
+            generators_d = {frame.handle: frame.generators for frame in frames if frame.generators}
+            if generators_d == self.__generators_d:
+                """ Generators not changed - TX process keeps its own """
+                generators_d = None
+            else:
+                self.__generators_d = generators_d
+        self.__request(command='update', arg=generators_d)
+
+    def update_payloads(self, frames: List[CompiledFrame]) -> None:
+        """
+        Writes frames with payloads replaced in place to their slots, TX process picks them up in the next cycle
+        Params:                                                                     type:
+        @param frames: Frames with replaced payloads                                List[CompiledFrame]
+        @return: None
+        """
+
+        with self.__write_lock:
+            slots = [(self.__slot_indexes_d.get(frame.handle), frame) for frame in frames]
+            slots = [(index, frame) for index, frame in slots
+                     if index is not None and self.__written_frames[index] is frame]
+            if self.__shm_released or not slots:
+                return
+            buf = self.__shm.buf
+            self.__seq += 1
+            HEADER.pack_into(buf, 0, self.__seq, len(self.__written_frames))
+            for index, frame in slots:
+                self.__write_slot(buf=buf, index=index, frame=frame)
+            self.__seq += 1
+            HEADER.pack_into(buf, 0, self.__seq, len(self.__written_frames))
+
+    def start(self) -> None:
+        """
+        Starts TX process
+        Params:                                                                     type:
+        @return: None
+        """
+
+        context = multiprocessing.get_context('spawn')
+        self.__conn, child_conn = context.Pipe()
+        self.__process = context.Process(target=tx_process_main, args=(child_conn, self.__shm.name, self.__bus_kwargs),
+                                         name='canvector-tx', daemon=True)
+        self.__process.start()
+        child_conn.close()
+        if self.__generators_d:
+            """ Frames table published before start - provide its generators """
+            self.__request(command='update', arg=self.__generators_d)
+
+    def set_active(self, active: bool) -> None:
+        """
+        Enables or disables transmission
+        Params:                                                                     type:
+        @param active: Simulation enable                                            bool
+        @return: None
+        """
+
+        self.__request(command='active', arg=active)
+
+    def send(self, handle: int, count: int = 1) -> None:
+        """
+        Sends specified message once or as a burst of frames
+        Params:                                                                     type:
+        @param handle: Handle of the message                                        int
+        @param count: Number of frames                                              int
+        @return: None
+        """
+
+        self.__request(command='send', arg=(handle, count))
+
+    def start_replay(self, replay_kwargs: Dict[str, Any]) -> None:
+        """
+        Starts replay of log file in TX process, replay in progress is stopped
+        Params:                                                                     type:
+        @param replay_kwargs: Arguments of TraceReplay except TX pipeline           Dict[str, Any]
+        @return: None
+        """
+
+        self.__request(command='replay', arg=replay_kwargs)
+
+    def stop_replay(self) -> None:
+        """
+        Stops replay of log file in TX process
+        Params:                                                                     type:
+        @return: None
+        """
+
+        self.__request(command='replay', arg=None)
+
+    def is_replay_running(self) -> bool:
+        """
+        Provides replay state
+        Params:                                                                     type:
+        @return: Information if log is being replayed in TX process                 bool
+        """
+
+        return bool(self.__request(command='replay_running', reply=True))
+
+    def start_stress(self, stress_kwargs: Dict[str, Any]) -> None:
+        """
+        Starts bus load stress in TX process, stress in progress is stopped
+        Params:                                                                     type:
+        @param stress_kwargs: Arguments of create_stress except table and pipeline  Dict[str, Any]
+        @return: None
+        """
+
+        self.__request(command='stress', arg=stress_kwargs)
+
+    def stop_stress(self) -> None:
+        """
+        Stops bus load stress in TX process
+        Params:                                                                     type:
+        @return: None
+        """
+
+        self.__request(command='stress', arg=None)
+
+    def get_stress_stats(self) -> Dict[str, Any]:
+        """
+        Provides requested and achieved bus load in TX process
+        Params:                                                                     type:
+        @return: Loads in percent and frames per second, empty if not running       Dict[str, Any]
+        """
+
+        return self.__request(command='stress_stats', reply=True) or {}
+
+    def start_recording(self, record_kwargs: Dict[str, Any]) -> None:
+        """
+        Starts recording of bus traffic in TX process, recording in progress is stopped
+        Params:                                                                     type:
+        @param record_kwargs: Arguments of TrafficRecorder and rx flag              Dict[str, Any]
+        @return: None
+        """
+
+        self.__request(command='record', arg=record_kwargs)
+
+    def stop_recording(self) -> None:
+        """
+        Stops recording of bus traffic in TX process
+        Params:                                                                     type:
+        @return: None
+        """
+
+        self.__request(command='record', arg=None)
+
+    def get_recording_stats(self) -> Dict[str, Any]:
+        """
+        Provides recording statistics
+        Params:                                                                     type:
+        @return: Recorded and dropped frames, empty if not recording                Dict[str, Any]
+        """
+
+        return self.__request(command='record_stats', reply=True) or {}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Provides TX statistics collected in TX process
+        Params:                                                                     type:
+        @return: Statistics                                                         Dict[str, Any]
+        """
+
+        return self.__request(command='stats', reply=True) or {}
+
+    def format_stats(self) -> str:
+        """
+        Provides TX statistics as human readable text
+        Params:                                                                     type:
+        @return: Statistics summary                                                 str
+        """
+
+        return self.__request(command='format_stats', reply=True) or 'TX process not running'
+
+    def export_stats(self, path: str) -> None:
+        """
+        Saves TX statistics to file, JSON if path ends with .json, text otherwise
+        Params:                                                                     type:
+        @param path: Path to output file                                            str
+        @return: None
+        """
+
+        self.__request(command='export_stats', arg=path, reply=True)
+
+    def stop(self) -> None:
+        """
+        Stops TX process and releases shared memory block
+        Params:                                                                     type:
+        @return: None
+        """
+
+        self.__request(command='stop')
+        if self.__process is not None:
+            self.__process.join(timeout=5)
+            if self.__process.is_alive():
+                self.__process.terminate()
+                self.__process.join()
+            self.__process = None
+        with self.__conn_lock:
+            if self.__conn is not None:
+                self.__conn.close()
+                self.__conn = None
+        with self.__write_lock:
+            if not self.__shm_released:
+                """ TX process exited and closed its mapping - block is closed and unlinked by its owner """
+                self.__shm_released = True
+                self.__shm.close()
+                self.__shm.unlink()